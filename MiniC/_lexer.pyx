@@ -0,0 +1,142 @@
+# _lexer.pyx
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled Lexer for MiniC.
+
+A single-pass character scanner equivalent to the regular expression
+lexer in lexer.py. At every position it tries the same token rules in
+the same order as TokenSpec, so both produce identical token lists,
+including positions and the characters that no rule matches (which
+are skipped). lexer.tokenize uses this module when it has been built:
+
+    cythonize -i MiniC/_lexer.pyx
+"""
+
+cdef inline bint is_digit(Py_UCS4 c):
+    return u'0' <= c <= u'9'
+
+cdef inline bint is_id_start(Py_UCS4 c):
+    return (u'a' <= c <= u'z') or (u'A' <= c <= u'Z') or c == u'_'
+
+cdef inline bint is_id_char(Py_UCS4 c):
+    return is_id_start(c) or is_digit(c)
+
+cdef Py_ssize_t scan_quoted(str code, Py_ssize_t i, Py_ssize_t n, Py_UCS4 quote):
+    """Return the end of a string literal opened at i, or -1 if it is unterminated."""
+    cdef Py_UCS4 c
+    i += 1
+    while i < n:
+        c = code[i]
+        if c == quote:
+            return i + 1
+        if c == u'\\':
+            if i + 1 >= n:
+                return -1
+            i += 2
+        else:
+            i += 1
+    return -1
+
+cdef Py_ssize_t scan_char(str code, Py_ssize_t i, Py_ssize_t n):
+    """Return the end of a char literal opened at i, or -1 if there is none."""
+    cdef Py_ssize_t j = i + 1
+    if j >= n or code[j] == u"'":
+        return -1
+    if code[j] == u'\\':
+        j += 1
+        if j >= n:
+            return -1
+    j += 1
+    if j < n and code[j] == u"'":
+        return j + 1
+    return -1
+
+def tokenize(str code, tokens, dict text_kinds, dict type_kinds):
+    """Tokenize MiniC source into the columns of an empty lexer.TokenStream and return it.
+
+    kind comes from text_kinds for fixed-text tokens and type_kinds otherwise."""
+    cdef list values = tokens.values
+    cdef Py_ssize_t n = len(code)
+    cdef Py_ssize_t i = 0, j, newlines
+    cdef Py_ssize_t line_no = 1, line_start = 0
+    cdef Py_UCS4 c, d
+    cdef object kind
+    cdef str value
+    kinds, linenos, cols = tokens.kinds, tokens.linenos, tokens.cols
+    while i < n:
+        c = code[i]
+        d = code[i + 1] if i + 1 < n else 0
+        kind = None
+        j = -1
+        if c == u' ' or c == u'\t' or c == u'\r' or c == u'\n':
+            j = i + 1
+            while j < n and (code[j] == u' ' or code[j] == u'\t' or code[j] == u'\r' or code[j] == u'\n'):
+                j += 1
+        elif c == u'/' and d == u'/':
+            j = code.find(u'\n', i)
+            if j < 0:
+                j = n
+        elif c == u'/' and d == u'*' and code.find(u'*/', i + 2) >= 0:
+            j = code.find(u'*/', i + 2) + 2
+        elif is_id_start(c):
+            j = i + 1
+            while j < n and is_id_char(code[j]):
+                j += 1
+            kind = 'ID'  # Keywords get their kind from text_kinds below
+        elif is_digit(c):
+            j = i + 1
+            while j < n and is_digit(code[j]):
+                j += 1
+            kind = 'INT_LIT'
+            if j + 1 < n and code[j] == u'.' and is_digit(code[j + 1]):
+                j += 2
+                while j < n and is_digit(code[j]):
+                    j += 1
+                kind = 'FLOAT_LIT'
+        elif c == u"'":
+            j = scan_char(code, i, n)
+            kind = 'CHAR_LIT'
+        elif c == u'"':
+            j = scan_quoted(code, i, n, u'"')
+            kind = 'STRING_LIT'
+        elif c == u'+' or c == u'-' or c == u'*' or c == u'/' or c == u'%':
+            j = i + 1
+            kind = 'ARITH'
+        elif (c == u'<' or c == u'>' or c == u'=' or c == u'!') and d == u'=':
+            j = i + 2
+            kind = 'RELOP'
+        elif c == u'<' or c == u'>':
+            j = i + 1
+            kind = 'RELOP'
+        elif (c == u'&' and d == u'&') or (c == u'|' and d == u'|'):
+            j = i + 2
+            kind = 'LOGIC'
+        elif c == u'!':
+            j = i + 1
+            kind = 'LOGIC'
+        elif c == u'=':
+            j = i + 1
+            kind = 'ASSIGN'
+        elif c in u';,(){}[]':
+            j = i + 1
+            kind = 'SYM'
+        if j < 0:
+            # No rule matches here; the regex lexer skips the character too
+            i += 1
+            continue
+        value = code[i:j]
+        if kind is not None:
+            kinds.append(text_kinds.get(value) or type_kinds[kind])
+            values.append(intern(value))
+            linenos.append(line_no)
+            cols.append(i - line_start + 1)
+        newlines = value.count(u'\n')
+        if newlines:
+            line_no += newlines
+            line_start = j
+        i = j
+    kinds.append(type_kinds['EOF'])
+    values.append('')
+    linenos.append(line_no)
+    cols.append(1)
+    return tokens
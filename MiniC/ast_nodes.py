@@ -1,12 +1,19 @@
 # ast_nodes.py
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field, fields
 from typing import List, Optional, Any, Tuple
 
+# Nodes intern their names, types and operators in __post_init__, so the
+# many string comparisons in later phases usually succeed on identity.
 class ASTNode:
     """Base class for all AST nodes."""
-    pass
+    __slots__ = ()
 
-@dataclass
+    def __reduce__(self):
+        # Unpickle through __init__, so __post_init__ interns the strings again
+        return type(self), tuple(getattr(self, f.name) for f in fields(self))
+
+@dataclass(slots=True)
 class Program(ASTNode):
     """Represents the entire MiniC program with a list of functions."""
     functions: List[Any]
@@ -14,19 +21,25 @@ class Program(ASTNode):
     def __str__(self):
         return '\n'.join(str(f) for f in self.functions)
 
-@dataclass
+@dataclass(slots=True)
 class Function(ASTNode):
     """Represents a function definition with return type, name, parameters, and body."""
     ret_type: str
     name: str
     params: List[Tuple[str, str]]
     body: Any
+    code: Any = field(default=None, repr=False, compare=False)  # Compiled bytecode, set by the Interpreter
+
+    def __post_init__(self):
+        self.ret_type = sys.intern(self.ret_type)
+        self.name = sys.intern(self.name)
+        self.params = [(sys.intern(t), sys.intern(n)) for t, n in self.params]
 
     def __str__(self):
         params_str = ', '.join(f"{t} {n}" for t, n in self.params)
         return f"{self.ret_type} {self.name}({params_str}) {self.body}"
 
-@dataclass
+@dataclass(slots=True)
 class Block(ASTNode):
     """Represents a block of statements."""
     statements: List[Any]
@@ -34,27 +47,34 @@ class Block(ASTNode):
     def __str__(self):
         return '{\n' + '\n'.join(f"  {str(s)}" for s in self.statements) + '\n}'
 
-@dataclass
+@dataclass(slots=True)
 class VarDecl(ASTNode):
     """Represents a variable declaration with optional initialization."""
     var_type: str
     name: str
     init: Optional[Any]
 
+    def __post_init__(self):
+        self.var_type = sys.intern(self.var_type)
+        self.name = sys.intern(self.name)
+
     def __str__(self):
         init_str = f" = {self.init}" if self.init else ""
         return f"{self.var_type} {self.name}{init_str};"
 
-@dataclass
+@dataclass(slots=True)
 class Assignment(ASTNode):
     """Represents an assignment statement."""
     target: str
     value: Any
 
+    def __post_init__(self):
+        self.target = sys.intern(self.target)
+
     def __str__(self):
         return f"{self.target} = {self.value};"
 
-@dataclass
+@dataclass(slots=True)
 class IfStmt(ASTNode):
     """Represents an if statement with optional else branch."""
     cond: Any
@@ -65,7 +85,7 @@ class IfStmt(ASTNode):
         else_str = f" else {self.else_branch}" if self.else_branch else ""
         return f"if ({self.cond}) {self.then_branch}{else_str}"
 
-@dataclass
+@dataclass(slots=True)
 class WhileStmt(ASTNode):
     """Represents a while loop."""
     cond: Any
@@ -74,7 +94,7 @@ class WhileStmt(ASTNode):
     def __str__(self):
         return f"while ({self.cond}) {self.body}"
 
-@dataclass
+@dataclass(slots=True)
 class ForStmt(ASTNode):
     """Represents a for loop with optional init, condition, and update."""
     init: Optional[Any]
@@ -88,7 +108,7 @@ class ForStmt(ASTNode):
         update_str = str(self.update) if self.update else ""
         return f"for ({init_str} {cond_str}; {update_str}) {self.body}"
 
-@dataclass
+@dataclass(slots=True)
 class ReturnStmt(ASTNode):
     """Represents a return statement with optional expression."""
     expr: Optional[Any]
@@ -97,48 +117,64 @@ class ReturnStmt(ASTNode):
         expr_str = f" {self.expr}" if self.expr else ""
         return f"return{expr_str};"
 
-@dataclass
+@dataclass(slots=True)
 class Expr(ASTNode):
     """Represents a binary expression with operator and operands."""
     op: Optional[str]
     left: Any
     right: Any
 
+    def __post_init__(self):
+        if self.op is not None:
+            self.op = sys.intern(self.op)
+
     def __str__(self):
         return f"({self.left} {self.op} {self.right})"
 
-@dataclass
+@dataclass(slots=True)
 class UnaryExpr(ASTNode):
     """Represents a unary expression with operator and operand."""
     op: str
     expr: Any
 
+    def __post_init__(self):
+        self.op = sys.intern(self.op)
+
     def __str__(self):
         return f"({self.op}{self.expr})"
 
-@dataclass
+@dataclass(slots=True)
 class Literal(ASTNode):
     """Represents a literal value with its type."""
     value: Any
     typ: str
 
+    def __post_init__(self):
+        self.typ = sys.intern(self.typ)
+
     def __str__(self):
         return str(self.value)
 
-@dataclass
+@dataclass(slots=True)
 class VarRef(ASTNode):
     """Represents a variable reference."""
     name: str
 
+    def __post_init__(self):
+        self.name = sys.intern(self.name)
+
     def __str__(self):
         return self.name
 
-@dataclass
+@dataclass(slots=True)
 class FuncCall(ASTNode):
     """Represents a function call with name and arguments."""
     name: str
     args: List[Any]
 
+    def __post_init__(self):
+        self.name = sys.intern(self.name)
+
     def __str__(self):
         args_str = ', '.join(str(a) for a in self.args)
         return f"{self.name}({args_str})"
@@ -0,0 +1,382 @@
+# bytecode.py
+"""
+Bytecode Compiler for the MiniC Interpreter.
+
+Each function body is compiled once into a flat list of (opcode, arg)
+instructions. The Interpreter executes this list in a single dispatch
+loop instead of re-walking the AST on every execution. Local variables
+are resolved to integer slot indices at compile time, so the runtime
+environment is a plain list rather than a dict keyed by name.
+"""
+
+import math
+import operator
+from typing import List, Dict, Set, Any, Tuple
+from MiniC.ast_nodes import *
+
+# Opcodes, ordered roughly by how often they execute inside loop bodies.
+LOAD_LOCAL = 0
+LOAD_CONST = 1
+STORE_LOCAL = 2
+BINARY_OP = 3
+JUMP_IF_FALSE = 4
+JUMP = 5
+POP = 6
+DUP_TOP = 7
+UNARY_OP = 8
+CALL = 9
+PRINT = 10
+READ = 11
+RETURN = 12
+FOR_RANGE = 13
+FOR_ITER = 14
+JUMP_IF_TRUE = 15
+
+OPNAMES = (
+    'LOAD_LOCAL', 'LOAD_CONST', 'STORE_LOCAL', 'BINARY_OP', 'JUMP_IF_FALSE',
+    'JUMP', 'POP', 'DUP_TOP', 'UNARY_OP', 'CALL', 'PRINT', 'READ', 'RETURN',
+    'FOR_RANGE', 'FOR_ITER', 'JUMP_IF_TRUE',
+)
+
+def _logical_and(left, right):
+    return left and right
+
+def _logical_or(left, right):
+    return left or right
+
+# Operator implementations; BINARY_OP and UNARY_OP carry one of these as their arg.
+BINOPS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul,
+    '/': operator.truediv, '%': operator.mod,
+    '<': operator.lt, '>': operator.gt, '<=': operator.le, '>=': operator.ge,
+    '==': operator.eq, '!=': operator.ne,
+    '&&': _logical_and, '||': _logical_or,
+}
+
+UNOPS = {'-': operator.neg, '+': operator.pos, '!': operator.not_}
+
+UNDEF = object()  # Contents of a local slot before its declaration executes
+
+# How far the exclusive range() stop lies from a loop bound, per condition
+_RANGE_STOP_OFFSET = {'<': 0, '<=': 1, '>': 0, '>=': -1}
+
+def range_stop(cond_op: str, bound) -> int:
+    """Return the range() stop that makes an int counter satisfy 'counter cond_op bound'."""
+    if type(bound) is not int:
+        # An int counter first passes a fractional bound at the next whole number
+        bound = math.ceil(bound) if cond_op in ('<', '>=') else math.floor(bound)
+    return bound + _RANGE_STOP_OFFSET[cond_op]
+
+# Instructions whose arg is a slot index or operator function. Loads and
+# stores of the same slot repeat constantly, so these are interned in
+# emit(). LOAD_CONST is excluded since 1, 1.0 and True compare equal.
+_SHARED_OPS = frozenset((LOAD_LOCAL, STORE_LOCAL, BINARY_OP, UNARY_OP, POP, DUP_TOP, PRINT, READ, RETURN))
+
+_shared_instructions: Dict[Tuple[int, Any], Tuple[int, Any]] = {}
+
+class CodeObject:
+    """Compiled bytecode for a single MiniC function."""
+    def __init__(self, name: str, instructions: List[Tuple[int, Any]],
+                 local_names: List[str], param_slots: List[int]):
+        self.name = name
+        self.instructions = instructions  # List of (opcode, arg) tuples
+        self.local_names = local_names  # Variable name of each slot
+        self.n_locals = len(local_names)  # Size of the locals array
+        self.param_slots = param_slots  # Slot index of each parameter, in order
+        self.native = None  # JIT-compiled equivalent, called instead of the bytecode when set
+
+    def __str__(self):
+        lines = [f"{self.name}:"]
+        for i, (op, arg) in enumerate(self.instructions):
+            if arg is None:
+                arg_str = ''
+            elif op == CALL:
+                arg_str = f" {arg[0].name}/{arg[1]}"
+            elif callable(arg):
+                arg_str = f" {arg.__name__}"
+            else:
+                arg_str = f" {arg!r}"
+            lines.append(f"  {i:4} {OPNAMES[op]}{arg_str}")
+        return '\n'.join(lines)
+
+class Compiler:
+    """Compiles a function's AST into bytecode."""
+
+    def __init__(self, functions: Dict[str, Function]):
+        self.functions = functions  # Call targets, resolved at compile time
+        self.instructions: List[Tuple[int, Any]] = []
+        self.slots: Dict[str, int] = {}  # var name to slot index
+        self._stmt_dispatch = {
+            Block: self._compile_block,
+            VarDecl: self._compile_vardecl,
+            Assignment: self._compile_assign_stmt,
+            IfStmt: self._compile_if,
+            WhileStmt: self._compile_while,
+            ForStmt: self._compile_for,
+            ReturnStmt: self._compile_return,
+            FuncCall: self._compile_call_stmt,
+            Expr: self._compile_expr_stmt,
+            UnaryExpr: self._compile_expr_stmt,
+            Literal: self._compile_expr_stmt,
+            VarRef: self._compile_expr_stmt,
+        }
+        self._expr_dispatch = {
+            Literal: self._compile_literal,
+            VarRef: self._compile_varref,
+            Assignment: self._compile_assign_expr,
+            UnaryExpr: self._compile_unary,
+            Expr: self._compile_binary,
+            FuncCall: self._compile_call,
+        }
+
+    def compile_function(self, func: Function) -> CodeObject:
+        """Compile a function body into a CodeObject."""
+        self.instructions = []
+        self.resolve_locals(func)
+        param_slots = [self.slots[name] for typ, name in func.params]
+        self.compile_statement(func.body)
+        # Falling off the end of a function returns None
+        self.emit(LOAD_CONST, None)
+        self.emit(RETURN)
+        return CodeObject(func.name, self.instructions, list(self.slots), param_slots)
+
+    def resolve_locals(self, func: Function):
+        """Assign a slot to every parameter and declared variable, in declaration order."""
+        self.slots = {}
+        for typ, name in func.params:
+            self.slots.setdefault(name, len(self.slots))
+        self._collect_decls(func.body)
+
+    def _collect_decls(self, stmt):
+        if isinstance(stmt, VarDecl):
+            self.slots.setdefault(stmt.name, len(self.slots))
+        elif isinstance(stmt, Block):
+            for s in stmt.statements:
+                self._collect_decls(s)
+        elif isinstance(stmt, IfStmt):
+            self._collect_decls(stmt.then_branch)
+            if stmt.else_branch:
+                self._collect_decls(stmt.else_branch)
+        elif isinstance(stmt, WhileStmt):
+            self._collect_decls(stmt.body)
+        elif isinstance(stmt, ForStmt):
+            if stmt.init:
+                self._collect_decls(stmt.init)
+            self._collect_decls(stmt.body)
+
+    def slot(self, name: str, error: str = 'Use of undeclared variable') -> int:
+        """Return the slot index for a declared variable."""
+        if name not in self.slots:
+            raise Exception(f'{error} {name}')
+        return self.slots[name]
+
+    def emit(self, op: int, arg: Any = None) -> int:
+        """Append an instruction and return its index."""
+        if op in _SHARED_OPS:
+            # Identical instructions share one tuple across every compiled function
+            instr = _shared_instructions.setdefault((op, arg), (op, arg))
+        else:
+            instr = (op, arg)
+        self.instructions.append(instr)
+        return len(self.instructions) - 1
+
+    def patch(self, index: int, target: int):
+        """Point the jump at index to target."""
+        op, _ = self.instructions[index]
+        self.instructions[index] = (op, target)
+
+    def compile_statement(self, stmt):
+        """Compile a statement; leaves the operand stack unchanged."""
+        handler = self._stmt_dispatch.get(type(stmt))
+        if handler is None:
+            raise Exception(f'Unhandled statement in interpreter: {stmt}')
+        handler(stmt)
+
+    def compile_expression(self, expr):
+        """Compile an expression; leaves its value on the operand stack."""
+        handler = self._expr_dispatch.get(type(expr))
+        if handler is None:
+            raise Exception(f'Unhandled expression in interpreter: {expr}')
+        handler(expr)
+
+    def _compile_block(self, stmt: Block):
+        for s in stmt.statements:
+            self.compile_statement(s)
+
+    def _compile_vardecl(self, stmt: VarDecl):
+        if stmt.init is not None:
+            self.compile_expression(stmt.init)
+        else:
+            self.emit(LOAD_CONST, None)
+        self.emit(STORE_LOCAL, self.slot(stmt.name))
+
+    def _compile_assign_stmt(self, stmt: Assignment):
+        self.compile_expression(stmt.value)
+        self.emit(STORE_LOCAL, self.slot(stmt.target, 'Assignment to undeclared variable'))
+
+    def _compile_if(self, stmt: IfStmt):
+        self.compile_expression(stmt.cond)
+        jump_else = self.emit(JUMP_IF_FALSE)
+        self.compile_statement(stmt.then_branch)
+        if stmt.else_branch:
+            jump_end = self.emit(JUMP)
+            self.patch(jump_else, len(self.instructions))
+            self.compile_statement(stmt.else_branch)
+            self.patch(jump_end, len(self.instructions))
+        else:
+            self.patch(jump_else, len(self.instructions))
+
+    # Loops are laid out with the condition after the body, so each
+    # iteration ends in one conditional jump back instead of a jump to
+    # the top followed by a conditional jump out.
+    def _compile_while(self, stmt: WhileStmt):
+        jump_cond = self.emit(JUMP)
+        body = len(self.instructions)
+        self.compile_statement(stmt.body)
+        self.patch(jump_cond, len(self.instructions))
+        self.compile_expression(stmt.cond)
+        self.emit(JUMP_IF_TRUE, body)
+
+    def _compile_for(self, stmt: ForStmt):
+        if self._compile_counting_for(stmt):
+            return
+        if stmt.init:
+            self.compile_statement(stmt.init)
+        jump_cond = self.emit(JUMP) if stmt.cond else None
+        body = len(self.instructions)
+        self.compile_statement(stmt.body)
+        if stmt.update:
+            self.compile_expression(stmt.update)
+            self.emit(POP)
+        if jump_cond is None:
+            self.emit(JUMP, body)
+            return
+        self.patch(jump_cond, len(self.instructions))
+        self.compile_expression(stmt.cond)
+        self.emit(JUMP_IF_TRUE, body)
+
+    def _compile_counting_for(self, stmt: ForStmt) -> bool:
+        """Compile 'for (int i = k; i < n; i = i + step)' to iterate a range; False if it doesn't match.
+
+        The loop bound is evaluated once, so it must have no side effects and
+        the body must not assign the counter or any variable the bound reads.
+        """
+        init, cond, update = stmt.init, stmt.cond, stmt.update
+        if not (isinstance(init, VarDecl) and init.var_type == 'int'
+                and isinstance(init.init, Literal) and init.init.typ == 'int'):
+            return False
+        counter = init.name
+        if not (isinstance(cond, Expr) and cond.op in _RANGE_STOP_OFFSET
+                and isinstance(cond.left, VarRef) and cond.left.name == counter):
+            return False
+        if not (isinstance(update, Assignment) and update.target == counter
+                and isinstance(update.value, Expr) and update.value.op in ('+', '-')
+                and isinstance(update.value.left, VarRef) and update.value.left.name == counter
+                and isinstance(update.value.right, Literal) and update.value.right.typ == 'int'):
+            return False
+        step = update.value.right.value if update.value.op == '+' else -update.value.right.value
+        # The counter has to move towards the bound
+        if step == 0 or (step > 0) != (cond.op in ('<', '<=')):
+            return False
+        bound_vars: Set[str] = set()
+        if not _is_pure(cond.right, bound_vars):
+            return False
+        assigned: Set[str] = set()
+        _collect_assigned(stmt.body, assigned)
+        if counter in assigned or bound_vars & assigned:
+            return False
+        self.compile_statement(init)
+        self.compile_expression(cond.right)
+        slot = self.slot(counter)
+        self.emit(FOR_RANGE, (slot, step, cond.op))
+        start = self.emit(FOR_ITER)
+        self.compile_statement(stmt.body)
+        self.emit(JUMP, start)
+        self.patch(start, (slot, len(self.instructions)))
+        return True
+
+    def _compile_return(self, stmt: ReturnStmt):
+        if stmt.expr:
+            self.compile_expression(stmt.expr)
+        else:
+            self.emit(LOAD_CONST, None)
+        self.emit(RETURN)
+
+    def _compile_call_stmt(self, stmt: FuncCall):
+        self.compile_expression(stmt)
+        if stmt.name == 'read':
+            self.emit(STORE_LOCAL, self.slot(stmt.args[0].name, 'read on undeclared variable'))
+        else:
+            self.emit(POP)
+
+    def _compile_expr_stmt(self, stmt):
+        self.compile_expression(stmt)
+        self.emit(POP)
+
+    def _compile_literal(self, expr: Literal):
+        self.emit(LOAD_CONST, expr.value)
+
+    def _compile_varref(self, expr: VarRef):
+        self.emit(LOAD_LOCAL, self.slot(expr.name))
+
+    def _compile_assign_expr(self, expr: Assignment):
+        self.compile_expression(expr.value)
+        self.emit(DUP_TOP)
+        self.emit(STORE_LOCAL, self.slot(expr.target, 'Assignment to undeclared variable'))
+
+    def _compile_unary(self, expr: UnaryExpr):
+        self.compile_expression(expr.expr)
+        if expr.op in UNOPS:
+            self.emit(UNARY_OP, UNOPS[expr.op])
+
+    def _compile_binary(self, expr: Expr):
+        self.compile_expression(expr.left)
+        self.compile_expression(expr.right)
+        self.emit(BINARY_OP, BINOPS[expr.op])
+
+    def _compile_call(self, expr: FuncCall):
+        if expr.name == 'read':
+            if not expr.args or not isinstance(expr.args[0], VarRef):
+                raise Exception('read expects a variable')
+            self.emit(READ)
+            return
+        for a in expr.args:
+            self.compile_expression(a)
+        if expr.name == 'print':
+            self.emit(PRINT, len(expr.args))
+            self.emit(LOAD_CONST, None)
+            return
+        f = self.functions.get(expr.name)
+        if not f:
+            raise Exception(f'Call to undefined function {expr.name}')
+        self.emit(CALL, (f, len(expr.args)))
+
+def _is_pure(expr, names: Set[str]) -> bool:
+    """Whether expr is free of calls and assignments; collects the variables it reads."""
+    if isinstance(expr, Literal):
+        return True
+    if isinstance(expr, VarRef):
+        names.add(expr.name)
+        return True
+    if isinstance(expr, UnaryExpr):
+        return _is_pure(expr.expr, names)
+    if isinstance(expr, Expr):
+        return _is_pure(expr.left, names) and _is_pure(expr.right, names)
+    return False
+
+def _collect_assigned(node, names: Set[str]):
+    """Collect every variable a statement or expression may assign or redeclare."""
+    if isinstance(node, (VarDecl, Assignment)):
+        names.add(node.name if isinstance(node, VarDecl) else node.target)
+        _collect_assigned(node.init if isinstance(node, VarDecl) else node.value, names)
+    elif isinstance(node, FuncCall):
+        if node.name == 'read':
+            names.update(a.name for a in node.args if isinstance(a, VarRef))
+        for a in node.args:
+            _collect_assigned(a, names)
+    elif isinstance(node, Block):
+        for s in node.statements:
+            _collect_assigned(s, names)
+    elif isinstance(node, (IfStmt, WhileStmt, ForStmt, ReturnStmt, Expr, UnaryExpr)):
+        for attr in node.__slots__:
+            _collect_assigned(getattr(node, attr), names)
@@ -6,12 +6,32 @@ Converts optimized TAC to pseudo-assembly code.
 Outputs to a .out file.
 """
 
-from typing import List
-from MiniC.ir_generator import TACInstruction
+from functools import lru_cache
+from typing import Iterator, List
+from MiniC.ir_generator import (TACInstruction, OP_ASSIGN, OP_BINOP, OP_UNOP, OP_JUMP, OP_CJUMP,
+                                 OP_LABEL, OP_CALL, OP_RETURN, OP_PARAM)
+
+# The same variables and temps are loaded and stored over and over,
+# so share one string per operand instead of formatting a new one each time.
+@lru_cache(maxsize=4096)
+def _load(name: str) -> str:
+    return f"LOAD {name}"
+
+@lru_cache(maxsize=4096)
+def _store(name: str) -> str:
+    return f"STORE {name}"
 
 class CodeGenerator:
     """Generates pseudo-assembly from TAC."""
 
+    _BINOP_ASM = {
+        '+': 'ADD', '-': 'SUB', '*': 'MUL', '/': 'DIV', '%': 'MOD',
+        '&&': 'AND', '||': 'OR',
+        '<': 'LT', '>': 'GT', '<=': 'LE', '>=': 'GE', '==': 'EQ', '!=': 'NE',
+    }
+
+    _UNOP_ASM = {'-': 'NEG', '!': 'NOT'}
+
     def __init__(self):
         self.assembly: List[str] = []
         self.temp_stack = []  # For stack-based operations
@@ -23,78 +43,54 @@ class CodeGenerator:
             self.generate_instruction(instr)
         return '\n'.join(self.assembly)
 
+    def generate_iter(self, instructions: List[TACInstruction]) -> Iterator[str]:
+        """Yield the assembly line by line, holding one instruction's lines at a time."""
+        lines = self.assembly = []
+        for instr in instructions:
+            self.generate_instruction(instr)
+            yield from lines
+            lines.clear()
+
     def generate_instruction(self, instr: TACInstruction):
         """Generate assembly for a single TAC instruction."""
-        if instr.op == 'assign':
+        # One extend per instruction rather than one append per line
+        emit = self.assembly.extend
+        if instr.op == OP_ASSIGN:
             # dest = src1
-            self.assembly.append(f"LOAD {instr.src1}")
-            self.assembly.append(f"STORE {instr.dest}")
-        elif instr.op == 'binop':
+            emit((_load(instr.src1), _store(instr.dest)))
+        elif instr.op == OP_BINOP:
             # dest = src1 op src2
-            parts = instr.src2.split(' ', 1)
-            op = parts[0]
-            right = parts[1]
-            self.assembly.append(f"LOAD {instr.src1}")
-            self.assembly.append(f"LOAD {right}")
-            if op == '+':
-                self.assembly.append("ADD")
-            elif op == '-':
-                self.assembly.append("SUB")
-            elif op == '*':
-                self.assembly.append("MUL")
-            elif op == '/':
-                self.assembly.append("DIV")
-            elif op == '%':
-                self.assembly.append("MOD")
-            elif op == '&&':
-                self.assembly.append("AND")
-            elif op == '||':
-                self.assembly.append("OR")
-            elif op == '<':
-                self.assembly.append("LT")
-            elif op == '>':
-                self.assembly.append("GT")
-            elif op == '<=':
-                self.assembly.append("LE")
-            elif op == '>=':
-                self.assembly.append("GE")
-            elif op == '==':
-                self.assembly.append("EQ")
-            elif op == '!=':
-                self.assembly.append("NE")
-            self.assembly.append(f"STORE {instr.dest}")
-        elif instr.op == 'unop':
+            emit((_load(instr.src1), _load(instr.binop_right),
+                  self._BINOP_ASM[instr.binop_op], _store(instr.dest)))
+        elif instr.op == OP_UNOP:
             # dest = op src2
-            self.assembly.append(f"LOAD {instr.src2}")
-            if instr.src1 == '-':
-                self.assembly.append("NEG")
-            elif instr.src1 == '!':
-                self.assembly.append("NOT")
-            self.assembly.append(f"STORE {instr.dest}")
-        elif instr.op == 'jump':
-            self.assembly.append(f"JMP {instr.label}")
-        elif instr.op == 'cjump':
-            self.assembly.append(f"LOAD {instr.dest}")
-            self.assembly.append(f"JTRUE {instr.label}")
-        elif instr.op == 'label':
-            self.assembly.append(f"{instr.label}:")
-        elif instr.op == 'call':
+            if instr.src1 in self._UNOP_ASM:
+                emit((_load(instr.src2), self._UNOP_ASM[instr.src1], _store(instr.dest)))
+            else:
+                emit((_load(instr.src2), _store(instr.dest)))
+        elif instr.op == OP_JUMP:
+            emit((f"JMP {instr.label}",))
+        elif instr.op == OP_CJUMP:
+            emit((_load(instr.dest), f"JTRUE {instr.label}"))
+        elif instr.op == OP_LABEL:
+            emit((f"{instr.label}:",))
+        elif instr.op == OP_CALL:
             # For simplicity, assume functions are handled separately
-            args = instr.src1 or []
-            for arg in args:
-                self.assembly.append(f"PUSH {arg}")
-            self.assembly.append(f"CALL {instr.src2}")
+            emit([f"PUSH {arg}" for arg in instr.args])
             if instr.dest:
-                self.assembly.append(f"STORE {instr.dest}")
-        elif instr.op == 'return':
+                emit((f"CALL {instr.src2}", _store(instr.dest)))
+            else:
+                emit((f"CALL {instr.src2}",))
+        elif instr.op == OP_RETURN:
             if instr.dest:
-                self.assembly.append(f"LOAD {instr.dest}")
-            self.assembly.append("RET")
-        elif instr.op == 'param':
-            self.assembly.append(f"PUSH {instr.dest}")
+                emit((_load(instr.dest), "RET"))
+            else:
+                emit(("RET",))
+        elif instr.op == OP_PARAM:
+            emit((f"PUSH {instr.dest}",))
         # Skip other instructions or add as comments
         else:
-            self.assembly.append(f"; {instr}")
+            emit((f"; {instr}",))
 
 def write_to_file(self, instructions: List[TACInstruction], filename: str):
     """Write the generated assembly to a file."""
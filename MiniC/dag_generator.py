@@ -6,55 +6,87 @@ This module builds a Directed Acyclic Graph (DAG) for expressions
 to facilitate Common Subexpression Elimination (CSE) and other optimizations.
 """
 
-from typing import Dict, List, Tuple, Any
-from MiniC.ir_generator import TACInstruction
+from typing import Dict, List, Tuple, Any, Optional
+from MiniC.ir_generator import TACInstruction, OP_ASSIGN, OP_BINOP, OP_UNOP, QUOTE_CHARS
+from MiniC.bytecode import BINOPS, UNOPS
+
+_BOOL_CONSTANTS = {'True': True, 'False': False}
+
+def parse_constant(operand: str):
+    """Return the value of an int, float or bool literal operand, or None for anything else."""
+    if operand in _BOOL_CONSTANTS:
+        return _BOOL_CONSTANTS[operand]
+    for parse in (int, float):
+        try:
+            return parse(operand)
+        except ValueError:
+            pass
+    return None
+
+def fold_constant(op: str, left: Any, right: Any = None) -> Any:
+    """Return the value an operator yields on constant values, or None if it cannot be folded.
+
+    right is None for unary operators."""
+    try:
+        if right is None:
+            return UNOPS[op](left)
+        return BINOPS[op](left, right)
+    except (KeyError, ArithmeticError):
+        return None  # Unknown operator, division by zero or overflow is left for runtime
 
 class DAGNode:
     """Represents a node in the expression DAG."""
+    __slots__ = ('op', 'left', 'right', 'value', 'users', 'temp_var', '_hash', '_str')
+
     def __init__(self, op: str, left: Any = None, right: Any = None, value: Any = None):
-        self.op = op  # 'const', 'var', or operator like '+', '-', etc.
+        self.op = op  # 'const', 'var', 'literal', or operator like '+', '-', etc.
         self.left = left  # Left child
         self.right = right  # Right child
         self.value = value  # For constants or variables
-        self.users: List[DAGNode] = []  # Nodes that use this node
+        self.users: Dict[DAGNode, None] = {}  # Nodes that use this node, as an ordered set
         self.temp_var = None  # Assigned temporary variable
+        # op, children and value never change after construction, so hash once
+        self._hash = hash((op, id(left), id(right), value))
+        self._str: Optional[str] = None  # Rendered on first str()
 
+    # Children are unique per subexpression (hash-consed by DAGGenerator),
+    # so comparing them by identity is enough and keeps hashing O(1).
     def __eq__(self, other):
         if not isinstance(other, DAGNode):
             return False
         return (self.op == other.op and
-                self.left == other.left and
-                self.right == other.right and
+                self.left is other.left and
+                self.right is other.right and
                 self.value == other.value)
 
     def __hash__(self):
-        return hash((self.op, self.left, self.right, self.value))
+        return self._hash
 
     def __str__(self):
-        if self.op == 'const':
-            return str(self.value)
-        elif self.op == 'var':
-            return self.value
-        elif self.op in ('+', '-', '*', '/', '%', '&&', '||', '<', '>', '<=', '>=', '==', '!='):
-            return f"({self.left} {self.op} {self.right})"
-        elif self.op in ('-', '!'):
-            return f"({self.op} {self.left})"
-        else:
-            return f"{self.op}({self.left}, {self.right})"
+        if self._str is None:
+            if self.op in ('const', 'var', 'literal'):
+                self._str = self.value
+            elif self.right is not None:
+                self._str = f"({self.left} {self.op} {self.right})"
+            else:
+                self._str = f"({self.op} {self.left})"
+        return self._str
 
 class DAGGenerator:
     """Generates DAG from TAC instructions for expression optimization."""
 
     def __init__(self):
-        self.nodes: Dict[Tuple, DAGNode] = {}  # Map from (op, left, right) to node
+        self.nodes: Dict[Tuple, DAGNode] = {}  # Map from (op, id(left), id(right), value) to node
         self.var_to_node: Dict[str, DAGNode] = {}  # Variable to its current node
         self.node_list: List[DAGNode] = []
+        self.node_temps: Dict[DAGNode, List[str]] = {}  # Temps each operator node was computed into
 
     def build_dag(self, instructions: List[TACInstruction]) -> List[DAGNode]:
         """Build DAG from TAC instructions."""
         self.nodes = {}
         self.var_to_node = {}
         self.node_list = []
+        self.node_temps = {}
 
         for instr in instructions:
             self.process_instruction(instr)
@@ -63,33 +95,28 @@ class DAGGenerator:
 
     def process_instruction(self, instr: TACInstruction):
         """Process a single TAC instruction and add to DAG."""
-        if instr.op == 'assign':
+        if instr.op == OP_ASSIGN:
             # dest = src1
-            if instr.src1 in self.var_to_node:
-                node = self.var_to_node[instr.src1]
-            else:
-                # Assume src1 is a constant or variable
-                node = self.get_or_create_node('var', value=instr.src1)
+            node = self.get_operand_node(instr.src1)
             self.var_to_node[instr.dest] = node
             node.temp_var = instr.dest
 
-        elif instr.op == 'binop':
+        elif instr.op == OP_BINOP:
             # dest = src1 op src2
-            parts = instr.src2.split(' ', 1)
-            op = parts[0]
-            right_operand = parts[1]
             left_node = self.get_operand_node(instr.src1)
-            right_node = self.get_operand_node(right_operand)
-            node = self.get_or_create_node(op, left_node, right_node)
+            right_node = self.get_operand_node(instr.binop_right)
+            node = self.get_or_create_node(instr.binop_op, left_node, right_node)
             self.var_to_node[instr.dest] = node
             node.temp_var = instr.dest
+            self.node_temps.setdefault(node, []).append(instr.dest)
 
-        elif instr.op == 'unop':
+        elif instr.op == OP_UNOP:
             # dest = op src2
             operand_node = self.get_operand_node(instr.src2)
             node = self.get_or_create_node(instr.src1, operand_node)  # op is src1
             self.var_to_node[instr.dest] = node
             node.temp_var = instr.dest
+            self.node_temps.setdefault(node, []).append(instr.dest)
 
         # For control flow, labels, jumps, etc., we can skip or handle differently
         # For now, focus on expressions
@@ -98,31 +125,44 @@ class DAGGenerator:
         """Get the DAG node for an operand (variable or constant)."""
         if operand in self.var_to_node:
             return self.var_to_node[operand]
-        else:
-            # Assume it's a constant or new variable
-            return self.get_or_create_node('var', value=operand)
+        if operand[0] in QUOTE_CHARS:
+            # A char or string literal: never folded, and never the same node as a variable
+            return self.get_or_create_node('literal', value=operand)
+        if parse_constant(operand) is not None:
+            return self.get_or_create_node('const', value=operand)
+        # A variable whose value comes from outside the DAG
+        return self.get_or_create_node('var', value=operand)
+
+    def fold(self, op: str, left: DAGNode, right: Optional[DAGNode]) -> Optional[str]:
+        """Return the constant an operator yields on constant children, or None if it cannot be folded."""
+        if left.op != 'const' or (right is not None and right.op != 'const'):
+            return None
+        result = fold_constant(op, parse_constant(left.value),
+                               parse_constant(right.value) if right is not None else None)
+        # Comparisons yield bools; keep them as the 'True'/'False' operands the IR uses
+        return None if result is None else str(result)
 
     def get_or_create_node(self, op: str, left: DAGNode = None, right: DAGNode = None, value: Any = None) -> DAGNode:
-        """Get existing node or create new one."""
-        key = (op, left, right, value)
+        """Get existing node or create new one, folding operators on constants."""
+        if left is not None:
+            folded = self.fold(op, left, right)
+            if folded is not None:
+                return self.get_or_create_node('const', value=folded)
+        key = (op, id(left), id(right), value)
         if key in self.nodes:
             return self.nodes[key]
         node = DAGNode(op, left, right, value)
         self.nodes[key] = node
         self.node_list.append(node)
         if left:
-            left.users.append(node)
+            left.users[node] = None
         if right:
-            right.users.append(node)
+            right.users[node] = None
         return node
 
     def detect_cse(self) -> Dict[DAGNode, List[str]]:
-        """Detect common subexpressions by finding nodes with multiple users."""
-        cse = {}
-        for node in self.node_list:
-            if len(node.users) > 1 and node.temp_var:
-                cse[node] = [node.temp_var] + [u.temp_var for u in node.users if u.temp_var]
-        return cse
+        """Detect common subexpressions: nodes computed into more than one temp, with the temps in order."""
+        return {node: temps for node, temps in self.node_temps.items() if len(temps) > 1}
 
 def print_dag(self) -> str:
     """Print the DAG structure."""
@@ -1,19 +1,26 @@
 # interpreter.py
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple, Callable, Optional
 from MiniC.ast_nodes import *
-from MiniC.semantic import SemanticError
+from MiniC.bytecode import *
+from MiniC.numba_codegen import jit_function, UnsupportedConstruct
 
-class ReturnException(Exception):
-    """Exception for handling return statements in interpretation."""
-    def __init__(self, value):
-        self.value = value
+MAX_CALL_DEPTH = 10000  # Deepest MiniC call chain before a RecursionError
 
 class Interpreter:
-    """Interprets MiniC programs by executing the AST."""
-    def __init__(self, program: Program):
-        """Initialize interpreter with the program AST."""
+    """Interprets MiniC programs by executing compiled bytecode."""
+    def __init__(self, program: Program, jit: bool = False,
+                 natives: Optional[Dict[str, Callable]] = None):
+        """Initialize interpreter with the program AST; jit enables numba for leaf functions.
+
+        natives maps function names to precompiled machine code (see llvm_backend)."""
         self.program = program
+        self.jit = jit
         self.functions: Dict[str, Function] = {f.name: f for f in program.functions}
+        # Compile everything up front so call targets resolve at load time
+        for func in self.functions.values():
+            self.compile_function(func)
+        for name, native in (natives or {}).items():
+            self.functions[name].code.native = native
 
     def run(self, argv=None):
         """Run the main function and return its result."""
@@ -22,182 +29,129 @@ class Interpreter:
         mainf = self.functions['main']
         return self.exec_function(mainf, [])
 
-    def exec_function(self, func: Function, args: List[Any]):
-        """Execute a function with given arguments."""
-        env: Dict[str, Any] = {}
-        for (typ,name), val in zip(func.params, args):
-            env[name] = val
+    def compile_function(self, func: Function) -> CodeObject:
+        """Return the bytecode for a function, compiling it on first use."""
+        if func.code is None:
+            func.code = Compiler(self.functions).compile_function(func)
+        if self.jit and func.code.native is None:
+            func.code.native = jit_function(func)
+        return func.code
+
+    @staticmethod
+    def call_native(code: CodeObject, args: List[Any]):
+        """Run a function's native code; returns UNDEF if the bytecode has to run the call instead."""
         try:
-            self.exec_block(func.body, env)
-        except ReturnException as r:
-            return r.value
-        return None
-
-    def exec_block(self, block: Block, env: Dict[str, Any]):
-        for stmt in block.statements:
-            self.exec_stmt(stmt, env)
-
-    def exec_stmt(self, stmt, env):
-        if isinstance(stmt, VarDecl):
-            val = None
-            if stmt.init is not None:
-                val = self.eval_expr(stmt.init, env)
-            env[stmt.name] = val
-            return
-
-        if isinstance(stmt, Assignment):
-            val = self.eval_expr(stmt.value, env)
-            if stmt.target not in env:
-                raise Exception(f"Assignment to undeclared variable {stmt.target}")
-            env[stmt.target] = val
-            return
-
-        if isinstance(stmt, IfStmt):
-            cond = self.eval_expr(stmt.cond, env)
-            if cond:
-                if isinstance(stmt.then_branch, Block):
-                    self.exec_block(stmt.then_branch, env)
-                else:
-                    self.exec_stmt(stmt.then_branch, env)
-            elif stmt.else_branch:
-                if isinstance(stmt.else_branch, Block):
-                    self.exec_block(stmt.else_branch, env)
-                else:
-                    self.exec_stmt(stmt.else_branch, env)
-            return
-
-        if isinstance(stmt, WhileStmt):
-            while self.eval_expr(stmt.cond, env):
-                if isinstance(stmt.body, Block):
-                    self.exec_block(stmt.body, env)
-                else:
-                    self.exec_stmt(stmt.body, env)
-            return
+            return code.native(*args)
+        except (TypeError, ArithmeticError, UnsupportedConstruct):
+            # Arguments the native code cannot take, or a result it cannot
+            # represent; native functions have no side effects, so run the
+            # bytecode instead, which also raises the interpreter's own errors
+            return UNDEF
 
-        if isinstance(stmt, ForStmt):
-            if stmt.init:
-                if isinstance(stmt.init, VarDecl):
-                    self.exec_stmt(stmt.init, env)
-                else:
-                    self.exec_stmt(stmt.init, env)
-            while True:
-                if stmt.cond and not self.eval_expr(stmt.cond, env):
-                    break
-                if isinstance(stmt.body, Block):
-                    self.exec_block(stmt.body, env)
+    def exec_function(self, func: Function, args: List[Any]):
+        """Execute a function with given arguments.
+
+        Calls between MiniC functions do not recurse in Python: the caller's
+        state is pushed on a frame stack and the same loop runs the callee.
+        """
+        code = self.compile_function(func)
+        if code.native is not None:
+            result = self.call_native(code, args)
+            if result is not UNDEF:
+                return result
+        instructions = code.instructions
+        env: List[Any] = [UNDEF] * code.n_locals
+        for slot, val in zip(code.param_slots, args):
+            env[slot] = val
+        stack: List[Any] = []
+        pc = 0
+        frames: List[Tuple[CodeObject, List[Any], List[Any], int]] = []  # Suspended callers
+        call_native = self.call_native
+        # stack.append/stack.pop are left as method calls on purpose: CPython
+        # specializes them in place, which beats calling hoisted bound methods.
+        while True:
+            op, arg = instructions[pc]
+            pc += 1
+            if op == LOAD_LOCAL:
+                val = env[arg]
+                if val is UNDEF:
+                    raise Exception(f'Use of undeclared variable {code.local_names[arg]}')
+                stack.append(val)
+            elif op == LOAD_CONST:
+                stack.append(arg)
+            elif op == STORE_LOCAL:
+                env[arg] = stack.pop()
+            elif op == BINARY_OP:
+                r = stack.pop()
+                stack[-1] = arg(stack[-1], r)
+            elif op == FOR_ITER:
+                val = next(stack[-1], UNDEF)
+                if val is UNDEF:
+                    # Leave the counter at the first value that failed the loop condition
+                    stack.pop()
+                    env[arg[0]] = stack.pop()
+                    pc = arg[1]
                 else:
-                    self.exec_stmt(stmt.body, env)
-                if stmt.update:
-                    if isinstance(stmt.update, Assignment):
-                        self.exec_stmt(stmt.update, env)
-                    else:
-                        self.eval_expr(stmt.update, env)
-            return
-
-        if isinstance(stmt, ReturnStmt):
-            val = None
-            if stmt.expr:
-                val = self.eval_expr(stmt.expr, env)
-            raise ReturnException(val)
-
-        if isinstance(stmt, FuncCall):
-            if stmt.name == 'print':
-                vals = [self.eval_expr(a, env) for a in stmt.args]
-                print(*vals)
-                return
-            if stmt.name == 'read':
-                if not stmt.args or not isinstance(stmt.args[0], VarRef):
-                    raise Exception('read expects a variable')
-                name = stmt.args[0].name
-                if name not in env:
-                    raise Exception(f'read on undeclared variable {name}')
-                v = input()
-                try:
-                    if '.' in v:
-                        env[name] = float(v)
-                    else:
-                        env[name] = int(v)
-                except:
-                    env[name] = v
-                return
-            # user function
-            f = self.functions.get(stmt.name)
-            if not f:
-                raise Exception(f'Call to undefined function {stmt.name}')
-            argvals = [self.eval_expr(a, env) for a in stmt.args]
-            return self.exec_function(f, argvals)
-
-        if isinstance(stmt, Block):
-            self.exec_block(stmt, env)
-            return
-
-        # expression statement
-        if isinstance(stmt, (Expr, UnaryExpr, Literal, VarRef, FuncCall, Assignment)):
-            self.eval_expr(stmt, env)
-            return
-
-        raise Exception(f'Unhandled statement in interpreter: {stmt}')
-
-    def eval_expr(self, expr, env):
-        if isinstance(expr, Literal):
-            return expr.value
-        if isinstance(expr, VarRef):
-            if expr.name not in env:
-                raise Exception(f'Use of undeclared variable {expr.name}')
-            return env[expr.name]
-        if isinstance(expr, Assignment):
-            val = self.eval_expr(expr.value, env)
-            if expr.target not in env:
-                raise Exception(f'Assignment to undeclared variable {expr.target}')
-            env[expr.target] = val
-            return val
-        if isinstance(expr, UnaryExpr):
-            v = self.eval_expr(expr.expr, env)
-            if expr.op == '-':
-                return -v
-            if expr.op == '+':
-                return +v
-            if expr.op == '!':
-                return not v
-            return v
-        if isinstance(expr, Expr):
-            l = self.eval_expr(expr.left, env)
-            r = self.eval_expr(expr.right, env)
-            op = expr.op
-            if op == '+': return l + r
-            if op == '-': return l - r
-            if op == '*': return l * r
-            if op == '/': return l / r
-            if op == '%': return l % r
-            if op == '<': return l < r
-            if op == '>': return l > r
-            if op == '<=': return l <= r
-            if op == '>=': return l >= r
-            if op == '==': return l == r
-            if op == '!=': return l != r
-            if op == '&&': return l and r
-            if op == '||': return l or r
-            return None
-        if isinstance(expr, FuncCall):
-            if expr.name == 'print':
-                vals = [self.eval_expr(a, env) for a in expr.args]
+                    env[arg[0]] = val
+            elif op == JUMP_IF_TRUE:
+                if stack.pop():
+                    pc = arg
+            elif op == JUMP_IF_FALSE:
+                if not stack.pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == POP:
+                stack.pop()
+            elif op == DUP_TOP:
+                stack.append(stack[-1])
+            elif op == UNARY_OP:
+                stack[-1] = arg(stack[-1])
+            elif op == CALL:
+                f, nargs = arg
+                argvals = stack[len(stack) - nargs:]
+                del stack[len(stack) - nargs:]
+                callee = f.code
+                if callee.native is not None:
+                    result = call_native(callee, argvals)
+                    if result is not UNDEF:
+                        stack.append(result)
+                        continue
+                if len(frames) >= MAX_CALL_DEPTH:
+                    raise RecursionError('maximum recursion depth exceeded')
+                frames.append((code, env, stack, pc))
+                code = callee
+                instructions = code.instructions
+                env = [UNDEF] * code.n_locals
+                for slot, val in zip(code.param_slots, argvals):
+                    env[slot] = val
+                stack = []
+                pc = 0
+            elif op == PRINT:
+                vals = stack[len(stack) - arg:]
+                del stack[len(stack) - arg:]
                 print(*vals)
-                return None
-            if expr.name == 'read':
-                if not expr.args or not isinstance(expr.args[0], VarRef):
-                    raise Exception('read expects a variable')
-                name = expr.args[0].name
+            elif op == READ:
                 v = input()
                 try:
                     if '.' in v:
-                        return float(v)
+                        stack.append(float(v))
                     else:
-                        return int(v)
-                except:
-                    return v
-            f = self.functions.get(expr.name)
-            if not f:
-                raise Exception(f'Call to undefined function {expr.name}')
-            argvals = [self.eval_expr(a, env) for a in expr.args]
-            return self.exec_function(f, argvals)
-        raise Exception(f'Unhandled expression in interpreter: {expr}')
+                        stack.append(int(v))
+                except ValueError:
+                    stack.append(v)
+            elif op == RETURN:
+                result = stack.pop()
+                if not frames:
+                    return result
+                code, env, stack, pc = frames.pop()
+                instructions = code.instructions
+                stack.append(result)
+            elif op == FOR_RANGE:
+                slot, step, cond_op = arg
+                start = env[slot]
+                counter = range(start, range_stop(cond_op, stack.pop()), step)
+                stack.append(start + len(counter) * step)
+                stack.append(iter(counter))
+            else:
+                raise Exception(f'Unknown opcode {op}')
@@ -7,50 +7,92 @@ TAC is a linear representation of the program where each instruction
 has at most three operands: two sources and one destination.
 """
 
-from typing import List, Dict, Any, Optional
+import sys
+from typing import List, Dict, Tuple, Any, Optional
 from MiniC.ast_nodes import *
 
+def _intern(value):
+    """Intern operand strings; call arguments are lists and pass through."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+# Integer op-codes for TACInstruction.op; comparing ints is cheaper than comparing strings
+OP_ASSIGN, OP_BINOP, OP_UNOP, OP_JUMP, OP_CJUMP, OP_LABEL, OP_CALL, OP_RETURN, OP_PARAM = range(9)
+
+OP_NAMES = ('assign', 'binop', 'unop', 'jump', 'cjump', 'label', 'call', 'return', 'param')
+
+# Bitmask of op-codes that write dest, tested as (1 << instr.op) & DEFINES_DEST
+DEFINES_DEST = (1 << OP_ASSIGN) | (1 << OP_BINOP) | (1 << OP_UNOP) | (1 << OP_CALL)
+
+CONST_TYPES = ('int', 'float', 'bool')  # Literal types the optimizer can compute with
+
+# Char and string literals keep their quotes in the TAC, so 'a' and "x" can
+# never be mistaken for the variables a and x, nor '5' for the int 5
+QUOTES = {'char': "'", 'string': '"'}
+QUOTE_CHARS = frozenset(QUOTES.values())
+
 class TACInstruction:
     """Represents a single TAC instruction."""
-    def __init__(self, op: str, dest: Optional[str] = None, src1: Optional[str] = None,
-                 src2: Optional[str] = None, label: Optional[str] = None):
-        self.op = op  # Operation: 'assign', 'binop', 'unop', 'jump', 'cjump', 'label', 'call', 'return', 'param'
-        self.dest = dest  # Destination operand
-        self.src1 = src1  # First source operand
-        self.src2 = src2  # Second source operand
-        self.label = label  # Label for jumps
+    __slots__ = ('op', 'dest', 'src1', 'src2', 'label', 'binop_op', 'binop_right',
+                 'src1_const', 'src2_const', 'binop_right_const', 'args')
+
+    def __init__(self, op: int, dest: Optional[str] = None, src1: Optional[str] = None,
+                 src2: Optional[str] = None, label: Optional[str] = None,
+                 binop_op: Optional[str] = None, binop_right: Optional[str] = None,
+                 src1_const: Any = None, src2_const: Any = None, binop_right_const: Any = None,
+                 args: Tuple[str, ...] = ()):
+        self.op = op  # Operation, one of the OP_* codes
+        self.dest = _intern(dest)  # Destination operand
+        self.src1 = _intern(src1)  # First source operand
+        self.src2 = _intern(src2)  # Second source operand
+        self.label = _intern(label)  # Label for jumps
+        self.binop_op = _intern(binop_op)  # Operator of a binop, e.g. '+'
+        self.binop_right = _intern(binop_right)  # Right operand of a binop
+        # Values of operands known to be int/float/bool constants, None otherwise
+        self.src1_const = src1_const
+        self.src2_const = src2_const
+        self.binop_right_const = binop_right_const
+        self.args = args  # Argument operands of a call
 
     def __str__(self):
-        if self.op == 'label':
-            return f"{self.label}:"
-        elif self.op == 'assign':
-            return f"{self.dest} = {self.src1}"
-        elif self.op == 'binop':
-            return f"{self.dest} = {self.src1} {self.src2}"
-        elif self.op == 'unop':
-            return f"{self.dest} = {self.src1} {self.src2}"
-        elif self.op == 'jump':
-            return f"goto {self.label}"
-        elif self.op == 'cjump':
-            return f"if {self.dest} goto {self.label}"
-        elif self.op == 'call':
-            args_str = ', '.join(self.src1) if self.src1 else ''
-            return f"{self.dest} = call {self.src2}({args_str})"
-        elif self.op == 'return':
-            return f"return {self.dest}" if self.dest else "return"
-        elif self.op == 'param':
-            return f"param {self.dest}"
-        else:
-            return f"{self.op} {self.dest} {self.src1} {self.src2}"
+        return _FORMATTERS[self.op](self)
+
+# Text of each kind of instruction, indexed by op-code
+_FORMATTERS = (
+    lambda i: f"{i.dest} = {i.src1}",                                # OP_ASSIGN
+    lambda i: f"{i.dest} = {i.src1} {i.binop_op} {i.binop_right}",   # OP_BINOP
+    lambda i: f"{i.dest} = {i.src1} {i.src2}",                       # OP_UNOP
+    lambda i: f"goto {i.label}",                                     # OP_JUMP
+    lambda i: f"if {i.dest} goto {i.label}",                         # OP_CJUMP
+    lambda i: f"{i.label}:",                                         # OP_LABEL
+    lambda i: f"{i.dest} = call {i.src2}({', '.join(i.args)})",            # OP_CALL
+    lambda i: f"return {i.dest}" if i.dest else "return",           # OP_RETURN
+    lambda i: f"param {i.dest}",                                     # OP_PARAM
+)
 
 class IRGenerator:
     """Generates TAC from AST."""
 
     def __init__(self):
         self.instructions: List[TACInstruction] = []
+        self._emit = self.instructions.append  # Bound once; emitting is the hottest call here
         self.temp_count = 0
         self.label_count = 0
         self.symbol_table: Dict[str, str] = {}  # var name to type
+        # Temps already holding a pure expression in the current basic block, keyed by
+        # operator and operands; variable operands carry their version, so a key goes
+        # stale as soon as the variable is assigned
+        self._expr_cache: Dict[tuple, str] = {}
+        self._versions: Dict[str, int] = {}  # var name to number of assignments so far
+        # Handlers by exact node type; no AST class has subclasses
+        self._stmt_handlers = {
+            Block: self._gen_block, VarDecl: self._gen_vardecl, Assignment: self._gen_assignment,
+            IfStmt: self._gen_if, WhileStmt: self._gen_while, ForStmt: self._gen_for,
+            ReturnStmt: self._gen_return, FuncCall: self._gen_expression_stmt, Expr: self._gen_expression_stmt,
+        }
+        self._expr_handlers = {
+            Literal: self._enter_literal, VarRef: self._enter_var, UnaryExpr: self._enter_unary,
+            Expr: self._enter_binary, Assignment: self._enter_assignment, FuncCall: self._enter_call,
+        }
 
     def new_temp(self) -> str:
         """Generate a new temporary variable."""
@@ -62,9 +104,24 @@ class IRGenerator:
         self.label_count += 1
         return f"L{self.label_count}"
 
+    def emit_label(self, label: str):
+        """Emit a label; it starts a new basic block, so cached expressions are forgotten."""
+        self._emit(TACInstruction(OP_LABEL, label=label))
+        self._expr_cache.clear()
+
+    def emit_assign(self, dest: str, src: str):
+        """Emit an assignment to a variable, invalidating cached expressions that read it."""
+        self._emit(TACInstruction(OP_ASSIGN, dest=dest, src1=src))
+        self.assigned(dest)
+
+    def assigned(self, name: str):
+        """Record a write to a variable."""
+        self._versions[name] = self._versions.get(name, 0) + 1
+
     def generate(self, program: Program) -> List[TACInstruction]:
         """Generate TAC for the entire program."""
         self.instructions = []
+        self._emit = self.instructions.append
         self.temp_count = 0
         self.label_count = 0
         for func in program.functions:
@@ -74,7 +131,7 @@ class IRGenerator:
     def generate_function(self, func: Function):
         """Generate TAC for a function."""
         # Function label
-        self.instructions.append(TACInstruction('label', label=func.name))
+        self.emit_label(func.name)
         # Parameters
         for typ, name in func.params:
             self.symbol_table[name] = typ
@@ -82,103 +139,198 @@ class IRGenerator:
         self.generate_statement(func.body)
         # Implicit return if void
         if func.ret_type == 'void':
-            self.instructions.append(TACInstruction('return'))
+            self._emit(TACInstruction(OP_RETURN))
 
     def generate_statement(self, stmt):
-        """Generate TAC for a statement."""
-        if isinstance(stmt, Block):
-            for s in stmt.statements:
-                self.generate_statement(s)
-        elif isinstance(stmt, VarDecl):
-            if stmt.init:
-                temp = self.generate_expression(stmt.init)
-                self.instructions.append(TACInstruction('assign', dest=stmt.name, src1=temp))
-            self.symbol_table[stmt.name] = stmt.var_type
-        elif isinstance(stmt, Assignment):
-            temp = self.generate_expression(stmt.value)
-            self.instructions.append(TACInstruction('assign', dest=stmt.target, src1=temp))
-        elif isinstance(stmt, IfStmt):
-            cond_temp = self.generate_expression(stmt.cond)
-            else_label = self.new_label()
-            end_label = self.new_label()
-            self.instructions.append(TACInstruction('cjump', dest=cond_temp, label=else_label))
-            self.generate_statement(stmt.then_branch)
-            self.instructions.append(TACInstruction('jump', label=end_label))
-            self.instructions.append(TACInstruction('label', label=else_label))
-            if stmt.else_branch:
-                self.generate_statement(stmt.else_branch)
-            self.instructions.append(TACInstruction('label', label=end_label))
-        elif isinstance(stmt, WhileStmt):
-            start_label = self.new_label()
-            end_label = self.new_label()
-            self.instructions.append(TACInstruction('label', label=start_label))
+        """Generate TAC for a statement.
+
+        Nested statements are handled with an explicit work list instead of
+        recursion. Each entry is a (method, argument) pair; a statement pushes
+        the work that follows its children, such as closing labels, above them.
+        """
+        work = self._stmt_work = [(self.expand_statement, stmt)]
+        while work:
+            handler, arg = work.pop()
+            handler(arg)
+
+    def expand_statement(self, stmt):
+        """Emit the code that comes before a statement's children and queue the rest."""
+        handler = self._stmt_handlers.get(type(stmt))
+        if handler is not None:  # Other expression statements have no effect
+            handler(stmt)
+
+    def _gen_block(self, stmt: Block):
+        self._stmt_work.extend((self.expand_statement, s) for s in reversed(stmt.statements))
+
+    def _gen_vardecl(self, stmt: VarDecl):
+        if stmt.init:
+            temp = self.generate_expression(stmt.init)
+            self.emit_assign(stmt.name, temp)
+        self.symbol_table[stmt.name] = stmt.var_type
+
+    def _gen_assignment(self, stmt: Assignment):
+        temp = self.generate_expression(stmt.value)
+        self.emit_assign(stmt.target, temp)
+
+    def _gen_if(self, stmt: IfStmt):
+        work = self._stmt_work
+        cond_temp = self.generate_expression(stmt.cond)
+        else_label = self.new_label()
+        end_label = self.new_label()
+        self._emit(TACInstruction(OP_CJUMP, dest=cond_temp, label=else_label))
+        work.append((self.emit_label, end_label))
+        if stmt.else_branch:
+            work.append((self.expand_statement, stmt.else_branch))
+        work.append((self.emit_label, else_label))
+        work.append((self.emit_jump, end_label))
+        work.append((self.expand_statement, stmt.then_branch))
+
+    def _gen_while(self, stmt: WhileStmt):
+        work = self._stmt_work
+        start_label = self.new_label()
+        end_label = self.new_label()
+        self.emit_label(start_label)
+        cond_temp = self.generate_expression(stmt.cond)
+        self._emit(TACInstruction(OP_CJUMP, dest=cond_temp, label=end_label))
+        work.append((self.emit_label, end_label))
+        work.append((self.emit_jump, start_label))
+        work.append((self.expand_statement, stmt.body))
+
+    def _gen_for(self, stmt: ForStmt):
+        # Labels are numbered after the init statement's, so start the loop once it is done
+        self._stmt_work.append((self.expand_for_loop, stmt))
+        if stmt.init:
+            self._stmt_work.append((self.expand_statement, stmt.init))
+
+    def _gen_return(self, stmt: ReturnStmt):
+        if stmt.expr:
+            temp = self.generate_expression(stmt.expr)
+            self._emit(TACInstruction(OP_RETURN, dest=temp))
+        else:
+            self._emit(TACInstruction(OP_RETURN))
+
+    def _gen_expression_stmt(self, stmt):
+        self.generate_expression(stmt)  # For side effects
+
+    def expand_for_loop(self, stmt: ForStmt):
+        """Emit a for loop's head and queue its body, update and exit."""
+        work = self._stmt_work
+        start_label = self.new_label()
+        end_label = self.new_label()
+        self.emit_label(start_label)
+        if stmt.cond:
             cond_temp = self.generate_expression(stmt.cond)
-            self.instructions.append(TACInstruction('cjump', dest=cond_temp, label=end_label))
-            self.generate_statement(stmt.body)
-            self.instructions.append(TACInstruction('jump', label=start_label))
-            self.instructions.append(TACInstruction('label', label=end_label))
-        elif isinstance(stmt, ForStmt):
-            if stmt.init:
-                self.generate_statement(stmt.init)
-            start_label = self.new_label()
-            end_label = self.new_label()
-            self.instructions.append(TACInstruction('label', label=start_label))
-            if stmt.cond:
-                cond_temp = self.generate_expression(stmt.cond)
-                self.instructions.append(TACInstruction('cjump', dest=cond_temp, label=end_label))
-            self.generate_statement(stmt.body)
-            if stmt.update:
-                self.generate_expression(stmt.update)  # For side effects
-            self.instructions.append(TACInstruction('jump', label=start_label))
-            self.instructions.append(TACInstruction('label', label=end_label))
-        elif isinstance(stmt, ReturnStmt):
-            if stmt.expr:
-                temp = self.generate_expression(stmt.expr)
-                self.instructions.append(TACInstruction('return', dest=temp))
-            else:
-                self.instructions.append(TACInstruction('return'))
-        elif isinstance(stmt, FuncCall):
-            self.generate_func_call(stmt)
-        elif isinstance(stmt, Expr):
-            self.generate_expression(stmt)  # For side effects
+            self._emit(TACInstruction(OP_CJUMP, dest=cond_temp, label=end_label))
+        work.append((self.emit_label, end_label))
+        work.append((self.emit_jump, start_label))
+        if stmt.update:
+            work.append((self.generate_expression, stmt.update))  # For side effects
+        work.append((self.expand_statement, stmt.body))
+
+    def emit_jump(self, label: str):
+        """Emit an unconditional jump."""
+        self._emit(TACInstruction(OP_JUMP, label=label))
 
     def generate_expression(self, expr) -> str:
-        """Generate TAC for an expression and return the temp holding the result."""
-        if isinstance(expr, Literal):
-            temp = self.new_temp()
-            self.instructions.append(TACInstruction('assign', dest=temp, src1=str(expr.value)))
-            return temp
-        elif isinstance(expr, VarRef):
-            return expr.name
-        elif isinstance(expr, UnaryExpr):
-            src_temp = self.generate_expression(expr.expr)
-            temp = self.new_temp()
-            self.instructions.append(TACInstruction('unop', dest=temp, src1=expr.op, src2=src_temp))
-            return temp
-        elif isinstance(expr, Expr):
-            left_temp = self.generate_expression(expr.left)
-            right_temp = self.generate_expression(expr.right)
-            temp = self.new_temp()
-            self.instructions.append(TACInstruction('binop', dest=temp, src1=left_temp, src2=f"{expr.op} {right_temp}"))
-            return temp
-        elif isinstance(expr, Assignment):
-            value_temp = self.generate_expression(expr.value)
-            self.instructions.append(TACInstruction('assign', dest=expr.target, src1=value_temp))
-            return expr.target
-        elif isinstance(expr, FuncCall):
-            return self.generate_func_call(expr)
-        else:
+        """Generate TAC for an expression and return the temp holding the result.
+
+        Sub-expressions are walked with an explicit task stack instead of
+        recursion: entering a node queues the step that emits it, then its
+        operands, and each finished operand leaves its temp on a value stack.
+        """
+        tasks = self._task_stack = [(self.enter_expression, expr)]
+        values = self._val_stack = []
+        while tasks:
+            handler, node = tasks.pop()
+            handler(node)
+        return values.pop()
+
+    def enter_expression(self, expr):
+        """Queue the work for one expression node, or push its temp if it needs none."""
+        handler = self._expr_handlers.get(type(expr))
+        if handler is None:
             raise ValueError(f"Unsupported expression type: {type(expr)}")
+        handler(expr)
+
+    def _enter_literal(self, expr: Literal):
+        self._val_stack.append(self.emit_literal(expr))
+
+    def _enter_var(self, expr: VarRef):
+        self._val_stack.append(expr.name)
+
+    def _enter_unary(self, expr: UnaryExpr):
+        self._task_stack.append((self.emit_unary, expr))
+        self._task_stack.append((self.enter_expression, expr.expr))
+
+    def _enter_binary(self, expr: Expr):
+        tasks = self._task_stack
+        tasks.append((self.emit_binary, expr))
+        tasks.append((self.enter_expression, expr.right))
+        tasks.append((self.enter_expression, expr.left))
+
+    def _enter_assignment(self, expr: Assignment):
+        self._task_stack.append((self.emit_assignment, expr))
+        self._task_stack.append((self.enter_expression, expr.value))
+
+    def _enter_call(self, expr: FuncCall):
+        # Each argument is followed by its param, then the call
+        tasks = self._task_stack
+        tasks.append((self.emit_call, expr))
+        for arg in reversed(expr.args):
+            tasks.append((self.emit_param, arg))
+            tasks.append((self.enter_expression, arg))
+
+    def emit_literal(self, expr: Literal) -> str:
+        """Load a literal into a temp, reusing one that already holds it."""
+        key = (expr.typ, str(expr.value))
+        if key in self._expr_cache:
+            return self._expr_cache[key]
+        temp = self._expr_cache[key] = self.new_temp()
+        if expr.typ in QUOTES:
+            quote = QUOTES[expr.typ]
+            self._emit(TACInstruction(OP_ASSIGN, dest=temp, src1=f"{quote}{expr.value}{quote}"))
+        else:
+            value = expr.value if expr.typ in CONST_TYPES else None
+            self._emit(TACInstruction(OP_ASSIGN, dest=temp, src1=str(expr.value), src1_const=value))
+        return temp
+
+    def emit_unary(self, expr: UnaryExpr):
+        src_temp = self._val_stack.pop()
+        key = (expr.op, src_temp, self._versions.get(src_temp, 0))
+        if key not in self._expr_cache:
+            self._expr_cache[key] = temp = self.new_temp()
+            self._emit(TACInstruction(OP_UNOP, dest=temp, src1=expr.op, src2=src_temp))
+        self._val_stack.append(self._expr_cache[key])
+
+    def emit_binary(self, expr: Expr):
+        right_temp = self._val_stack.pop()
+        left_temp = self._val_stack.pop()
+        key = (expr.op, left_temp, self._versions.get(left_temp, 0),
+               right_temp, self._versions.get(right_temp, 0))
+        if key not in self._expr_cache:
+            self._expr_cache[key] = temp = self.new_temp()
+            self._emit(TACInstruction(OP_BINOP, dest=temp, src1=left_temp,
+                                      binop_op=expr.op, binop_right=right_temp))
+        self._val_stack.append(self._expr_cache[key])
+
+    def emit_assignment(self, expr: Assignment):
+        self.emit_assign(expr.target, self._val_stack.pop())
+        self._val_stack.append(expr.target)
+
+    def emit_param(self, arg):
+        self._emit(TACInstruction(OP_PARAM, dest=self._val_stack[-1]))
+
+    def emit_call(self, call: FuncCall):
+        values = self._val_stack
+        arg_temps = tuple(values[len(values) - len(call.args):])
+        del values[len(values) - len(call.args):]
+        if call.name == 'read':
+            for name in arg_temps:
+                self.assigned(name)  # read() stores into its arguments
+        temp = self.new_temp()
+        self._emit(TACInstruction(OP_CALL, dest=temp, src2=call.name, args=arg_temps))
+        values.append(temp)
 
     def generate_func_call(self, call: FuncCall) -> str:
         """Generate TAC for a function call."""
-        # Push parameters
-        arg_temps = []
-        for arg in call.args:
-            arg_temp = self.generate_expression(arg)
-            arg_temps.append(arg_temp)
-            self.instructions.append(TACInstruction('param', dest=arg_temp))
-        # Call
-        temp = self.new_temp()
-        self.instructions.append(TACInstruction('call', dest=temp, src2=call.name, src1=arg_temps))
-        return temp
\ No newline at end of file
+        return self.generate_expression(call)
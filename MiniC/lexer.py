@@ -1,30 +1,19 @@
 # lexer.py
 import re
-from dataclasses import dataclass
-from typing import List, Optional
+import sys
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 
 TokenSpec = [
     (r"[ \t\r\n]+",              None),        # whitespace
     (r"//[^\n]*",                None),  # safer: match everything until newline
-    (r"/\*.*?\*/",               None),        # block comment (non-greedy)
-    (r"\bint\b",                 'INT_KW'),
-    (r"\bfloat\b",               'FLOAT_KW'),
-    (r"\bchar\b",                'CHAR_KW'),
-    (r"\bbool\b",                'BOOL_KW'),
-    (r"\bif\b",                  'IF'),
-    (r"\belse\b",                'ELSE'),
-    (r"\bfor\b",                 'FOR'),
-    (r"\bwhile\b",               'WHILE'),
-    (r"\breturn\b",              'RETURN'),
-    (r"\bvoid\b",                'VOID'),
-    (r"\bprint\b",               'PRINT'),
-    (r"\bread\b",                'READ'),
-    (r"\btrue\b|\bfalse\b",      'BOOL_LIT'),
+    (r"/\*[^*]*\*+(?:[^/*][^*]*\*+)*/", None),  # block comment, unrolled so it needs no DOTALL
     (r"[0-9]+\.[0-9]+",          'FLOAT_LIT'),
     (r"[0-9]+",                  'INT_LIT'),
-    (r"'([^'\\]|\\.)'",          'CHAR_LIT'),
-    (r'\"([^"\\]|\\.)*\"',       'STRING_LIT'),
-    (r"[A-Za-z_][A-Za-z0-9_]*",  'ID'),
+    (r"'(?:[^'\\]|\\[\s\S])'",     'CHAR_LIT'),
+    (r'"[^"\\]*(?:\\[\s\S][^"\\]*)*"', 'STRING_LIT'),  # unrolled loop: linear even when unterminated
+    (r"[A-Za-z_][A-Za-z0-9_]*",  'ID'),           # keywords too, see TEXT_KINDS
     (r"\+|\-|\*|/|%",            'ARITH'),
     (r"<=|>=|==|!=|<|>",         'RELOP'),
     (r"&&|\|\||!",               'LOGIC'),
@@ -32,35 +21,119 @@ TokenSpec = [
     (r";|,|\(|\)|\{|\}|\[|\]",   'SYM'),
 ]
 
-master_pat = re.compile('|'.join('(?P<T%d>%s)' % (i, p[0]) for i, p in enumerate(TokenSpec)), re.S)
+master_pat = re.compile('|'.join('(?P<T%d>%s)' % (i, p[0]) for i, p in enumerate(TokenSpec)))
 
-@dataclass
+# Token kind for each named group of master_pat (None for skipped text)
+GROUP_TO_KIND: Dict[Optional[str], Optional[str]] = {f'T{i}': spec[1] for i, spec in enumerate(TokenSpec)}
+
+# Integer token kinds, so the parser can branch on ints instead of type and value strings
+(TK_EOF, TK_ID, TK_INT_LIT, TK_FLOAT_LIT, TK_CHAR_LIT, TK_STRING_LIT, TK_BOOL_LIT,
+ TK_INT_KW, TK_FLOAT_KW, TK_CHAR_KW, TK_BOOL_KW, TK_VOID,
+ TK_IF, TK_ELSE, TK_FOR, TK_WHILE, TK_RETURN, TK_PRINT, TK_READ,
+ TK_PLUS, TK_MINUS, TK_STAR, TK_SLASH, TK_PERCENT,
+ TK_LT, TK_GT, TK_LE, TK_GE, TK_EQ, TK_NE, TK_AND, TK_OR, TK_NOT, TK_ASSIGN,
+ TK_SEMI, TK_COMMA, TK_LPAREN, TK_RPAREN, TK_LBRACE, TK_RBRACE, TK_LBRACKET, TK_RBRACKET) = range(42)
+N_KINDS = 42
+
+# Kind of each token whose text is fixed: keywords, operators and punctuation.
+# Keywords are matched by the ID rule and reclassified with this one dict lookup
+TEXT_KINDS: Dict[str, int] = {
+    'int': TK_INT_KW, 'float': TK_FLOAT_KW, 'char': TK_CHAR_KW, 'bool': TK_BOOL_KW, 'void': TK_VOID,
+    'if': TK_IF, 'else': TK_ELSE, 'for': TK_FOR, 'while': TK_WHILE, 'return': TK_RETURN,
+    'print': TK_PRINT, 'read': TK_READ, 'true': TK_BOOL_LIT, 'false': TK_BOOL_LIT,
+    '+': TK_PLUS, '-': TK_MINUS, '*': TK_STAR, '/': TK_SLASH, '%': TK_PERCENT,
+    '<': TK_LT, '>': TK_GT, '<=': TK_LE, '>=': TK_GE, '==': TK_EQ, '!=': TK_NE,
+    '&&': TK_AND, '||': TK_OR, '!': TK_NOT, '=': TK_ASSIGN,
+    ';': TK_SEMI, ',': TK_COMMA, '(': TK_LPAREN, ')': TK_RPAREN,
+    '{': TK_LBRACE, '}': TK_RBRACE, '[': TK_LBRACKET, ']': TK_RBRACKET,
+}
+
+# Kind of every other token, by its type
+TYPE_KINDS: Dict[str, int] = {
+    'EOF': TK_EOF, 'ID': TK_ID, 'INT_LIT': TK_INT_LIT, 'FLOAT_LIT': TK_FLOAT_LIT,
+    'CHAR_LIT': TK_CHAR_LIT, 'STRING_LIT': TK_STRING_LIT,
+}
+
+# Type of each kind, so the stream stores only the kind; KIND_TYPES[kind] is the type
+KIND_TYPES = (['EOF', 'ID', 'INT_LIT', 'FLOAT_LIT', 'CHAR_LIT', 'STRING_LIT', 'BOOL_LIT',
+               'INT_KW', 'FLOAT_KW', 'CHAR_KW', 'BOOL_KW', 'VOID',
+               'IF', 'ELSE', 'FOR', 'WHILE', 'RETURN', 'PRINT', 'READ']
+              + ['ARITH'] * 5 + ['RELOP'] * 6 + ['LOGIC'] * 3 + ['ASSIGN'] + ['SYM'] * 8)
+
+# Name of each kind for error messages: the token text, or the type if the text varies
+KIND_NAMES = ['EOF', 'ID', 'INT_LIT', 'FLOAT_LIT', 'CHAR_LIT', 'STRING_LIT', 'BOOL_LIT'] + [''] * (N_KINDS - 7)
+for text, kind in TEXT_KINDS.items():
+    if kind != TK_BOOL_LIT:
+        KIND_NAMES[kind] = text
+
+@dataclass(slots=True)
 class Token:
     """Represents a lexical token with type, value, and position."""
     type: str
     value: str
     lineno: int
     col: int
+    kind: int = field(repr=False)  # One of the TK_* codes
+
+class TokenStream:
+    """Tokens stored as parallel arrays (struct of arrays), one entry per token.
+
+    The token type is not stored: it follows from the kind (see KIND_TYPES)."""
+    __slots__ = ('kinds', 'values', 'linenos', 'cols')
+
+    def __init__(self):
+        self.kinds = array('i')  # TK_* codes
+        self.values: List[str] = []  # Interned, so repeated names and keywords share one string
+        self.linenos = array('i')
+        self.cols = array('i')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, i: int) -> Token:
+        """Return token i as a Token object."""
+        kind = self.kinds[i]
+        return Token(KIND_TYPES[kind], self.values[i], self.linenos[i], self.cols[i], kind)
+
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self.kinds)))
+
+try:
+    # Compiled scanner, built with: cythonize -i MiniC/_lexer.pyx
+    from MiniC._lexer import tokenize as _compiled_tokenize
+except ImportError:
+    _compiled_tokenize = None
+
+def tokenize(code: str) -> TokenStream:
+    """Tokenize the input MiniC code into a token stream."""
+    if _compiled_tokenize is not None:
+        return _compiled_tokenize(code, TokenStream(), TEXT_KINDS, TYPE_KINDS)
+    return tokenize_regex(code)
 
-def tokenize(code: str) -> List[Token]:
-    """Tokenize the input MiniC code into a list of tokens."""
-    tokens: List[Token] = []
+def tokenize_regex(code: str) -> TokenStream:
+    """Tokenize with the master regular expression; the pure-Python fallback."""
+    tokens = TokenStream()
+    add_kind, add_value = tokens.kinds.append, tokens.values.append
+    add_lineno, add_col = tokens.linenos.append, tokens.cols.append
+    group_to_kind = GROUP_TO_KIND
+    text_kinds, type_kinds = TEXT_KINDS, TYPE_KINDS
+    intern = sys.intern
     line_no = 1
     line_start = 0
     for m in master_pat.finditer(code):
-        kind = None
+        typ = group_to_kind[m.lastgroup]
         value = m.group(0)
-        for i, spec in enumerate(TokenSpec):
-            if m.lastgroup == f'T{i}':
-                kind = spec[1]
-                break
-        if kind is None:
-            pass
-        else:
-            col = m.start() - line_start + 1
-            tokens.append(Token(kind, value, line_no, col))
+        if typ is not None:
+            # Keywords and other fixed text are found by value, so an ID needs no keyword check
+            add_kind(text_kinds.get(value) or type_kinds[typ])
+            add_value(intern(value))
+            add_lineno(line_no)
+            add_col(m.start() - line_start + 1)
         line_no += value.count('\n')
         if '\n' in value:
             line_start = m.end()
-    tokens.append(Token('EOF', '', line_no, 1))
+    add_kind(TK_EOF)
+    add_value('')
+    add_lineno(line_no)
+    add_col(1)
     return tokens
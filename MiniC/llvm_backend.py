@@ -0,0 +1,362 @@
+# llvm_backend.py
+"""
+LLVM Backend for MiniC Integer Functions.
+
+Lowers the TAC of a function to LLVM IR with llvmlite and compiles it
+to machine code with MCJIT. Every TAC variable or temp gets a stack
+slot in the entry block, and LLVM's optimization pipeline promotes
+those slots to registers. The Interpreter calls the resulting machine
+code in place of the bytecode.
+
+Only functions whose parameters, variables and literals are int or
+bool are compiled. They must not use '/', which is true division in
+MiniC, and must not call print, read or a function that cannot itself
+be compiled. llvmlite is optional; when it is not installed nothing is
+compiled. Values are 64-bit machine integers. Arithmetic is checked, and
+a call that overflows int64 raises OverflowError, on which the
+Interpreter runs the function's bytecode instead. It does the same when
+a non-void function ends without a return, as that returns None.
+Compiled functions call each other directly, passing down the call
+depth, and a chain deeper than the Interpreter's MAX_CALL_DEPTH raises
+RecursionError.
+"""
+
+import ctypes
+from typing import List, Dict, Set, Any, Callable
+from MiniC.ast_nodes import *
+from MiniC.ir_generator import (TACInstruction, DEFINES_DEST, OP_ASSIGN, OP_BINOP, OP_UNOP,
+                                 OP_JUMP, OP_CJUMP, OP_LABEL, OP_CALL, OP_RETURN, OP_PARAM)
+from MiniC.numba_codegen import UnsupportedConstruct
+from MiniC.interpreter import MAX_CALL_DEPTH
+
+try:
+    import llvmlite.ir as ir
+    import llvmlite.binding as llvm
+except ImportError:
+    ir = llvm = None
+
+INT_TYPES = ('int', 'bool')
+
+# Overflow-checked IRBuilder method for each arithmetic operator
+ARITH_OPS = {'+': 'sadd_with_overflow', '-': 'ssub_with_overflow', '*': 'smul_with_overflow'}
+
+COMPARE_OPS = ('<', '>', '<=', '>=', '==', '!=')
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+# Values of the error flag a compiled function sets before it returns early
+ERR_MODULO_BY_ZERO, ERR_OVERFLOW, ERR_RECURSION, ERR_NO_RETURN = 1, 2, 3, 4
+
+def check_node(node, callees: Set[str]):
+    """Raise UnsupportedConstruct unless node only uses integer operations; collect called names."""
+    if node is None or isinstance(node, VarRef):
+        return
+    if isinstance(node, Block):
+        for s in node.statements:
+            check_node(s, callees)
+    elif isinstance(node, VarDecl):
+        if node.var_type not in INT_TYPES:
+            raise UnsupportedConstruct(f"variable {node.name} of type {node.var_type}")
+        if node.init is None:
+            raise UnsupportedConstruct(f"uninitialized variable {node.name}")
+        check_node(node.init, callees)
+    elif isinstance(node, Assignment):
+        check_node(node.value, callees)
+    elif isinstance(node, IfStmt):
+        check_node(node.cond, callees)
+        check_node(node.then_branch, callees)
+        check_node(node.else_branch, callees)
+    elif isinstance(node, WhileStmt):
+        check_node(node.cond, callees)
+        check_node(node.body, callees)
+    elif isinstance(node, ForStmt):
+        for part in (node.init, node.cond, node.update, node.body):
+            check_node(part, callees)
+    elif isinstance(node, ReturnStmt):
+        check_node(node.expr, callees)
+    elif isinstance(node, Literal):
+        if node.typ not in INT_TYPES:
+            raise UnsupportedConstruct(f"{node.typ} literal")
+    elif isinstance(node, UnaryExpr):
+        check_node(node.expr, callees)
+    elif isinstance(node, Expr):
+        if node.op == '/':
+            raise UnsupportedConstruct("true division")
+        check_node(node.left, callees)
+        check_node(node.right, callees)
+    elif isinstance(node, FuncCall):
+        if node.name in ('print', 'read'):
+            raise UnsupportedConstruct(f"call to {node.name}")
+        callees.add(node.name)
+        for a in node.args:
+            check_node(a, callees)
+    else:
+        raise UnsupportedConstruct(f"{node}")
+
+def check_function(func: Function) -> Set[str]:
+    """Return the names func calls, or raise UnsupportedConstruct."""
+    if func.ret_type not in INT_TYPES + ('void',):
+        raise UnsupportedConstruct(f"return type {func.ret_type}")
+    for typ, name in func.params:
+        if typ not in INT_TYPES:
+            raise UnsupportedConstruct(f"parameter {name} of type {typ}")
+    callees: Set[str] = set()
+    check_node(func.body, callees)
+    return callees
+
+class LLVMBackend:
+    """Lowers TAC to LLVM IR and JIT-compiles it with MCJIT."""
+
+    def __init__(self, program: Program):
+        self.program = program
+        self.functions: Dict[str, Function] = {f.name: f for f in program.functions}
+        self.engine = None  # Owns the machine code; kept alive as long as the backend
+        self.i64 = ir.IntType(64) if ir else None
+        self.flag_ptr = ir.IntType(8).as_pointer() if ir else None
+
+    def eligible_functions(self) -> Set[str]:
+        """Names of the functions that can be compiled."""
+        calls: Dict[str, Set[str]] = {}
+        for func in self.program.functions:
+            try:
+                calls[func.name] = check_function(func)
+            except UnsupportedConstruct:
+                pass
+        # A function that calls something we cannot compile stays in the interpreter too
+        changed = True
+        while changed:
+            changed = False
+            for name in list(calls):
+                if not calls[name] <= calls.keys():
+                    del calls[name]
+                    changed = True
+        return set(calls)
+
+    def split_functions(self, tac: List[TACInstruction]) -> Dict[str, List[TACInstruction]]:
+        """Group the TAC instructions under the label of the function they belong to."""
+        bodies: Dict[str, List[TACInstruction]] = {}
+        current = None
+        for instr in tac:
+            if instr.op == OP_LABEL and instr.label in self.functions:
+                current = bodies.setdefault(instr.label, [])
+            elif current is not None:
+                current.append(instr)
+        return bodies
+
+    @staticmethod
+    def symbol(name: str) -> str:
+        """Mangle a function name so it cannot clash with C library symbols."""
+        return f"minic_{name}"
+
+    def generate_module(self, tac: List[TACInstruction]):
+        """Build an LLVM module containing every eligible function."""
+        names = self.eligible_functions()
+        module = ir.Module(name='minic')
+        # Declare everything first so calls can refer to functions defined later
+        self.llvm_functions = {}
+        for name in names:
+            func = self.functions[name]
+            # Each function also takes its call depth and a pointer to an error
+            # flag, set to one of the ERR_* codes
+            fnty = ir.FunctionType(self.i64, [self.i64] * (len(func.params) + 1) + [self.flag_ptr])
+            self.llvm_functions[name] = ir.Function(module, fnty, name=self.symbol(name))
+        bodies = self.split_functions(tac)
+        for name in names:
+            self.lower_function(self.functions[name], bodies.get(name, []))
+        return module
+
+    def generate_ir(self, tac: List[TACInstruction]) -> str:
+        """Return the textual LLVM IR for the eligible functions."""
+        if ir is None:
+            return ''
+        return str(self.generate_module(tac))
+
+    def lower_function(self, func: Function, body: List[TACInstruction]):
+        """Emit the LLVM body of one function from its TAC."""
+        fn = self.llvm_functions[func.name]
+        self.fn = fn
+        self.builder = ir.IRBuilder(fn.append_basic_block('entry'))
+        self.depth, self.error_flag = fn.args[-2:]
+        self.error_blocks: Dict[int, Any] = {}
+        # One stack slot per TAC name, all allocated in the entry block
+        self.allocas: Dict[str, Any] = {}
+        for typ, name in func.params:
+            self.allocas[name] = self.builder.alloca(self.i64, name=name)
+        for instr in body:
+            if (1 << instr.op) & DEFINES_DEST and instr.dest not in self.allocas:
+                self.allocas[instr.dest] = self.builder.alloca(self.i64, name=instr.dest)
+        for (typ, name), arg in zip(func.params, fn.args):
+            self.builder.store(arg, self.allocas[name])
+        # Recursion runs on the C stack, so stop it where the Interpreter would
+        body_block = fn.append_basic_block('body')
+        too_deep = self.builder.icmp_signed('>=', self.depth, self.i64(MAX_CALL_DEPTH))
+        self.builder.cbranch(too_deep, self.get_error_block(ERR_RECURSION), body_block)
+        self.builder.position_at_end(body_block)
+        # Labels become blocks up front so forward jumps can target them
+        self.blocks = {instr.label: fn.append_basic_block(instr.label)
+                       for instr in body if instr.op == OP_LABEL}
+        for instr in body:
+            self.lower_instruction(instr)
+        if not self.builder.block.is_terminated:
+            # Falling off the end of a function returns None, which only a void function can pass for 0
+            if func.ret_type == 'void':
+                self.builder.ret(self.i64(0))
+            else:
+                self.builder.branch(self.get_error_block(ERR_NO_RETURN))
+
+    def lower_instruction(self, instr: TACInstruction):
+        b = self.builder
+        if instr.op == OP_LABEL:
+            target = self.blocks[instr.label]
+            if not b.block.is_terminated:
+                b.branch(target)
+            b.position_at_end(target)
+            return
+        if b.block.is_terminated:
+            # Code after a jump or return that no label leads to
+            b.position_at_end(self.fn.append_basic_block())
+        if instr.op == OP_ASSIGN:
+            b.store(self.operand(instr.src1), self.allocas[instr.dest])
+        elif instr.op == OP_BINOP:
+            value = self.binop(instr.binop_op, self.operand(instr.src1), self.operand(instr.binop_right))
+            b.store(value, self.allocas[instr.dest])
+        elif instr.op == OP_UNOP:
+            value = self.operand(instr.src2)
+            if instr.src1 == '-':
+                value = self.checked('ssub_with_overflow', self.i64(0), value)
+            elif instr.src1 == '!':
+                value = b.zext(b.icmp_signed('==', value, self.i64(0)), self.i64)
+            b.store(value, self.allocas[instr.dest])
+        elif instr.op == OP_CJUMP:
+            # IRGenerator emits cjump to skip to its label when the condition is false
+            cond = b.icmp_signed('!=', self.operand(instr.dest), self.i64(0))
+            fallthrough = self.fn.append_basic_block()
+            b.cbranch(cond, fallthrough, self.blocks[instr.label])
+            b.position_at_end(fallthrough)
+        elif instr.op == OP_JUMP:
+            b.branch(self.blocks[instr.label])
+        elif instr.op == OP_CALL:
+            args = [self.operand(a) for a in instr.args]
+            depth = b.add(self.depth, self.i64(1))
+            result = b.call(self.llvm_functions[instr.src2], args + [depth, self.error_flag])
+            b.store(result, self.allocas[instr.dest])
+            # Unwind straight away, keeping the callee's error code, if it failed
+            cont = self.fn.append_basic_block()
+            failed = b.icmp_unsigned('!=', b.load(self.error_flag), ir.Constant(ir.IntType(8), 0))
+            b.cbranch(failed, self.get_error_block(), cont)
+            b.position_at_end(cont)
+        elif instr.op == OP_RETURN:
+            b.ret(self.operand(instr.dest) if instr.dest else self.i64(0))
+        elif instr.op == OP_PARAM:
+            pass  # Arguments are passed with the call itself
+        else:
+            raise UnsupportedConstruct(f"TAC instruction {instr}")
+
+    def operand(self, name: str):
+        """Load a TAC variable or temp, or materialize a literal."""
+        if name in self.allocas:
+            return self.builder.load(self.allocas[name])
+        if name in ('True', 'False'):
+            return self.i64(int(name == 'True'))
+        try:
+            return self.i64(int(name))
+        except ValueError:
+            raise UnsupportedConstruct(f"operand {name}")
+
+    def binop(self, op: str, left, right):
+        b = self.builder
+        if op in ARITH_OPS:
+            return self.checked(ARITH_OPS[op], left, right)
+        if op in COMPARE_OPS:
+            return b.zext(b.icmp_signed(op, left, right), self.i64)
+        if op in ('&&', '||'):
+            l = b.icmp_signed('!=', left, self.i64(0))
+            r = b.icmp_signed('!=', right, self.i64(0))
+            return b.zext(b.and_(l, r) if op == '&&' else b.or_(l, r), self.i64)
+        if op == '%':
+            return self.modulo(left, right)
+        raise UnsupportedConstruct(f"operator {op}")
+
+    def checked(self, method: str, left, right):
+        """Emit an overflow-checked operation that leaves with ERR_OVERFLOW when it overflows."""
+        b = self.builder
+        result = getattr(b, method)(left, right)
+        ok = self.fn.append_basic_block()
+        b.cbranch(b.extract_value(result, 1), self.get_error_block(ERR_OVERFLOW), ok)
+        b.position_at_end(ok)
+        return b.extract_value(result, 0)
+
+    def modulo(self, left, right):
+        """Emit a modulo with MiniC's (Python's) sign rules and a zero check."""
+        b = self.builder
+        zero = self.i64(0)
+        ok = self.fn.append_basic_block()
+        b.cbranch(b.icmp_signed('==', right, zero), self.get_error_block(ERR_MODULO_BY_ZERO), ok)
+        b.position_at_end(ok)
+        # x % -1 is always 0, but srem(INT64_MIN, -1) overflows and traps, so divide by 1 instead
+        right = b.select(b.icmp_signed('==', right, self.i64(-1)), self.i64(1), right)
+        rem = b.srem(left, right)
+        # srem takes the sign of the dividend; the result must take the sign of the divisor
+        fix = b.and_(b.icmp_signed('!=', rem, zero),
+                     b.icmp_signed('<', b.xor(rem, right), zero))
+        return b.select(fix, b.add(rem, right), rem)
+
+    def get_error_block(self, code: int = 0):
+        """Return the block that sets the error flag to code and leaves the function.
+
+        With code 0 the flag is left as a failed callee set it."""
+        if code not in self.error_blocks:
+            saved = self.builder.block
+            block = self.error_blocks[code] = self.fn.append_basic_block('error')
+            self.builder.position_at_end(block)
+            if code:
+                self.builder.store(ir.Constant(ir.IntType(8), code), self.error_flag)
+            self.builder.ret(self.i64(0))
+            self.builder.position_at_end(saved)
+        return self.error_blocks[code]
+
+    def compile(self, tac: List[TACInstruction]) -> Dict[str, Callable]:
+        """JIT-compile the eligible functions; returns Python callables by function name."""
+        if llvm is None:
+            return {}
+        module = self.generate_module(tac)
+        llvm.initialize_native_target()
+        llvm.initialize_native_asmprinter()
+        machine = llvm.Target.from_default_triple().create_target_machine(opt=2)
+        llmod = llvm.parse_assembly(str(module))
+        llmod.verify()
+        pass_builder = llvm.create_pass_builder(machine, llvm.create_pipeline_tuning_options(speed_level=2))
+        pass_builder.getModulePassManager().run(llmod, pass_builder)
+        self.engine = llvm.create_mcjit_compiler(llmod, machine)
+        self.engine.finalize_object()
+        return {name: self.make_callable(self.functions[name]) for name in self.llvm_functions}
+
+    def make_callable(self, func: Function) -> Callable:
+        """Wrap a compiled function's address in a Python callable."""
+        nargs = len(func.params)
+        address = self.engine.get_function_address(self.symbol(func.name))
+        cfunc = ctypes.CFUNCTYPE(ctypes.c_int64, *[ctypes.c_int64] * (nargs + 1),
+                                 ctypes.POINTER(ctypes.c_uint8))(address)
+        convert = {'bool': bool, 'void': lambda result: None}.get(func.ret_type, int)
+        engine = self.engine
+
+        def call(*args):
+            for a in args:
+                if not isinstance(a, int):
+                    raise TypeError(f"{func.name} compiled for int arguments, got {a!r}")
+                if not INT64_MIN <= a <= INT64_MAX:
+                    raise OverflowError(f"{a} does not fit in 64 bits")
+            error = ctypes.c_uint8(0)
+            result = cfunc(*args, 0, ctypes.byref(error))
+            if error.value == ERR_OVERFLOW:
+                raise OverflowError(f"{func.name} overflowed 64 bits")
+            if error.value == ERR_MODULO_BY_ZERO:
+                raise ZeroDivisionError('integer modulo by zero')
+            if error.value == ERR_RECURSION:
+                raise RecursionError('maximum recursion depth exceeded')
+            if error.value == ERR_NO_RETURN:
+                raise UnsupportedConstruct(f"{func.name} ended without returning a value")
+            return convert(result)
+        call.__name__ = func.name
+        call.engine = engine  # Keep the machine code alive with the callable
+        return call
@@ -0,0 +1,248 @@
+# numba_codegen.py
+"""
+Numba JIT Backend for MiniC Leaf Functions.
+
+Functions that only do arithmetic on int/float/bool locals with
+structured control flow (no calls, print or read) are translated to
+equivalent Python source and compiled with numba.njit. The Interpreter
+calls the compiled version directly and keeps running everything else
+as bytecode.
+
+Numba is optional; when it is not installed nothing is compiled. It is
+only imported once a function is actually compiled.
+Every expression must have the Python type the interpreter would give
+it, so a function that stores or returns a value of another type than
+declared stays in the interpreter. Compiled functions use 64-bit machine
+integers; int arithmetic that would overflow them raises OverflowError,
+on which the Interpreter runs the function's bytecode instead.
+"""
+
+from typing import List, Dict, Optional, Callable, Tuple
+from MiniC.ast_nodes import *
+
+def _import_numba():
+    """Import numba on first use; it takes longer to import than the rest of the compiler runs."""
+    try:
+        import numba
+        from numba.core.errors import NumbaError
+    except ImportError:
+        return None, None
+    return numba, NumbaError
+
+class UnsupportedConstruct(Exception):
+    """Raised when a function uses a construct the numba backend cannot translate."""
+    pass
+
+NUMBA_TYPES = {'int': 'int64', 'float': 'float64', 'bool': 'boolean'}
+
+PY_TYPES = {'int': int, 'float': float, 'bool': bool}
+
+# The interpreter evaluates both operands of && and ||, so the generated code
+# must too (an error on the right must still be raised); all other operators
+# are spelled the same in Python
+PY_BINOPS = {'&&': '&', '||': '|'}
+
+COMPARE_OPS = ('<', '>', '<=', '>=', '==', '!=')
+
+# Helpers the generated source calls for +, - and * on two ints. numba's
+# int64 arithmetic wraps (and LLVM may assume it does not), so each checks
+# its operands first and raises OverflowError where a Python int would grow.
+CHECKED_INT_OPS = {'+': 'int_add', '-': 'int_sub', '*': 'int_mul'}
+
+CHECKED_INT_SOURCE = """
+def int_add(a, b):
+    if (b > 0 and a > 9223372036854775807 - b) or (b < 0 and a < -9223372036854775808 - b):
+        raise OverflowError('int64 overflow')
+    return a + b
+
+def int_sub(a, b):
+    if (b < 0 and a > 9223372036854775807 + b) or (b > 0 and a < -9223372036854775808 + b):
+        raise OverflowError('int64 overflow')
+    return a - b
+
+def int_mul(a, b):
+    # The float product is within a few ulps of the exact one, far less than
+    # the margin below 2**63, so this only rejects products that might overflow
+    if abs(float(a) * float(b)) >= 9.2e18:
+        raise OverflowError('int64 overflow')
+    return a * b
+"""
+
+_checked_int_ops: Dict[str, Callable] = {}  # Compiled on first use
+
+class PythonSourceGenerator:
+    """Translates a MiniC function AST into Python source for numba."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.decl_types: Dict[str, str] = {}  # var name to declared type
+        self.ret_type = 'void'
+
+    def generate(self, func: Function) -> str:
+        """Generate the source of a Python function equivalent to func."""
+        self.lines = []
+        self.decl_types = {}
+        self.ret_type = func.ret_type
+        for typ, name in func.params:
+            self.declare(name, typ)
+        params = ', '.join(self.name(n) for t, n in func.params)
+        self.lines.append(f"def {self.function_name(func)}({params}):")
+        self.gen_body(func.body, 1)
+        return '\n'.join(self.lines) + '\n'
+
+    @staticmethod
+    def function_name(func: Function) -> str:
+        return f"minic_{func.name}"
+
+    @staticmethod
+    def name(var: str) -> str:
+        """Mangle a MiniC identifier so it cannot clash with Python keywords."""
+        return f"v_{var}"
+
+    def declare(self, name: str, typ: str):
+        if typ not in NUMBA_TYPES:
+            raise UnsupportedConstruct(f"variable {name} of type {typ}")
+        if self.decl_types.setdefault(name, typ) != typ:
+            raise UnsupportedConstruct(f"variable {name} redeclared with another type")
+
+    def gen_body(self, stmt, depth: int):
+        """Generate an indented suite, emitting 'pass' if it would be empty."""
+        count = len(self.lines)
+        self.gen_statement(stmt, depth)
+        if len(self.lines) == count:
+            self.lines.append('    ' * depth + 'pass')
+
+    def gen_store(self, name: str, value, depth: int):
+        src, typ = self.gen_expression(value)
+        if typ != self.decl_types[name]:
+            # numba would convert it; the interpreter keeps the value's own type
+            raise UnsupportedConstruct(f"{typ} value stored in {self.decl_types[name]} variable {name}")
+        self.lines.append(f"{'    ' * depth}{self.name(name)} = {src}")
+
+    def gen_statement(self, stmt, depth: int):
+        indent = '    ' * depth
+        if isinstance(stmt, Block):
+            for s in stmt.statements:
+                self.gen_statement(s, depth)
+        elif isinstance(stmt, VarDecl):
+            self.declare(stmt.name, stmt.var_type)
+            if stmt.init is None:
+                raise UnsupportedConstruct(f"uninitialized variable {stmt.name}")
+            self.gen_store(stmt.name, stmt.init, depth)
+        elif isinstance(stmt, Assignment):
+            self.gen_store(stmt.target, stmt.value, depth)
+        elif isinstance(stmt, IfStmt):
+            self.lines.append(f"{indent}if {self.gen_condition(stmt.cond)}:")
+            self.gen_body(stmt.then_branch, depth + 1)
+            if stmt.else_branch:
+                self.lines.append(f"{indent}else:")
+                self.gen_body(stmt.else_branch, depth + 1)
+        elif isinstance(stmt, WhileStmt):
+            self.lines.append(f"{indent}while {self.gen_condition(stmt.cond)}:")
+            self.gen_body(stmt.body, depth + 1)
+        elif isinstance(stmt, ForStmt):
+            if stmt.init:
+                self.gen_statement(stmt.init, depth)
+            cond = self.gen_condition(stmt.cond) if stmt.cond else 'True'
+            self.lines.append(f"{indent}while {cond}:")
+            self.gen_body(stmt.body, depth + 1)
+            if stmt.update:
+                self.gen_statement(stmt.update, depth + 1)
+        elif isinstance(stmt, ReturnStmt):
+            if stmt.expr:
+                src, typ = self.gen_expression(stmt.expr)
+                if typ != self.ret_type:
+                    raise UnsupportedConstruct(f"{typ} returned from {self.ret_type} function")
+                self.lines.append(f"{indent}return {src}")
+            else:
+                self.lines.append(f"{indent}return")
+        elif isinstance(stmt, (Expr, UnaryExpr, Literal, VarRef)):
+            self.lines.append(f"{indent}{self.gen_expression(stmt)[0]}")
+        else:
+            raise UnsupportedConstruct(f"statement {stmt}")
+
+    def gen_condition(self, expr) -> str:
+        src, typ = self.gen_expression(expr)
+        if typ != 'bool':
+            raise UnsupportedConstruct(f"{typ} condition")
+        return src
+
+    def gen_expression(self, expr) -> Tuple[str, str]:
+        """Return the Python source for expr and the type of the value the interpreter computes."""
+        if isinstance(expr, Literal):
+            if expr.typ not in NUMBA_TYPES:
+                raise UnsupportedConstruct(f"{expr.typ} literal")
+            return repr(expr.value), expr.typ
+        if isinstance(expr, VarRef):
+            return self.name(expr.name), self.decl_types[expr.name]
+        if isinstance(expr, UnaryExpr):
+            src, typ = self.gen_expression(expr.expr)
+            if expr.op == '!' and typ == 'bool':
+                return f"(not {src})", 'bool'
+            if expr.op == '-' and typ == 'int':
+                return f"int_sub(0, {src})", 'int'
+            if expr.op in ('-', '+') and typ != 'bool':
+                return f"({expr.op}{src})", typ
+            raise UnsupportedConstruct(f"{expr.op} on {typ}")
+        if isinstance(expr, Expr):
+            left, lt = self.gen_expression(expr.left)
+            right, rt = self.gen_expression(expr.right)
+            op = expr.op
+            if op in PY_BINOPS:
+                if lt != 'bool' or rt != 'bool':
+                    raise UnsupportedConstruct(f"{op} on {lt}, {rt}")
+                return f"({left} {PY_BINOPS[op]} {right})", 'bool'
+            if op in COMPARE_OPS:
+                return f"({left} {op} {right})", 'bool'
+            if op in ('+', '-', '*', '/', '%') and 'bool' not in (lt, rt):
+                # '/' is true division, a float even for two ints
+                typ = 'float' if op == '/' or 'float' in (lt, rt) else 'int'
+                if typ == 'int' and op in CHECKED_INT_OPS:
+                    return f"{CHECKED_INT_OPS[op]}({left}, {right})", typ
+                return f"({left} {op} {right})", typ
+            raise UnsupportedConstruct(f"{op} on {lt}, {rt}")
+        # Calls (including print/read) and nested assignments are left to the interpreter
+        raise UnsupportedConstruct(f"expression {expr}")
+
+def to_python_source(func: Function) -> str:
+    """Return Python source for func, or raise UnsupportedConstruct."""
+    return PythonSourceGenerator().generate(func)
+
+def checked_int_ops(numba) -> Dict[str, Callable]:
+    """Return the overflow-checked int helpers compiled with numba."""
+    if not _checked_int_ops:
+        namespace: Dict[str, Any] = {}
+        exec(compile(CHECKED_INT_SOURCE, "<minic int ops>", 'exec'), namespace)
+        # Inlined into their callers by numba itself, which compiles faster than separate functions
+        _checked_int_ops.update((name, numba.njit(inline='always')(namespace[name]))
+                                for name in CHECKED_INT_OPS.values())
+    return _checked_int_ops
+
+def jit_function(func: Function) -> Optional[Callable]:
+    """Compile func with numba, or return None if that is not possible."""
+    numba, NumbaError = _import_numba()
+    if numba is None:
+        return None
+    try:
+        source = to_python_source(func)
+    except UnsupportedConstruct:
+        return None
+    namespace: Dict[str, Any] = dict(checked_int_ops(numba))
+    exec(compile(source, f"<minic {func.name}>", 'exec'), namespace)
+    pyfunc = namespace[PythonSourceGenerator.function_name(func)]
+    # Parameter types are declared, so compile eagerly; the return type is inferred
+    signature = tuple(getattr(numba, NUMBA_TYPES[typ]) for typ, name in func.params)
+    try:
+        compiled = numba.njit(signature)(pyfunc)
+    except NumbaError:
+        return None
+    arg_types = tuple(PY_TYPES[typ] for typ, name in func.params)
+
+    def call(*args):
+        # numba would convert an int passed for a float parameter; the interpreter keeps it an int
+        for a, typ in zip(args, arg_types):
+            if type(a) is not typ:
+                raise TypeError(f"{func.name} compiled for {typ.__name__} arguments, got {a!r}")
+        return compiled(*args)
+    call.__name__ = func.name
+    return call
@@ -7,184 +7,453 @@ Implements various optimization passes on Three-Address Code:
 - Dead Code Elimination
 - Common Subexpression Elimination (CSE)
 - Constant Propagation
+- Peephole simplification of identities, constant branches and labels
+
+The passes work on an IRStream, which keeps each instruction field in
+its own list, so a pass is a loop over indices instead of attribute
+lookups.
 """
 
-from typing import List, Dict, Set, Optional
-from MiniC.ir_generator import TACInstruction
-from MiniC.dag_generator import DAGGenerator
+from typing import List, Dict, Set, Tuple, Any, Optional
+from MiniC.ir_generator import (TACInstruction, DEFINES_DEST, OP_ASSIGN, OP_BINOP, OP_UNOP, OP_JUMP,
+                                 OP_CJUMP, OP_LABEL, OP_CALL, OP_RETURN, OP_PARAM)
+from MiniC.dag_generator import DAGGenerator, fold_constant
+
+# Op-codes that only compute dest, so they can go when dest is never read
+PURE_DEFS = (1 << OP_ASSIGN) | (1 << OP_BINOP) | (1 << OP_UNOP)
+
+# Operators whose result is never a bool
+ARITHMETIC = frozenset(('+', '-', '*', '/', '%'))
+
+# Op-codes that end a basic block for CSE
+BLOCK_ENDS = (1 << OP_LABEL) | (1 << OP_JUMP) | (1 << OP_CJUMP) | (1 << OP_CALL)
+
+MAX_ITERATIONS = 8  # Most rounds optimize() runs before settling for the code so far
+
+class IRStream:
+    """TAC stored as parallel lists (struct of arrays), one entry per instruction."""
+    __slots__ = ('ops', 'dests', 'src1s', 'src2s', 'labels', 'binop_ops', 'binop_rights',
+                 'src1_consts', 'src2_consts', 'binop_right_consts', 'args', 'arg_consts')
+
+    def __init__(self, instructions: List[TACInstruction]):
+        self.ops: List[int] = [i.op for i in instructions]
+        self.dests: List[Optional[str]] = [i.dest for i in instructions]
+        self.src1s: List[Optional[str]] = [i.src1 for i in instructions]
+        self.src2s: List[Optional[str]] = [i.src2 for i in instructions]
+        self.labels: List[Optional[str]] = [i.label for i in instructions]
+        self.binop_ops: List[Optional[str]] = [i.binop_op for i in instructions]
+        self.binop_rights: List[Optional[str]] = [i.binop_right for i in instructions]
+        self.src1_consts: List[Any] = [i.src1_const for i in instructions]
+        self.src2_consts: List[Any] = [i.src2_const for i in instructions]
+        self.binop_right_consts: List[Any] = [i.binop_right_const for i in instructions]
+        self.args: List[Tuple[str, ...]] = [i.args for i in instructions]
+        # Values of the constants propagated into a call's args, None for args
+        # that are still names; None until the first one is
+        self.arg_consts: List[Optional[Tuple[Any, ...]]] = [None] * len(instructions)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def set_assign(self, i: int, value: Any):
+        """Turn instruction i into 'dest = value' for a constant value."""
+        self.ops[i] = OP_ASSIGN
+        self.src1s[i] = str(value)
+        self.src1_consts[i] = value
+        self.src2s[i] = self.labels[i] = self.binop_ops[i] = self.binop_rights[i] = None
+        self.src2_consts[i] = self.binop_right_consts[i] = None
+
+    def uses(self, i: int) -> List[str]:
+        """Return the names instruction i reads; constant operands are left out."""
+        op = self.ops[i]
+        if op == OP_ASSIGN:
+            return [self.src1s[i]] if self.src1_consts[i] is None else []
+        if op == OP_BINOP:
+            return [name for name, const in ((self.src1s[i], self.src1_consts[i]),
+                                             (self.binop_rights[i], self.binop_right_consts[i]))
+                    if const is None]
+        if op == OP_UNOP:
+            return [self.src2s[i]] if self.src2_consts[i] is None else []
+        if op == OP_CALL:
+            consts = self.arg_consts[i]
+            return list(self.args[i]) if consts is None else [a for a, c in zip(self.args[i], consts) if c is None]
+        if (op == OP_CJUMP or op == OP_RETURN or op == OP_PARAM) and self.dests[i] and self.src1_consts[i] is None:
+            return [self.dests[i]]
+        return []
+
+    def function_starts(self, function_labels: Optional[Set[str]] = None) -> List[bool]:
+        """Flag the labels that start a function: those in function_labels or,
+        by default, those no jump goes to."""
+        ops, labels = self.ops, self.labels
+        if function_labels is None:
+            targets = {labels[i] for i in range(len(ops)) if ops[i] == OP_JUMP or ops[i] == OP_CJUMP}
+            return [op == OP_LABEL and label not in targets for op, label in zip(ops, labels)]
+        return [op == OP_LABEL and label in function_labels for op, label in zip(ops, labels)]
+
+    def basic_blocks(self, function_starts: List[bool]) -> Tuple[List[int], List[List[int]]]:
+        """Split the stream into basic blocks.
+
+        Returns the index each block starts at, followed by len(self), and for
+        each block the blocks control can go to when it ends. Control never
+        falls through into the next function.
+        """
+        ops, labels = self.ops, self.labels
+        n = len(ops)
+        starts = [0]
+        for i in range(n):
+            if ops[i] == OP_LABEL and i != starts[-1]:
+                starts.append(i)
+            elif (ops[i] == OP_JUMP or ops[i] == OP_CJUMP or ops[i] == OP_RETURN) and i + 1 < n:
+                starts.append(i + 1)
+        starts.append(n)
+        n_blocks = len(starts) - 1
+        block_of_label = {labels[start]: b for b, start in enumerate(starts[:-1])
+                          if start < n and ops[start] == OP_LABEL}
+        successors = []
+        for b in range(n_blocks):
+            last = starts[b + 1] - 1
+            op = ops[last] if last >= starts[b] else None
+            following = [b + 1] if b + 1 < n_blocks and not function_starts[starts[b + 1]] else []
+            if op == OP_JUMP:
+                successors.append([block_of_label[labels[last]]])
+            elif op == OP_CJUMP:
+                successors.append([block_of_label[labels[last]]] + following)
+            elif op == OP_RETURN:
+                successors.append([])
+            else:
+                successors.append(following)
+        return starts, successors
+
+    def keep(self, mask: List[bool]):
+        """Drop every instruction whose mask entry is False."""
+        for name in self.__slots__:
+            column = getattr(self, name)
+            column[:] = [v for v, k in zip(column, mask) if k]
+
+    def to_instructions(self) -> List[TACInstruction]:
+        """Build TACInstruction objects for the printers and code generator."""
+        return [TACInstruction(*fields) for fields in zip(
+            self.ops, self.dests, self.src1s, self.src2s, self.labels, self.binop_ops,
+            self.binop_rights, self.src1_consts, self.src2_consts, self.binop_right_consts,
+            self.args)]
 
 class TACOptimizer:
     """Optimizes TAC instructions."""
 
     def __init__(self, instructions: List[TACInstruction]):
         self.instructions = instructions
-        self.constants: Dict[str, str] = {}  # var -> constant value
-        self.live_vars: Set[str] = set()
+        self.stream = IRStream(instructions)
+        self.constants: Dict[str, Any] = {}  # var -> constant value
+        # Passes drop jumps and labels, so tell function labels apart while every internal label is still a target
+        self.function_labels: Set[str] = {label for label, start in zip(
+            self.stream.labels, self.stream.function_starts()) if start}
 
     def optimize(self) -> List[TACInstruction]:
-        """Run all optimization passes."""
-        # Constant Propagation
-        self.constant_propagation()
-        # Constant Folding
-        self.constant_folding()
-        # Constant Propagation again
-        self.constant_propagation()
-        # Common Subexpression Elimination
-        self.common_subexpression_elimination()
+        """Run the optimization passes until they stop changing the code."""
+        for _ in range(MAX_ITERATIONS):
+            # Constant Propagation and Folding, Common Subexpression Elimination, then Peephole
+            changed = self.propagate_and_fold()
+            changed = self.common_subexpression_elimination() or changed
+            changed = self.peephole() or changed
+            if not changed:
+                break
         # Dead Code Elimination
         self.dead_code_elimination()
+        self.instructions = self.stream.to_instructions()
         return self.instructions
 
-    def constant_propagation(self):
-        """Propagate constant values through assignments."""
-        self.constants = {}
-        for instr in self.instructions:
-            if instr.op == 'assign' and instr.src1 and instr.src1.isdigit():
-                self.constants[instr.dest] = instr.src1
-            elif instr.op == 'assign' and instr.src1 in self.constants:
-                self.constants[instr.dest] = self.constants[instr.src1]
-            elif instr.op in ('binop', 'unop'):
-                # If operands are constants, compute later in folding
-                pass
-            else:
-                # Kill constants for dest
-                if instr.dest in self.constants:
-                    del self.constants[instr.dest]
-
-        # Replace uses of constants
-        for instr in self.instructions:
-            if instr.src1:
-                if isinstance(instr.src1, list):
-                    instr.src1 = [self.constants.get(x, x) for x in instr.src1]
-                elif instr.src1 in self.constants:
-                    instr.src1 = self.constants[instr.src1]
-            if instr.dest and instr.dest in self.constants:
-                instr.dest = self.constants[instr.dest]
-            if instr.src2 and ' ' in instr.src2:
-                parts = instr.src2.split(' ', 1)
-                if parts[1] in self.constants:
-                    instr.src2 = f"{parts[0]} {self.constants[parts[1]]}"
-
-    def constant_folding(self):
-        """Fold constant expressions."""
-        new_instructions = []
-        for instr in self.instructions:
-            if instr.op == 'binop':
-                parts = instr.src2.split(' ', 1)
-                op = parts[0]
-                right = parts[1]
-                if instr.src1 and instr.src1.isdigit() and right.isdigit():
-                    result = self.compute_constant(op, int(instr.src1), int(right))
-                    new_instr = TACInstruction('assign', dest=instr.dest, src1=str(result))
-                    new_instructions.append(new_instr)
+    def propagate_and_fold(self) -> bool:
+        """Propagate constants into operands and fold constant operations in one forward pass.
+
+        Constants are only tracked within a basic block: a label can be reached
+        from several places, so the values known so far are dropped there.
+        Whether an operand is constant is read from the *_consts columns the IR
+        generator filled in, so no operand text is parsed. Only names are
+        replaced: an operand with a value in its *_consts entry is a literal,
+        even when its text is also a variable name (True, nan). Returns whether
+        any operand was replaced.
+        """
+        stream = self.stream
+        ops, dests, src1s, src2s = stream.ops, stream.dests, stream.src1s, stream.src2s
+        binop_ops, binop_rights = stream.binop_ops, stream.binop_rights
+        src1_consts, src2_consts = stream.src1_consts, stream.src2_consts
+        binop_right_consts = stream.binop_right_consts
+        self.constants = constants = {}
+        changed = False
+        for i in range(len(ops)):
+            op = ops[i]
+            if op == OP_LABEL:
+                constants.clear()
+            elif op == OP_ASSIGN:
+                if src1_consts[i] is None and src1s[i] in constants:
+                    value = src1_consts[i] = constants[src1s[i]]
+                    src1s[i] = str(value)
+                    changed = True
                 else:
-                    new_instructions.append(instr)
-            elif instr.op == 'unop':
-                if instr.src2 and instr.src2.isdigit():
-                    if instr.src1 == '-':
-                        result = -int(instr.src2)
-                    elif instr.src1 == '!':
-                        result = 0 if int(instr.src2) else 1
-                    new_instr = TACInstruction('assign', dest=instr.dest, src1=str(result))
-                    new_instructions.append(new_instr)
+                    value = src1_consts[i]
+                if value is not None:
+                    constants[dests[i]] = value
                 else:
-                    new_instructions.append(instr)
-            else:
-                new_instructions.append(instr)
-        self.instructions = new_instructions
-
-    def compute_constant(self, op: str, left: int, right: int) -> int:
-        """Compute constant binary operation."""
-        if op == '+':
-            return left + right
-        elif op == '-':
-            return left - right
-        elif op == '*':
-            return left * right
-        elif op == '/':
-            return left // right  # Integer division
-        elif op == '%':
-            return left % right
-        elif op == '&&':
-            return 1 if left and right else 0
-        elif op == '||':
-            return 1 if left or right else 0
-        elif op == '<':
-            return 1 if left < right else 0
-        elif op == '>':
-            return 1 if left > right else 0
-        elif op == '<=':
-            return 1 if left <= right else 0
-        elif op == '>=':
-            return 1 if left >= right else 0
-        elif op == '==':
-            return 1 if left == right else 0
-        elif op == '!=':
-            return 1 if left != right else 0
-        else:
-            return 0  # Default
-
-    def common_subexpression_elimination(self):
-        """Eliminate common subexpressions using DAG."""
+                    constants.pop(dests[i], None)
+            elif op == OP_BINOP or op == OP_UNOP:
+                if op == OP_BINOP:
+                    if src1_consts[i] is None and src1s[i] in constants:
+                        src1_consts[i] = constants[src1s[i]]
+                        src1s[i] = str(src1_consts[i])
+                        changed = True
+                    if binop_right_consts[i] is None and binop_rights[i] in constants:
+                        binop_right_consts[i] = constants[binop_rights[i]]
+                        binop_rights[i] = str(binop_right_consts[i])
+                        changed = True
+                    left, right = src1_consts[i], binop_right_consts[i]
+                    value = None if left is None or right is None else fold_constant(binop_ops[i], left, right)
+                else:
+                    if src2_consts[i] is None and src2s[i] in constants:
+                        src2_consts[i] = constants[src2s[i]]
+                        src2s[i] = str(src2_consts[i])
+                        changed = True
+                    operand = src2_consts[i]
+                    value = None if operand is None else fold_constant(src1s[i], operand)
+                if value is not None:
+                    stream.set_assign(i, value)
+                    constants[dests[i]] = value
+                else:
+                    constants.pop(dests[i], None)
+            elif op == OP_CALL:
+                args = stream.args[i]
+                if src2s[i] == 'read':
+                    # read() stores into its argument variables; their params come right before the call
+                    for k, name in enumerate(args):
+                        dests[i - len(args) + k] = name
+                        src1_consts[i - len(args) + k] = None
+                        constants.pop(name, None)
+                else:
+                    consts = stream.arg_consts[i] or (None,) * len(args)
+                    if any(c is None and a in constants for a, c in zip(args, consts)):
+                        consts = stream.arg_consts[i] = tuple(
+                            constants[a] if c is None and a in constants else c for a, c in zip(args, consts))
+                        stream.args[i] = tuple(a if c is None else str(c) for a, c in zip(args, consts))
+                        changed = True
+                constants.pop(dests[i], None)
+            elif src1_consts[i] is None and dests[i] in constants:
+                # cjump, return and param read dest; the value is kept in src1_consts,
+                # where peephole() also finds the condition of a cjump
+                src1_consts[i] = constants[dests[i]]
+                dests[i] = str(src1_consts[i])
+                changed = True
+        return changed
+
+    def common_subexpression_elimination(self) -> bool:
+        """Eliminate common subexpressions using a DAG per basic block.
+
+        Every later temp that computes the same DAG node as an earlier temp in
+        its block is mapped to that first temp, and one pass renames the reads.
+        The duplicate definitions are then unread and left to dead code
+        elimination. Calls end a block too, since read() writes its arguments.
+        Returns whether any read was renamed.
+        """
+        stream = self.stream
+        ops, dests, src1s, src2s, binop_rights = (stream.ops, stream.dests, stream.src1s,
+                                                  stream.src2s, stream.binop_rights)
+        args = stream.args
         dag_gen = DAGGenerator()
-        dag_gen.build_dag(self.instructions)
-        cse_map = dag_gen.detect_cse()
-
-        # For each CSE, replace later uses with the first temp
-        for node, temps in cse_map.items():
-            if len(temps) > 1:
-                first_temp = temps[0]
-                for temp in temps[1:]:
-                    # Replace assignments to temp with assignments to first_temp
-                    for instr in self.instructions:
-                        if instr.dest == temp:
-                            instr.dest = first_temp
-                        if instr.src1 == temp:
-                            instr.src1 = first_temp
-                        if instr.src2 and temp in instr.src2:
-                            instr.src2 = instr.src2.replace(temp, first_temp)
-
-    def dead_code_elimination(self):
-        """Remove dead code (unused assignments)."""
-        # Compute live variables
-        self.compute_live_variables()
-
-        # Remove instructions that assign to dead variables
-        new_instructions = []
-        for instr in self.instructions:
-            if instr.op in ('assign', 'binop', 'unop', 'call') and instr.dest not in self.live_vars:
-                continue  # Skip dead assignment
-            new_instructions.append(instr)
-        self.instructions = new_instructions
-
-    def compute_live_variables(self):
-        """Compute which variables are live (used later)."""
-        self.live_vars = set()
-        # Backward pass
-        for instr in reversed(self.instructions):
-            if instr.op == 'return' and instr.dest:
-                self.live_vars.add(instr.dest)
-            elif instr.op == 'cjump':
-                self.live_vars.add(instr.dest)
-            elif instr.op == 'assign':
-                if instr.dest in self.live_vars:
-                    self.live_vars.add(instr.src1)
-                self.live_vars.discard(instr.dest)  # dest is killed
-            elif instr.op == 'binop':
-                if instr.dest in self.live_vars:
-                    self.live_vars.add(instr.src1)
-                    parts = instr.src2.split(' ', 1)
-                    if len(parts) > 1:
-                        self.live_vars.add(parts[1])
-                self.live_vars.discard(instr.dest)
-            elif instr.op == 'unop':
-                if instr.dest in self.live_vars:
-                    self.live_vars.add(instr.src2)
-                self.live_vars.discard(instr.dest)
-            elif instr.op == 'call':
-                if instr.dest in self.live_vars:
-                    if instr.src1:
-                        self.live_vars.update(instr.src1)
-                self.live_vars.discard(instr.dest)
-            elif instr.op == 'param':
-                self.live_vars.add(instr.dest)
\ No newline at end of file
+        rename: Dict[str, str] = {}
+        block: List[TACInstruction] = []
+        for instr in stream.to_instructions() + [None]:
+            if instr is None or (1 << instr.op) & BLOCK_ENDS:
+                dag_gen.build_dag(block)
+                for temps in dag_gen.detect_cse().values():
+                    for temp in temps[1:]:
+                        rename[temp] = temps[0]
+                block = []
+            else:
+                block.append(instr)
+        if not rename:
+            return False
+
+        changed = False
+        for i in range(len(ops)):
+            op = ops[i]
+            if op == OP_ASSIGN or op == OP_BINOP:
+                if src1s[i] in rename:
+                    src1s[i] = rename[src1s[i]]
+                    changed = True
+                if op == OP_BINOP and binop_rights[i] in rename:
+                    binop_rights[i] = rename[binop_rights[i]]
+                    changed = True
+            elif op == OP_UNOP:
+                if src2s[i] in rename:
+                    src2s[i] = rename[src2s[i]]
+                    changed = True
+            elif op == OP_CALL:
+                if any(a in rename for a in args[i]):
+                    args[i] = tuple(rename.get(a, a) for a in args[i])
+                    changed = True
+            elif dests[i] in rename:
+                # cjump, return and param read dest
+                dests[i] = rename[dests[i]]
+                changed = True
+        return changed
+
+    def dead_code_elimination(self) -> bool:
+        """Remove assignments whose value is never used.
+
+        Liveness is solved over the basic blocks until it settles, so values
+        carried around loops stay live. Names are numbered per function and
+        live sets are int bitmasks over those numbers, so a set operation is
+        one operation on a small integer. Reads by instructions that are dead themselves do not count,
+        which removes whole chains of dead code at once. Calls are kept for
+        their side effects. Returns whether anything was removed.
+        """
+        stream = self.stream
+        ops, dests = stream.ops, stream.dests
+        n = len(ops)
+        function_starts = stream.function_starts(self.function_labels)
+        ids: Dict[str, int] = {}
+        def_bits, use_bits = [], []
+        for i in range(n):
+            if function_starts[i]:
+                ids = {}  # Functions share no names, so each numbers its own from 0
+            bits = 0
+            for name in stream.uses(i):
+                bits |= 1 << ids.setdefault(name, len(ids))
+            use_bits.append(bits)
+            def_bits.append(1 << ids.setdefault(dests[i], len(ids)) if (1 << ops[i]) & DEFINES_DEST else 0)
+        starts, successors = stream.basic_blocks(function_starts)
+        keep = [True] * n
+
+        def live_before(b: int, live: int, mark: bool) -> int:
+            # Walk block b backwards from the names live at its end
+            for i in range(starts[b + 1] - 1, starts[b] - 1, -1):
+                if (1 << ops[i]) & PURE_DEFS and not live & def_bits[i]:
+                    if mark:
+                        keep[i] = False
+                    continue
+                live = live & ~def_bits[i] | use_bits[i]
+            return live
+
+        def live_after(b: int) -> int:
+            live = 0
+            for succ in successors[b]:
+                live |= live_in[succ]
+            return live
+
+        live_in = [0] * len(successors)
+        changed = True
+        while changed:
+            changed = False
+            for b in range(len(successors) - 1, -1, -1):
+                live = live_before(b, live_after(b), False)
+                if live != live_in[b]:
+                    live_in[b] = live
+                    changed = True
+        for b in range(len(successors)):
+            live_before(b, live_after(b), True)
+        if all(keep):
+            return False
+        stream.keep(keep)
+        return True
+
+    def peephole(self) -> bool:
+        """Simplify short instruction patterns in one forward pass.
+
+        - 'x * 1' and '1 * x' become 'x' when x holds an arithmetic result of
+          the same block, which is never a bool. The TAC is untyped, so 'x + 0'
+          and 'x * 0' are left alone: they change bools, and floats such as
+          -0.0 or nan.
+        - A cjump (jump if false) on a constant is dropped when the constant is
+          true and becomes a jump otherwise.
+        - Code after a jump or return is dropped up to the next label.
+        - A run of labels is merged into its first label, a jump to the label
+          right after it is dropped, and so are labels no jump goes to.
+
+        Function labels are never merged or dropped. Returns whether anything
+        changed.
+        """
+        stream = self.stream
+        ops, dests, src1s, src2s, labels = stream.ops, stream.dests, stream.src1s, stream.src2s, stream.labels
+        binop_ops, binop_rights = stream.binop_ops, stream.binop_rights
+        src1_consts, binop_right_consts = stream.src1_consts, stream.binop_right_consts
+        function_labels = self.function_labels
+        n = len(ops)
+        keep = [True] * n
+        changed = False
+        arithmetic: Set[str] = set()  # Names holding an arithmetic result in this block
+        merged: Dict[str, str] = {}  # Label -> first label of its run
+        head = None  # First label of the run being scanned
+        reachable = True
+        for i in range(n):
+            op = ops[i]
+            if op == OP_LABEL:
+                reachable = True
+                arithmetic.clear()
+                if labels[i] in function_labels:
+                    head = None
+                elif head is None:
+                    head = labels[i]
+                else:
+                    merged[labels[i]] = head
+                    keep[i] = False
+                continue
+            head = None
+            if not reachable:
+                keep[i] = False
+                continue
+            if op == OP_BINOP:
+                if binop_ops[i] == '*':
+                    left, right = src1_consts[i], binop_right_consts[i]
+                    if type(right) is int and right == 1 and src1s[i] in arithmetic:
+                        operand = src1s[i]
+                    elif type(left) is int and left == 1 and binop_rights[i] in arithmetic:
+                        operand = binop_rights[i]
+                    else:
+                        operand = None
+                    if operand is not None:
+                        ops[i] = OP_ASSIGN
+                        src1s[i] = operand
+                        src1_consts[i] = binop_ops[i] = binop_rights[i] = binop_right_consts[i] = None
+                        changed = True
+                        arithmetic.add(dests[i])
+                        continue
+                if binop_ops[i] in ARITHMETIC:
+                    arithmetic.add(dests[i])
+                else:
+                    arithmetic.discard(dests[i])
+            elif op == OP_UNOP:
+                if src1s[i] == '!':
+                    arithmetic.discard(dests[i])
+                else:
+                    arithmetic.add(dests[i])
+            elif op == OP_ASSIGN:
+                if src1s[i] in arithmetic and src1_consts[i] is None:
+                    arithmetic.add(dests[i])
+                else:
+                    arithmetic.discard(dests[i])
+            elif op == OP_CALL:
+                if src2s[i] == 'read':
+                    arithmetic.difference_update(stream.args[i])
+                arithmetic.discard(dests[i])
+            elif op == OP_CJUMP and src1_consts[i] is not None:
+                changed = True
+                if src1_consts[i]:
+                    keep[i] = False
+                    continue
+                ops[i] = OP_JUMP
+                dests[i] = src1_consts[i] = None
+                op = OP_JUMP
+            if op == OP_JUMP or op == OP_RETURN:
+                reachable = False
+
+        kept = [i for i in range(n) if keep[i]]
+        for k, i in enumerate(kept):
+            if ops[i] == OP_JUMP or ops[i] == OP_CJUMP:
+                label = labels[i] = merged.get(labels[i], labels[i])
+                if k + 1 < len(kept) and ops[kept[k + 1]] == OP_LABEL and labels[kept[k + 1]] == label:
+                    keep[i] = False  # Both ways lead to the next instruction
+        targets = {labels[i] for i in kept if keep[i] and (ops[i] == OP_JUMP or ops[i] == OP_CJUMP)}
+        for i in kept:
+            if ops[i] == OP_LABEL and labels[i] not in targets and labels[i] not in function_labels:
+                keep[i] = False
+        if all(keep):
+            return changed
+        stream.keep(keep)
+        return True
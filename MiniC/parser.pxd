@@ -0,0 +1,19 @@
+# parser.pxd
+# Declarations that let Cython compile parser.py (cythonize -i MiniC/parser.py)
+cimport cython
+
+cdef class Parser:
+    cdef public int[::1] kinds
+    cdef public list values
+    cdef public object linenos, cols
+    cdef public Py_ssize_t pos
+
+    cpdef int peek(self)
+    cpdef str next(self)
+    cpdef str expect(self, int kind)
+
+    @cython.locals(prec=int, bound=int, op=Py_ssize_t, kinds=cython.int[::1], values=list)
+    cpdef parse_expression(self)
+    cpdef parse_unary(self)
+    @cython.locals(pos=Py_ssize_t, kind=int)
+    cpdef parse_primary(self)
@@ -1,8 +1,20 @@
 # parser.py
+# cython: annotation_typing=False
 from typing import List, Tuple, Any, Optional
-from MiniC.lexer import Token
-from MiniC.ast_nodes import *
-from MiniC.lexer import tokenize
+# Names are imported one by one (no 'import *') so mypyc can compile this module
+from MiniC.lexer import (
+    TokenStream, tokenize, N_KINDS, KIND_NAMES, KIND_TYPES,
+    TK_EOF, TK_ID, TK_INT_LIT, TK_FLOAT_LIT, TK_CHAR_LIT, TK_STRING_LIT, TK_BOOL_LIT,
+    TK_INT_KW, TK_FLOAT_KW, TK_CHAR_KW, TK_BOOL_KW, TK_VOID,
+    TK_IF, TK_ELSE, TK_FOR, TK_WHILE, TK_RETURN, TK_PRINT, TK_READ,
+    TK_PLUS, TK_MINUS, TK_STAR, TK_SLASH, TK_PERCENT,
+    TK_LT, TK_GT, TK_LE, TK_GE, TK_EQ, TK_NE, TK_AND, TK_OR, TK_NOT, TK_ASSIGN,
+    TK_SEMI, TK_COMMA, TK_LPAREN, TK_RPAREN, TK_LBRACE, TK_RBRACE,
+)
+from MiniC.ast_nodes import (
+    ASTNode, Program, Function, Block, VarDecl, Assignment, IfStmt, WhileStmt, ForStmt,
+    ReturnStmt, Expr, UnaryExpr, Literal, VarRef, FuncCall,
+)
 
 class ParserError(Exception):
     """Exception raised for parsing errors."""
@@ -10,262 +22,271 @@ class ParserError(Exception):
 
 class Parser:
     """Recursive descent parser for MiniC language."""
-    def __init__(self, tokens: List[Token]):
-        """Initialize parser with token list."""
-        self.tokens = tokens
+    __slots__ = ('kinds', 'values', 'linenos', 'cols', 'pos')
+
+    def __init__(self, tokens: TokenStream):
+        """Initialize parser with the token stream."""
+        self.kinds = tokens.kinds
+        self.values = tokens.values
+        self.linenos = tokens.linenos
+        self.cols = tokens.cols
         self.pos = 0
 
-    def peek(self) -> Token:
-        """Peek at the current token without advancing."""
-        return self.tokens[self.pos]
+    def peek(self) -> int:
+        """Return the kind of the current token without advancing."""
+        return self.kinds[self.pos]
 
-    def next(self) -> Token:
-        """Consume and return the current token."""
-        tok = self.tokens[self.pos]
+    def next(self) -> str:
+        """Consume the current token and return its text."""
         self.pos += 1
-        return tok
+        return self.values[self.pos - 1]
+
+    def where(self) -> str:
+        """Return the line:column of the current token."""
+        return f"{self.linenos[self.pos]}:{self.cols[self.pos]}"
 
-    def expect(self, typ: str, val: Optional[str]=None) -> Token:
-        """Expect a token of given type and optional value, consume it."""
-        tok = self.peek()
-        if tok.type != typ:
-            raise ParserError(f"Expected {typ} at {tok.lineno}:{tok.col}, found {tok.type} ('{tok.value}')")
-        if val is not None and tok.value != val:
-            raise ParserError(f"Expected {val} at {tok.lineno}:{tok.col}, found '{tok.value}'")
+    def expect(self, kind: int) -> str:
+        """Expect a token of the given TK_* kind, consume it and return its text."""
+        if self.kinds[self.pos] != kind:
+            raise ParserError(f"Expected {KIND_NAMES[kind]} at {self.where()}, found {KIND_TYPES[self.kinds[self.pos]]} ('{self.values[self.pos]}')")
         return self.next()
 
     def parse(self) -> Program:
         """Parse the entire program into an AST."""
         funcs = []
-        while self.peek().type != 'EOF':
+        while self.peek() != TK_EOF:
             funcs.append(self.parse_function())
         return Program(funcs)
 
     def parse_function(self) -> Function:
         """Parse a function definition."""
-        ret_tok = self.next()
-        if ret_tok.type not in ('INT_KW','FLOAT_KW','CHAR_KW','BOOL_KW','VOID'):
-            raise ParserError(f"Function must start with return type at {ret_tok.lineno}:{ret_tok.col}")
-        ret_type = ret_tok.value
-        name_tok = self.expect('ID')
-        name = name_tok.value
-        self.expect('SYM', '(')
+        if not TYPE_KW[self.peek()] and self.peek() != TK_VOID:
+            raise ParserError(f"Function must start with return type at {self.where()}")
+        ret_type = self.next()
+        name = self.expect(TK_ID)
+        self.expect(TK_LPAREN)
         params = self.parse_params()
-        self.expect('SYM', ')')
+        self.expect(TK_RPAREN)
         body = self.parse_block()
         return Function(ret_type, name, params, body)
 
     def parse_params(self) -> List[Tuple[str,str]]:
-        params = []
-        if self.peek().type == 'SYM' and self.peek().value == ')':
+        params: List[Tuple[str, str]] = []
+        if self.peek() == TK_RPAREN:
             return params
         while True:
-            typ_tok = self.next()
-            if typ_tok.type not in ('INT_KW','FLOAT_KW','CHAR_KW','BOOL_KW'):
-                raise ParserError(f"Parameter type expected at {typ_tok.lineno}:{typ_tok.col}")
-            var_tok = self.expect('ID')
-            params.append((typ_tok.value, var_tok.value))
-            if self.peek().type == 'SYM' and self.peek().value == ',':
+            if not TYPE_KW[self.peek()]:
+                raise ParserError(f"Parameter type expected at {self.where()}")
+            typ = self.next()
+            params.append((typ, self.expect(TK_ID)))
+            if self.peek() == TK_COMMA:
                 self.next()
                 continue
             break
         return params
 
     def parse_block(self) -> Block:
-        self.expect('SYM','{')
+        self.expect(TK_LBRACE)
         stmts = []
-        while not (self.peek().type=='SYM' and self.peek().value=='}'):
+        while not (self.peek() == TK_RBRACE):
             stmts.append(self.parse_statement())
-        self.expect('SYM','}')
+        self.expect(TK_RBRACE)
         return Block(stmts)
 
-    def parse_statement(self):
-        tok = self.peek()
-        if tok.type in ('INT_KW','FLOAT_KW','CHAR_KW','BOOL_KW'):
-            return self.parse_vardecl()
-        if tok.type == 'ID':
-            return self.parse_expr_statement()
-        if tok.type == 'IF':
-            return self.parse_if()
-        if tok.type == 'WHILE':
-            return self.parse_while()
-        if tok.type == 'FOR':
-            return self.parse_for()
-        if tok.type == 'RETURN':
-            return self.parse_return()
-        if tok.type == 'PRINT':
-            return self.parse_print()
-        if tok.type == 'READ':
-            return self.parse_read()
-        if tok.type == 'SYM' and tok.value == '{':
-            return self.parse_block()
-        return self.parse_expr_statement()
+    def parse_statement(self) -> ASTNode:
+        return STATEMENT_PARSERS[self.peek()](self)
 
     def parse_vardecl(self) -> VarDecl:
-        typ_tok = self.next()
-        typ = typ_tok.value
-        id_tok = self.expect('ID')
-        name = id_tok.value
+        typ = self.next()
+        name = self.expect(TK_ID)
         init = None
-        if self.peek().type == 'ASSIGN':
+        if self.peek() == TK_ASSIGN:
             self.next()
             init = self.parse_expression()
-        self.expect('SYM',';')
+        self.expect(TK_SEMI)
         return VarDecl(typ, name, init)
 
-    def parse_expr_statement(self):
+    def parse_expr_statement(self) -> ASTNode:
         expr = self.parse_expression()
-        if isinstance(expr, Assignment):
-            self.expect('SYM',';')
-            return expr
-        self.expect('SYM',';')
+        self.expect(TK_SEMI)
         return expr
 
     def parse_if(self) -> IfStmt:
-        self.expect('IF')
-        self.expect('SYM','(')
+        self.expect(TK_IF)
+        self.expect(TK_LPAREN)
         cond = self.parse_expression()
-        self.expect('SYM',')')
+        self.expect(TK_RPAREN)
         then_branch = self.parse_statement()
         else_branch = None
-        if self.peek().type == 'ELSE':
+        if self.peek() == TK_ELSE:
             self.next()
             else_branch = self.parse_statement()
         return IfStmt(cond, then_branch, else_branch)
 
     def parse_while(self) -> WhileStmt:
-        self.expect('WHILE')
-        self.expect('SYM','(')
+        self.expect(TK_WHILE)
+        self.expect(TK_LPAREN)
         cond = self.parse_expression()
-        self.expect('SYM',')')
+        self.expect(TK_RPAREN)
         body = self.parse_statement()
         return WhileStmt(cond, body)
 
     def parse_for(self) -> ForStmt:
-        self.expect('FOR')
-        self.expect('SYM','(')
-        init = None
-        if not (self.peek().type=='SYM' and self.peek().value==';'):
-            if self.peek().type in ('INT_KW','FLOAT_KW','CHAR_KW','BOOL_KW'):
+        self.expect(TK_FOR)
+        self.expect(TK_LPAREN)
+        init: Optional[ASTNode] = None
+        if not (self.peek() == TK_SEMI):
+            if TYPE_KW[self.peek()]:
                 init = self.parse_vardecl()
             else:
                 init = self.parse_expr_statement()
         else:
-            self.expect('SYM',';')
+            self.expect(TK_SEMI)
         cond = None
-        if not (self.peek().type=='SYM' and self.peek().value==';'):
+        if not (self.peek() == TK_SEMI):
             cond = self.parse_expression()
-        self.expect('SYM',';')
+        self.expect(TK_SEMI)
         update = None
-        if not (self.peek().type=='SYM' and self.peek().value==')'):
+        if not (self.peek() == TK_RPAREN):
             update = self.parse_expression()
-        self.expect('SYM',')')
+        self.expect(TK_RPAREN)
         body = self.parse_statement()
         return ForStmt(init, cond, update, body)
 
     def parse_return(self) -> ReturnStmt:
-        self.expect('RETURN')
-        if not (self.peek().type=='SYM' and self.peek().value==';'):
+        self.expect(TK_RETURN)
+        if not (self.peek() == TK_SEMI):
             expr = self.parse_expression()
         else:
             expr = None
-        self.expect('SYM',';')
+        self.expect(TK_SEMI)
         return ReturnStmt(expr)
 
-    def parse_print(self):
-        self.expect('PRINT')
-        self.expect('SYM','(')
+    def parse_print(self) -> FuncCall:
+        self.expect(TK_PRINT)
+        self.expect(TK_LPAREN)
         expr = self.parse_expression()
-        self.expect('SYM',')')
-        self.expect('SYM',';')
+        self.expect(TK_RPAREN)
+        self.expect(TK_SEMI)
         return FuncCall('print', [expr])
 
-    def parse_read(self):
-        self.expect('READ')
-        self.expect('SYM','(')
-        var_tok = self.expect('ID')
-        self.expect('SYM',')')
-        self.expect('SYM',';')
-        return FuncCall('read', [VarRef(var_tok.value)])
+    def parse_read(self) -> FuncCall:
+        self.expect(TK_READ)
+        self.expect(TK_LPAREN)
+        name = self.expect(TK_ID)
+        self.expect(TK_RPAREN)
+        self.expect(TK_SEMI)
+        return FuncCall('read', [VarRef(name)])
 
-    def parse_expression(self, min_prec=0):
-        tok = self.peek()
-        if tok.type == 'ARITH' and tok.value in ('+','-'):
-            op = self.next().value
-            left = UnaryExpr(op, self.parse_expression(6))
-        elif tok.type == 'LOGIC' and tok.value == '!':
-            op = self.next().value
-            left = UnaryExpr(op, self.parse_expression(6))
-        else:
-            left = self.parse_primary()
+    def parse_expression(self) -> ASTNode:
+        """Parse an expression with explicit operand and operator stacks.
 
+        An operator waits on the stack until one that binds no tighter comes
+        along. Binary operators group to the left; assignment binds loosest,
+        groups to the right and needs a variable on its left. Every token is
+        consumed exactly once (the grammar is LL(1)), so no results are cached.
+        """
+        left = self.parse_unary() if PREFIX[self.peek()] else self.parse_primary()
+        prec = PREC[self.peek()]
+        if prec < 0 or (prec == 0 and type(left) is not VarRef):
+            return left  # No binary operator follows
+        operands: List[Any] = [left]
+        operators: List[int] = []  # Positions of the binary operators not applied yet
+        kinds, values = self.kinds, self.values
         while True:
-            tok = self.peek()
-            if tok.type == 'ARITH':
-                prec = 5 if tok.value in ('*','/','%') else 4
-                assoc = 'L'
-                op = tok.value
-            elif tok.type == 'RELOP':
-                prec = 3
-                assoc = 'L'
-                op = tok.value
-            elif tok.type == 'LOGIC':
-                if tok.value in ('&&','||'):
-                    prec = 2 if tok.value=='||' else 1
-                    assoc = 'L'
-                    op = tok.value
+            # Apply the pending operators that bind at least as tightly; assignment groups to the right
+            bound = prec if prec != 0 else 1
+            while operators and PREC[kinds[operators[-1]]] >= bound:
+                op = operators.pop()
+                right = operands.pop()
+                if kinds[op] == TK_ASSIGN:
+                    operands[-1] = Assignment(operands[-1].name, right)
                 else:
-                    break
-            elif tok.type == 'ASSIGN' and isinstance(left, VarRef):
-                prec = 0
-                assoc = 'R'
-                op = tok.value
-            else:
-                break
-            if prec < min_prec:
-                break
-            self.next()
-            if assoc == 'L':
-                rhs = self.parse_expression(prec+1)
-            else:
-                rhs = self.parse_expression(prec)
-            if op == '=':
-                left = Assignment(left.name, rhs)
-            else:
-                left = Expr(op, left, rhs)
-        return left
+                    operands[-1] = Expr(values[op], operands[-1], right)
+            if prec == 0 and type(operands[-1]) is not VarRef:
+                prec = -1  # Only a variable can be assigned to: apply what is left and stop
+                continue
+            if prec < 0:
+                return operands[0]
+            operators.append(self.pos)
+            self.pos += 1
+            operands.append(self.parse_unary() if PREFIX[self.peek()] else self.parse_primary())
+            prec = PREC[self.peek()]
+
+    def parse_unary(self) -> ASTNode:
+        """Parse a primary expression and the prefix operators before it."""
+        ops = []
+        while PREFIX[self.peek()]:
+            ops.append(self.next())
+        expr = self.parse_primary()
+        for op in reversed(ops):
+            expr = UnaryExpr(op, expr)
+        return expr
 
-    def parse_primary(self):
-        tok = self.peek()
-        if tok.type == 'INT_LIT':
-            self.next(); return Literal(int(tok.value), 'int')
-        if tok.type == 'FLOAT_LIT':
-            self.next(); return Literal(float(tok.value), 'float')
-        if tok.type == 'CHAR_LIT':
-            self.next(); val = tok.value[1:-1]
+    def parse_primary(self) -> ASTNode:
+        kind = self.peek()
+        if kind == TK_INT_LIT:
+            return Literal(int(self.next()), 'int')
+        if kind == TK_FLOAT_LIT:
+            return Literal(float(self.next()), 'float')
+        if kind == TK_CHAR_LIT:
+            val = self.next()[1:-1]
             return Literal(val, 'char')
-        if tok.type == 'STRING_LIT':
-            self.next(); return Literal(tok.value[1:-1], 'string')
-        if tok.type == 'BOOL_LIT':
-            self.next(); return Literal(True if tok.value=='true' else False, 'bool')
-        if tok.type == 'ID':
-            id_tok = self.next()
-            if self.peek().type=='SYM' and self.peek().value=='(':
-                self.next()
+        if kind == TK_STRING_LIT:
+            return Literal(self.next()[1:-1], 'string')
+        if kind == TK_BOOL_LIT:
+            return Literal(True if self.next()=='true' else False, 'bool')
+        if kind == TK_ID:
+            # One token of lookahead tells a call from a variable. The parser
+            # never backtracks, so there is nothing to memoize.
+            pos = self.pos
+            name = self.values[pos]
+            self.pos = pos + 1
+            if self.kinds[pos + 1] == TK_LPAREN:
+                self.pos = pos + 2
                 args = []
-                if not (self.peek().type=='SYM' and self.peek().value==')'):
+                if not (self.peek() == TK_RPAREN):
                     while True:
                         args.append(self.parse_expression())
-                        if self.peek().type=='SYM' and self.peek().value==',':
+                        if self.peek() == TK_COMMA:
                             self.next(); continue
                         break
-                self.expect('SYM',')')
-                return FuncCall(id_tok.value, args)
+                self.expect(TK_RPAREN)
+                return FuncCall(name, args)
             else:
-                return VarRef(id_tok.value)
-        if tok.type=='SYM' and tok.value=='(':
+                return VarRef(name)
+        if kind == TK_LPAREN:
             self.next()
             expr = self.parse_expression()
-            self.expect('SYM',')')
+            self.expect(TK_RPAREN)
             return expr
-        raise ParserError(f"Unexpected token {tok.type} ('{tok.value}') at {tok.lineno}:{tok.col}")
+        raise ParserError(f"Unexpected token {KIND_TYPES[self.kinds[self.pos]]} ('{self.values[self.pos]}') at {self.where()}")
+
+# Whether each token kind names a variable type
+TYPE_KW = [False] * N_KINDS
+for _kind in (TK_INT_KW, TK_FLOAT_KW, TK_CHAR_KW, TK_BOOL_KW):
+    TYPE_KW[_kind] = True
+
+# Whether each token kind is a prefix operator
+PREFIX = [False] * N_KINDS
+for _kind in (TK_PLUS, TK_MINUS, TK_NOT):
+    PREFIX[_kind] = True
+
+# Binary operator precedence by token kind; -1 for tokens that end an expression
+PREC = [-1] * N_KINDS
+for _kind, _prec in ((TK_ASSIGN, 0), (TK_AND, 1), (TK_OR, 2),
+                     (TK_LT, 3), (TK_GT, 3), (TK_LE, 3), (TK_GE, 3), (TK_EQ, 3), (TK_NE, 3),
+                     (TK_PLUS, 4), (TK_MINUS, 4), (TK_STAR, 5), (TK_SLASH, 5), (TK_PERCENT, 5)):
+    PREC[_kind] = _prec
+
+# Statement parser by the kind of the statement's first token
+STATEMENT_PARSERS = [Parser.parse_expr_statement] * N_KINDS
+for _kind in (TK_INT_KW, TK_FLOAT_KW, TK_CHAR_KW, TK_BOOL_KW):
+    STATEMENT_PARSERS[_kind] = Parser.parse_vardecl
+STATEMENT_PARSERS[TK_IF] = Parser.parse_if
+STATEMENT_PARSERS[TK_WHILE] = Parser.parse_while
+STATEMENT_PARSERS[TK_FOR] = Parser.parse_for
+STATEMENT_PARSERS[TK_RETURN] = Parser.parse_return
+STATEMENT_PARSERS[TK_PRINT] = Parser.parse_print
+STATEMENT_PARSERS[TK_READ] = Parser.parse_read
+STATEMENT_PARSERS[TK_LBRACE] = Parser.parse_block
@@ -1,168 +1,219 @@
 # semantic.py
-from typing import Dict, Any
-from MiniC.ast_nodes import *
+from typing import Dict, Any, Optional, Callable
+from MiniC.ast_nodes import (
+    Program, Function, Block, VarDecl, Assignment, IfStmt, WhileStmt, ForStmt,
+    ReturnStmt, Expr, UnaryExpr, Literal, VarRef, FuncCall,
+)
+# Type names. AST nodes intern the types they hold, so they are these very
+# objects and can be compared with 'is'.
+T_INT, T_FLOAT, T_CHAR, T_BOOL, T_VOID = 'int', 'float', 'char', 'bool', 'void'
+
+# Other types a variable of each type accepts a value of
+ACCEPTS = {T_FLOAT: (T_INT,), T_INT: (T_CHAR,), T_CHAR: (T_INT,)}
+
+ARITH_OPS = frozenset(('+', '-', '*', '/', '%'))
+
 class SemanticError(Exception):
     pass
 
 class Symbol:
-    def __init__(self, name, typ, kind='var'):
+    __slots__ = ('name', 'typ', 'kind')
+
+    def __init__(self, name: str, typ: str, kind: str = 'var'):
         self.name = name
         self.typ = typ
         self.kind = kind
 
+class Scope:
+    """Symbols declared in one block, linked to the scope of the enclosing block."""
+    __slots__ = ('parent', 'syms')
+
+    def __init__(self, parent: Optional['Scope'] = None):
+        self.parent = parent
+        self.syms: Dict[str, Symbol] = {}
+
+    def lookup(self, name: str) -> Optional[Symbol]:
+        """Find the innermost symbol called name, or None if it is not declared."""
+        scope: Optional[Scope] = self
+        while scope is not None:
+            sym = scope.syms.get(name)
+            if sym is not None:
+                return sym
+            scope = scope.parent
+        return None
+
 class SemanticAnalyzer:
+    __slots__ = ('program', 'globals', 'functions', '_ret_types', '_stmt_handlers', '_expr_handlers')
+
     def __init__(self, program: Program):
         self.program = program
         self.globals: Dict[str, Symbol] = {}
         self.functions: Dict[str, Function] = {}
-
-    def analyze(self):
+        self._ret_types: Dict[str, str] = {}
+        # Checks for each kind of statement and expression node, keyed by node type
+        self._stmt_handlers: Dict[type, Callable[[Any, Scope, str], None]] = {
+            VarDecl: self._walk_vardecl, Assignment: self._walk_assignment, IfStmt: self._walk_if,
+            WhileStmt: self._walk_while, ForStmt: self._walk_for, ReturnStmt: self._walk_return,
+            FuncCall: self._walk_call, Block: self._walk_block,
+            Expr: self._walk_expression, UnaryExpr: self._walk_expression,
+            Literal: self._walk_expression, VarRef: self._walk_expression,
+        }
+        self._expr_handlers: Dict[type, Callable[[Any, Scope], str]] = {
+            Assignment: self._type_assignment, UnaryExpr: self._type_unary,
+            Expr: self._type_binary, FuncCall: self._type_call,
+        }
+
+    def analyze(self) -> None:
         for f in self.program.functions:
             if f.name in self.functions:
                 raise SemanticError(f"Duplicate function {f.name}")
             self.functions[f.name] = f
+        # Return type of every callable name, builtins included
+        self._ret_types = {'print': T_VOID, 'read': T_VOID}
+        self._ret_types.update((name, f.ret_type) for name, f in self.functions.items())
         if 'main' not in self.functions:
             raise SemanticError('No main function defined')
         for fname, func in self.functions.items():
             self.analyze_function(func)
 
-    def analyze_function(self, func: Function):
-        symtab: Dict[str, Symbol] = {}
-        current_scope = set()
+    def analyze_function(self, func: Function) -> None:
+        symtab = Scope()
         for typ, name in func.params:
-            symtab[name] = Symbol(name, typ, 'var')
-            current_scope.add(name)
-        self.walk_block(func.body, symtab, func.ret_type, current_scope)
+            symtab.syms[name] = Symbol(name, typ, 'var')
+        # The body shares the parameters' scope, so a local cannot redeclare a parameter
+        self.walk_block(func.body, symtab, func.ret_type)
 
-    def walk_block(self, block: Block, symtab: Dict[str, Symbol], ret_type: str, current_scope: set = None):
-        if current_scope is None:
-            current_scope = set()
+    def walk_block(self, block: Block, symtab: Scope, ret_type: str) -> None:
+        handlers = self._stmt_handlers
         for stmt in block.statements:
-            self.walk_stmt(stmt, symtab, ret_type, current_scope)
-
-    def walk_stmt(self, stmt, symtab, ret_type, current_scope: set = None):
-        if current_scope is None:
-            current_scope = set()
-        if isinstance(stmt, VarDecl):
-            if stmt.name in current_scope:
-                raise SemanticError(f"Variable {stmt.name} already declared")
-            if stmt.init is not None:
-                init_type = self.eval_expr_type(stmt.init, symtab)
-                if not self.type_compatible(stmt.var_type, init_type):
-                    raise SemanticError(f"Type mismatch initializing {stmt.name}: {stmt.var_type} <- {init_type}")
-            symtab[stmt.name] = Symbol(stmt.name, stmt.var_type)
-            current_scope.add(stmt.name)
-
-        elif isinstance(stmt, Assignment):
-            if stmt.target not in symtab:
-                raise SemanticError(f"Assignment to undeclared variable {stmt.target}")
-            ttype = symtab[stmt.target].typ
-            vtype = self.eval_expr_type(stmt.value, symtab)
-            if not self.type_compatible(ttype, vtype):
-                raise SemanticError(f"Type mismatch in assignment to {stmt.target}: {ttype} <- {vtype}")
-
-        elif isinstance(stmt, IfStmt):
-            condt = self.eval_expr_type(stmt.cond, symtab)
-            if condt != 'bool':
-                raise SemanticError(f"Condition in if must be bool, got {condt}")
-            self.walk_stmt(stmt.then_branch, dict(symtab), ret_type, set()) if isinstance(stmt.then_branch, Block) else self.walk_stmt(stmt.then_branch, symtab, ret_type, current_scope)
-            if stmt.else_branch:
-                self.walk_stmt(stmt.else_branch, dict(symtab), ret_type, set()) if isinstance(stmt.else_branch, Block) else self.walk_stmt(stmt.else_branch, symtab, ret_type, current_scope)
+            # Straight to the handler; walk_stmt only runs to report an unhandled statement
+            (handlers.get(type(stmt)) or self.walk_stmt)(stmt, symtab, ret_type)
 
-        elif isinstance(stmt, WhileStmt):
+    def walk_stmt(self, stmt, symtab: Scope, ret_type: str) -> None:
+        handler = self._stmt_handlers.get(type(stmt))
+        if handler is None:
+            raise SemanticError(f"Unhandled statement in semantic analyzer: {stmt}")
+        handler(stmt, symtab, ret_type)
+
+    def _walk_vardecl(self, stmt: VarDecl, symtab: Scope, ret_type: str) -> None:
+        if stmt.name in symtab.syms:
+            raise SemanticError(f"Variable {stmt.name} already declared")
+        if stmt.init is not None:
+            init_type = self.eval_expr_type(stmt.init, symtab)
+            if not self.type_compatible(stmt.var_type, init_type):
+                raise SemanticError(f"Type mismatch initializing {stmt.name}: {stmt.var_type} <- {init_type}")
+        symtab.syms[stmt.name] = Symbol(stmt.name, stmt.var_type)
+
+    def _walk_assignment(self, stmt: Assignment, symtab: Scope, ret_type: str) -> None:
+        target = symtab.lookup(stmt.target)
+        if target is None:
+            raise SemanticError(f"Assignment to undeclared variable {stmt.target}")
+        ttype = target.typ
+        vtype = self.eval_expr_type(stmt.value, symtab)
+        if not self.type_compatible(ttype, vtype):
+            raise SemanticError(f"Type mismatch in assignment to {stmt.target}: {ttype} <- {vtype}")
+
+    def _walk_if(self, stmt: IfStmt, symtab: Scope, ret_type: str) -> None:
+        condt = self.eval_expr_type(stmt.cond, symtab)
+        if condt is not T_BOOL:
+            raise SemanticError(f"Condition in if must be bool, got {condt}")
+        # A Block branch gets its own scope in _walk_block
+        self.walk_stmt(stmt.then_branch, symtab, ret_type)
+        if stmt.else_branch:
+            self.walk_stmt(stmt.else_branch, symtab, ret_type)
+
+    def _walk_while(self, stmt: WhileStmt, symtab: Scope, ret_type: str) -> None:
+        condt = self.eval_expr_type(stmt.cond, symtab)
+        if condt is not T_BOOL:
+            raise SemanticError(f"Condition in while must be bool, got {condt}")
+        # semantic checking of body (a Block body gets its own scope, so no symbols leak)
+        self.walk_stmt(stmt.body, symtab, ret_type)
+
+    def _walk_for(self, stmt: ForStmt, symtab: Scope, ret_type: str) -> None:
+        if stmt.init:
+            self.walk_stmt(stmt.init, symtab, ret_type)
+        if stmt.cond:
             condt = self.eval_expr_type(stmt.cond, symtab)
-            if condt != 'bool':
-                raise SemanticError(f"Condition in while must be bool, got {condt}")
-            # semantic checking of body (use copy to prevent accidental symbol leakage)
-            self.walk_stmt(stmt.body, dict(symtab), ret_type, set()) if isinstance(stmt.body, Block) else self.walk_stmt(stmt.body, symtab, ret_type, current_scope)
-
-        elif isinstance(stmt, ForStmt):
-            if stmt.init:
-                self.walk_stmt(stmt.init, symtab, ret_type, current_scope) if not isinstance(stmt.init, VarDecl) else self.walk_stmt(stmt.init, symtab, ret_type, current_scope)
-            if stmt.cond:
-                condt = self.eval_expr_type(stmt.cond, symtab)
-                if condt != 'bool':
-                    raise SemanticError(f"Condition in for must be bool, got {condt}")
-            if stmt.body:
-                self.walk_stmt(stmt.body, dict(symtab), ret_type, set()) if isinstance(stmt.body, Block) else self.walk_stmt(stmt.body, symtab, ret_type, current_scope)
-
-        elif isinstance(stmt, ReturnStmt):
-            if stmt.expr is None:
-                if ret_type != 'void':
-                    raise SemanticError(f"Missing return value for non-void function")
-            else:
-                et = self.eval_expr_type(stmt.expr, symtab)
-                if not self.type_compatible(ret_type, et):
-                    raise SemanticError(f"Return type mismatch: expected {ret_type}, got {et}")
-
-        elif isinstance(stmt, FuncCall):
-            if stmt.name not in ('print','read') and stmt.name not in self.functions:
-                raise SemanticError(f"Call to undefined function {stmt.name}")
-
-        elif isinstance(stmt, Block):
-            self.walk_block(stmt, dict(symtab), ret_type, set())
-
-        elif isinstance(stmt, (Expr, UnaryExpr, Literal, VarRef, FuncCall)):
-            self.eval_expr_type(stmt, symtab)
-
+            if condt is not T_BOOL:
+                raise SemanticError(f"Condition in for must be bool, got {condt}")
+        if stmt.body:
+            self.walk_stmt(stmt.body, symtab, ret_type)
+
+    def _walk_return(self, stmt: ReturnStmt, symtab: Scope, ret_type: str) -> None:
+        if stmt.expr is None:
+            if ret_type is not T_VOID:
+                raise SemanticError(f"Missing return value for non-void function")
         else:
-            raise SemanticError(f"Unhandled statement in semantic analyzer: {stmt}")
-
-    def eval_expr_type(self, expr, symtab) -> str:
-        if isinstance(expr, Literal):
-            return expr.typ
-        if isinstance(expr, VarRef):
-            if expr.name not in symtab:
+            et = self.eval_expr_type(stmt.expr, symtab)
+            if not self.type_compatible(ret_type, et):
+                raise SemanticError(f"Return type mismatch: expected {ret_type}, got {et}")
+
+    def _walk_call(self, stmt: FuncCall, symtab: Scope, ret_type: str) -> None:
+        if stmt.name not in self._ret_types:
+            raise SemanticError(f"Call to undefined function {stmt.name}")
+
+    def _walk_block(self, stmt: Block, symtab: Scope, ret_type: str) -> None:
+        self.walk_block(stmt, Scope(symtab), ret_type)
+
+    def _walk_expression(self, stmt, symtab: Scope, ret_type: str) -> None:
+        self.eval_expr_type(stmt, symtab)
+
+    def eval_expr_type(self, expr, symtab: Scope) -> str:
+        node_type = type(expr)
+        # Leaves are most of the nodes, so they are typed here without a handler call
+        if node_type is VarRef:
+            sym = symtab.lookup(expr.name)
+            if sym is None:
                 raise SemanticError(f"Use of undeclared variable {expr.name}")
-            return symtab[expr.name].typ
-        if isinstance(expr, Assignment):
-            if expr.target not in symtab:
-                raise SemanticError(f"Assignment to undeclared variable {expr.target}")
-            rtype = self.eval_expr_type(expr.value, symtab)
-            if not self.type_compatible(symtab[expr.target].typ, rtype):
-                raise SemanticError(f"Type mismatch in assignment to {expr.target}: {symtab[expr.target].typ} <- {rtype}")
-            return symtab[expr.target].typ
-        if isinstance(expr, UnaryExpr):
-            et = self.eval_expr_type(expr.expr, symtab)
-            if expr.op == '!':
-                if et != 'bool':
-                    raise SemanticError(f"'!' operator needs bool, got {et}")
-                return 'bool'
-
-            return et
-        if isinstance(expr, Expr):
-            lt = self.eval_expr_type(expr.left, symtab)
-            rt = self.eval_expr_type(expr.right, symtab)
-            if expr.op in ('+','-','*','/','%'):
-                if lt == 'float' or rt == 'float':
-                    return 'float'
-                return 'int'
-            if expr.op in ('<','>','<=','>=','==','!='):
-                return 'bool'
-            if expr.op in ('&&','||'):
-                return 'bool'
-            return 'int'
-        if isinstance(expr, FuncCall):
-            if expr.name == 'print':
-                return 'void'
-            if expr.name == 'read':
-                if not expr.args or not isinstance(expr.args[0], VarRef):
-                    raise SemanticError('read expects a variable')
-                if expr.args[0].name not in symtab:
-                    raise SemanticError(f"read on undeclared variable {expr.args[0].name}")
-                return 'void'
-            if expr.name not in self.functions:
-                raise SemanticError(f"Call to undefined function {expr.name}")
-            return self.functions[expr.name].ret_type
-        raise SemanticError(f"Unable to determine expression type for {expr}")
+            return sym.typ
+        if node_type is Literal:
+            return expr.typ
+        handler = self._expr_handlers.get(node_type)
+        if handler is None:
+            raise SemanticError(f"Unable to determine expression type for {expr}")
+        return handler(expr, symtab)
+
+    def _type_assignment(self, expr: Assignment, symtab: Scope) -> str:
+        target = symtab.lookup(expr.target)
+        if target is None:
+            raise SemanticError(f"Assignment to undeclared variable {expr.target}")
+        rtype = self.eval_expr_type(expr.value, symtab)
+        if not self.type_compatible(target.typ, rtype):
+            raise SemanticError(f"Type mismatch in assignment to {expr.target}: {target.typ} <- {rtype}")
+        return target.typ
+
+    def _type_unary(self, expr: UnaryExpr, symtab: Scope) -> str:
+        et = self.eval_expr_type(expr.expr, symtab)
+        if expr.op == '!':
+            if et is not T_BOOL:
+                raise SemanticError(f"'!' operator needs bool, got {et}")
+            return T_BOOL
+
+        return et
+
+    def _type_binary(self, expr: Expr, symtab: Scope) -> str:
+        lt = self.eval_expr_type(expr.left, symtab)
+        rt = self.eval_expr_type(expr.right, symtab)
+        if expr.op in ARITH_OPS:
+            if lt is T_FLOAT or rt is T_FLOAT:
+                return T_FLOAT
+            return T_INT
+        if expr.op in ('<','>','<=','>=','==','!='):
+            return T_BOOL
+        if expr.op in ('&&','||'):
+            return T_BOOL
+        return T_INT
+
+    def _type_call(self, expr: FuncCall, symtab: Scope) -> str:
+        if expr.name == 'read':
+            if not expr.args or type(expr.args[0]) is not VarRef:
+                raise SemanticError('read expects a variable')
+            if symtab.lookup(expr.args[0].name) is None:
+                raise SemanticError(f"read on undeclared variable {expr.args[0].name}")
+        ret_type = self._ret_types.get(expr.name)
+        if ret_type is None:
+            raise SemanticError(f"Call to undefined function {expr.name}")
+        return ret_type
 
     def type_compatible(self, dest: str, src: str) -> bool:
-        if dest == src:
-            return True
-        if dest == 'float' and src == 'int':
-            return True
-        if dest == 'int' and src == 'char':
-            return True
-        if dest == 'char' and src == 'int':
-            return True
-        return False
\ No newline at end of file
+        return dest is src or src in ACCEPTS.get(dest, ())
\ No newline at end of file
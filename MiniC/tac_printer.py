@@ -6,108 +6,95 @@ This module provides functions to print Three-Address Code (TAC)
 in different formats: Quadruples, Triples, and Postfix (RPN).
 """
 
+from io import StringIO
 from typing import List
 from MiniC.ir_generator import TACInstruction
 
+# Line formats for each kind of instruction, indexed by op-code and given
+# the instruction's number and the instruction
+_QUADRUPLE_FORMATTERS = (
+    lambda i, ins: f"({i}) (assign, {ins.src1}, -, {ins.dest})",                              # OP_ASSIGN
+    lambda i, ins: f"({i}) ({ins.binop_op}, {ins.src1}, {ins.binop_right}, {ins.dest})",      # OP_BINOP
+    lambda i, ins: f"({i}) ({ins.src1}, {ins.src2}, -, {ins.dest})",                          # OP_UNOP
+    lambda i, ins: f"({i}) (goto, -, -, {ins.label})",                                        # OP_JUMP
+    lambda i, ins: f"({i}) (if, {ins.dest}, -, {ins.label})",                                 # OP_CJUMP
+    lambda i, ins: f"({i}) (label, -, -, {ins.label})",                                       # OP_LABEL
+    lambda i, ins: f"({i}) (call, {', '.join(ins.args) or '-'}, {ins.src2}, {ins.dest})",     # OP_CALL
+    lambda i, ins: f"({i}) (return, {ins.dest or '-'}, -, -)",                                # OP_RETURN
+    lambda i, ins: f"({i}) (param, {ins.dest}, -, -)",                                        # OP_PARAM
+)
+
+_TRIPLE_FORMATTERS = (
+    lambda i, ins: f"({i}) (assign, {ins.src1}, -)",                                          # OP_ASSIGN
+    lambda i, ins: f"({i}) ({ins.binop_op}, {ins.src1}, {ins.binop_right})",                  # OP_BINOP
+    lambda i, ins: f"({i}) ({ins.src1}, {ins.src2}, -)",                                      # OP_UNOP
+    lambda i, ins: f"({i}) (goto, -, {ins.label})",                                           # OP_JUMP
+    lambda i, ins: f"({i}) (if, {ins.dest}, {ins.label})",                                    # OP_CJUMP
+    lambda i, ins: f"({i}) (label, -, {ins.label})",                                          # OP_LABEL
+    lambda i, ins: f"({i}) (call, {', '.join(ins.args) or '-'}, {ins.src2})",                 # OP_CALL
+    lambda i, ins: f"({i}) (return, {ins.dest or '-'}, -)",                                   # OP_RETURN
+    lambda i, ins: f"({i}) (param, {ins.dest}, -)",                                           # OP_PARAM
+)
+
+# Postfix lines are not numbered, so these take just the instruction
+_POSTFIX_FORMATTERS = (
+    lambda ins: f"{ins.src1} {ins.dest} =",                                                   # OP_ASSIGN
+    lambda ins: f"{ins.src1} {ins.binop_right} {ins.binop_op} {ins.dest} =",                  # OP_BINOP
+    lambda ins: f"{ins.src2} {ins.src1} {ins.dest} =",                                        # OP_UNOP
+    lambda ins: f"goto {ins.label}",                                                          # OP_JUMP
+    lambda ins: f"{ins.dest} if goto {ins.label}",                                            # OP_CJUMP
+    lambda ins: f"{ins.label}:",                                                              # OP_LABEL
+    lambda ins: f"{' '.join(ins.args)} {ins.src2} call {ins.dest} =",                         # OP_CALL
+    lambda ins: f"{ins.dest or ''} return",                                                   # OP_RETURN
+    lambda ins: f"{ins.dest} param",                                                          # OP_PARAM
+)
+
 class TACPrinter:
-    """Handles printing TAC in various formats."""
+    """Handles printing TAC in various formats.
+
+    Lines are written into one growing StringIO buffer, each after the
+    newline that ends the one before, so the finished text is returned
+    as is rather than copied again to drop a trailing newline."""
 
     @staticmethod
     def print_quadruples(instructions: List[TACInstruction]) -> str:
         """Print TAC as quadruples: (op, arg1, arg2, result)"""
-        lines = []
-        for i, instr in enumerate(instructions, 1):
-            if instr.op == 'assign':
-                lines.append(f"({i}) ({instr.op}, {instr.src1}, -, {instr.dest})")
-            elif instr.op == 'binop':
-                # src2 is "op right", so parse it
-                parts = instr.src2.split(' ', 1)
-                op = parts[0]
-                arg2 = parts[1] if len(parts) > 1 else '-'
-                lines.append(f"({i}) ({op}, {instr.src1}, {arg2}, {instr.dest})")
-            elif instr.op == 'unop':
-                lines.append(f"({i}) ({instr.src1}, {instr.src2}, -, {instr.dest})")
-            elif instr.op == 'jump':
-                lines.append(f"({i}) (goto, -, -, {instr.label})")
-            elif instr.op == 'cjump':
-                lines.append(f"({i}) (if, {instr.dest}, -, {instr.label})")
-            elif instr.op == 'label':
-                lines.append(f"({i}) (label, -, -, {instr.label})")
-            elif instr.op == 'call':
-                args_str = ', '.join(instr.src1) if instr.src1 else '-'
-                lines.append(f"({i}) (call, {args_str}, {instr.src2}, {instr.dest})")
-            elif instr.op == 'return':
-                lines.append(f"({i}) (return, {instr.dest or '-'}, -, -)")
-            elif instr.op == 'param':
-                lines.append(f"({i}) (param, {instr.dest}, -, -)")
-            else:
-                lines.append(f"({i}) ({instr.op}, {instr.src1 or '-'}, {instr.src2 or '-'}, {instr.dest or '-'})")
-        return '\n'.join(lines)
+        formatters = _QUADRUPLE_FORMATTERS
+        buf = StringIO()
+        write = buf.write
+        sep = ''
+        for i, ins in enumerate(instructions, 1):
+            write(sep)
+            write(formatters[ins.op](i, ins))
+            sep = '\n'
+        return buf.getvalue()
 
     @staticmethod
     def print_triples(instructions: List[TACInstruction]) -> str:
         """Print TAC as triples: (op, arg1, arg2) with implicit result as index"""
-        lines = []
-        for i, instr in enumerate(instructions, 1):
-            if instr.op == 'assign':
-                lines.append(f"({i}) ({instr.op}, {instr.src1}, -)")
-            elif instr.op == 'binop':
-                parts = instr.src2.split(' ', 1)
-                op = parts[0]
-                arg2 = parts[1] if len(parts) > 1 else '-'
-                lines.append(f"({i}) ({op}, {instr.src1}, {arg2})")
-            elif instr.op == 'unop':
-                lines.append(f"({i}) ({instr.src1}, {instr.src2}, -)")
-            elif instr.op == 'jump':
-                lines.append(f"({i}) (goto, -, {instr.label})")
-            elif instr.op == 'cjump':
-                lines.append(f"({i}) (if, {instr.dest}, {instr.label})")
-            elif instr.op == 'label':
-                lines.append(f"({i}) (label, -, {instr.label})")
-            elif instr.op == 'call':
-                args_str = ', '.join(instr.src1) if instr.src1 else '-'
-                lines.append(f"({i}) (call, {args_str}, {instr.src2})")
-            elif instr.op == 'return':
-                lines.append(f"({i}) (return, {instr.dest or '-'}, -)")
-            elif instr.op == 'param':
-                lines.append(f"({i}) (param, {instr.dest}, -)")
-            else:
-                lines.append(f"({i}) ({instr.op}, {instr.src1 or '-'}, {instr.src2 or '-'})")
-        return '\n'.join(lines)
+        formatters = _TRIPLE_FORMATTERS
+        buf = StringIO()
+        write = buf.write
+        sep = ''
+        for i, ins in enumerate(instructions, 1):
+            write(sep)
+            write(formatters[ins.op](i, ins))
+            sep = '\n'
+        return buf.getvalue()
 
     @staticmethod
     def print_postfix(instructions: List[TACInstruction]) -> str:
         """Print TAC in postfix (RPN) notation for expressions."""
-        # For simplicity, convert each instruction to RPN form
-        lines = []
-        for instr in instructions:
-            if instr.op == 'assign':
-                lines.append(f"{instr.src1} {instr.dest} =")
-            elif instr.op == 'binop':
-                parts = instr.src2.split(' ', 1)
-                op = parts[0]
-                arg2 = parts[1] if len(parts) > 1 else ''
-                lines.append(f"{instr.src1} {arg2} {op} {instr.dest} =")
-            elif instr.op == 'unop':
-                lines.append(f"{instr.src2} {instr.src1} {instr.dest} =")
-            elif instr.op == 'jump':
-                lines.append(f"goto {instr.label}")
-            elif instr.op == 'cjump':
-                lines.append(f"{instr.dest} if goto {instr.label}")
-            elif instr.op == 'label':
-                lines.append(f"{instr.label}:")
-            elif instr.op == 'call':
-                args_str = ' '.join(instr.src1) if instr.src1 else ''
-                lines.append(f"{args_str} {instr.src2} call {instr.dest} =")
-            elif instr.op == 'return':
-                lines.append(f"{instr.dest or ''} return")
-            elif instr.op == 'param':
-                lines.append(f"{instr.dest} param")
-            else:
-                lines.append(str(instr))
-        return '\n'.join(lines)
+        formatters = _POSTFIX_FORMATTERS
+        buf = StringIO()
+        write = buf.write
+        sep = ''
+        for ins in instructions:
+            write(sep)
+            write(formatters[ins.op](ins))
+            sep = '\n'
+        return buf.getvalue()
 
-@staticmethod
 def print_tac(instructions: List[TACInstruction], format_type: str = 'standard') -> str:
     """Print TAC in the specified format."""
     if format_type == 'quadruples':
@@ -118,4 +105,4 @@ def print_tac(instructions: List[TACInstruction], format_type: str = 'standard')
         return TACPrinter.print_postfix(instructions)
     else:
         # Standard TAC
-        return '\n'.join(str(instr) for instr in instructions)
\ No newline at end of file
+        return '\n'.join(map(str, instructions))
\ No newline at end of file
@@ -0,0 +1,22 @@
+# Mini_c.pxd
+# Declarations that let Cython compile Mini_c.py (cythonize -i Mini_c.py)
+
+cdef class Parser:
+    cdef public list tokens
+    cdef public Py_ssize_t pos
+    cdef dict _literals
+
+    cpdef peek(self)
+    cpdef next(self)
+    cpdef expect(self, str typ, val=*)
+    cpdef parse_statement(self)
+    cpdef parse_expression(self, int min_prec=*)
+    cpdef parse_primary(self)
+
+cdef class Interpreter:
+    cdef public object program
+    cdef public dict functions
+    cdef public int depth
+    cdef dict _stmt_compilers, _expr_compilers
+
+    cpdef exec_function(self, func, list args)
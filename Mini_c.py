@@ -1,3 +1,4 @@
+# cython: annotation_typing=False
 """
 File: MiniC_compiler.py
 
@@ -5,9 +6,10 @@ File: MiniC_compiler.py
 2. Parser - recursive-descent parser that builds an AST from tokens
 3. Semantic Analyzer - walks the AST performing symbol table construction,
    undeclared variable checks, function checks, and basic type checking
-4. Interpreter (optional "backend") - executes the AST directly to
-   demonstrate semantics. This stands in for code generation in this
-   simplified compiler.
+4. Interpreter (optional "backend") - turns each function's AST into nested
+   Python closures on its first call and runs those to demonstrate
+   semantics. This stands in for code generation in this simplified
+   compiler.
 
 Supported features (as per your proposal):
 - Primitive types: int, float, char, bool
@@ -33,13 +35,30 @@ Usage
 - To run sample programs included at the bottom of this file:
     python MiniC_compiler.py --run-samples
 
+- With numba installed, --jit compiles functions that only compute on
+  int/float/bool locals (no calls, print or read) to machine code; a call
+  whose int arithmetic overflows 64 bits is rerun by the interpreter:
+    python MiniC_compiler.py --jit path/to/program.mc
+
+- Optionally, compile this file with Cython (using the types in Mini_c.pxd)
+  for a faster parser and interpreter:
+    pip install cython
+    cythonize -i Mini_c.py
+  The extension is used when the module is imported, e.g.
+    python -c "import Mini_c; Mini_c.compile_and_run(open('prog.mc').read())"
+  (running the .py file as a script still runs the source). Rebuild it after
+  editing this file, or delete the built Mini_c.*.so. Compiled code recurses
+  on the C stack, so MiniC calls are capped at MAX_CALL_DEPTH, and expressions
+  nested many thousands of levels deep can crash it instead of raising
+  RecursionError.
+
 The parser/AST implementation is compact but annotated.
 
 """
 
 import re
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional, Any, Dict, Tuple
 
 # --------------------------- Lexer ---------------------------
@@ -66,128 +85,246 @@ TokenSpec = [
     (r"'([^'\\]|\\.)'",       'CHAR_LIT'),
     (r'\"([^"\\]|\\.)*\"', 'STRING_LIT'),
     (r"[A-Za-z_][A-Za-z0-9_]*",   'ID'),
-    (r"\+|\-|\*|/|%",          'ARITH'),
+    (r"[+\-*/%]",               'ARITH'),
     (r"<=|>=|==|!=|<|>",         'RELOP'),
     (r"&&|\|\||!",             'LOGIC'),
     (r"=",                       'ASSIGN'),
-    (r";|,|\(|\)|\{|\}|\[|\]", 'SYM'),
+    (r"[;,(){}\[\]]",             'SYM'),
 ]
 
 master_pat = re.compile('|'.join('(?P<T%d>%s)' % (i, p[0]) for i, p in enumerate(TokenSpec)), re.S)
 
-@dataclass
+# token kind by the number of each rule's group in master_pat (None for
+# whitespace/comments). A rule's group closes after any group nested in it,
+# so it is the match's lastindex; the nested groups' slots stay None.
+_KIND_BY_INDEX: List[Optional[str]] = [None] * (master_pat.groups + 1)
+for _i, _spec in enumerate(TokenSpec):
+    _KIND_BY_INDEX[master_pat.groupindex[f'T{_i}']] = _spec[1]
+
+@dataclass(slots=True)
 class Token:
     type: str
     value: str
     lineno: int
     col: int
 
+# --- hand-written scanner: branches on the first character of each token ---
+# It follows the TokenSpec rules exactly (same tokens, positions and skipped
+# characters) but only runs a small regex for tokens longer than an operator.
+
+_KEYWORDS = {
+    'int': 'INT_KW', 'float': 'FLOAT_KW', 'char': 'CHAR_KW', 'bool': 'BOOL_KW',
+    'if': 'IF', 'else': 'ELSE', 'for': 'FOR', 'while': 'WHILE', 'return': 'RETURN',
+    'void': 'VOID', 'print': 'PRINT', 'read': 'READ', 'true': 'BOOL_LIT', 'false': 'BOOL_LIT',
+}
+_OPS2 = {'<=': 'RELOP', '>=': 'RELOP', '==': 'RELOP', '!=': 'RELOP', '&&': 'LOGIC', '||': 'LOGIC'}
+_OPS1 = {'+': 'ARITH', '-': 'ARITH', '*': 'ARITH', '/': 'ARITH', '%': 'ARITH',
+         '<': 'RELOP', '>': 'RELOP', '!': 'LOGIC', '=': 'ASSIGN',
+         ';': 'SYM', ',': 'SYM', '(': 'SYM', ')': 'SYM', '{': 'SYM', '}': 'SYM', '[': 'SYM', ']': 'SYM'}
+_ID_START = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_')
+_DIGITS = frozenset('0123456789')
+_SPACE = frozenset(' \t\r\n')
+_space_pat = re.compile(r"[ \t\r\n]+")
+_ident_pat = re.compile(r"[A-Za-z0-9_]*")
+_number_pat = re.compile(r"[0-9]+(?:\.[0-9]+)?")
+_char_pat = re.compile(r"'([^'\\]|\\.)'", re.S)
+_string_pat = re.compile(r'\"([^"\\]|\\.)*\"', re.S)
+
+def _is_word(ch: str) -> bool:
+    # what \b counts as a word character
+    return ch.isalnum() or ch == '_'
+
 def tokenize(code: str) -> List[Token]:
     tokens: List[Token] = []
+    _append = tokens.append
+    n = len(code)
+    i = 0
     line_no = 1
     line_start = 0
-    for m in master_pat.finditer(code):
-        kind = None
-        value = m.group(0)
-        # identify which named group matched
-        for i, spec in enumerate(TokenSpec):
-            if m.lastgroup == f'T{i}':
-                kind = spec[1]
-                break
-        if kind is None:
-            # skip (whitespace or comment)
-            pass
+    while i < n:
+        c = code[i]
+        value = None  # text of a skipped match (whitespace/comment) that may hold newlines
+        if c in _SPACE:
+            j = _space_pat.match(code, i).end()
+            value = code[i:j]
+        elif c in _ID_START:
+            j = _ident_pat.match(code, i + 1).end()
+            # interned, so type names and variable names compare (and hash
+            # into env dicts) by identity from here on
+            word = sys.intern(code[i:j])
+            kind = _KEYWORDS.get(word)
+            # keywords are matched with \b on both sides, so 'éint' and 'inté' hold an ID 'int'
+            if kind is None or (i and _is_word(code[i - 1])) or (j < n and _is_word(code[j])):
+                kind = 'ID'
+            _append(Token(kind, word, line_no, i - line_start + 1))
+        elif c in _DIGITS:
+            j = _number_pat.match(code, i).end()
+            word = code[i:j]
+            _append(Token('FLOAT_LIT' if '.' in word else 'INT_LIT', word, line_no, i - line_start + 1))
+        elif c == '/' and code.startswith('/', i + 1):
+            # a line comment runs to the end of the input (TokenSpec's '//.*' is compiled with re.S)
+            j = n
+            value = code[i:]
+        elif c == '/' and code.startswith('*', i + 1) and code.find('*/', i + 2) >= 0:
+            j = code.find('*/', i + 2) + 2
+            value = code[i:j]
+        elif c == "'" or c == '"':
+            m = (_char_pat if c == "'" else _string_pat).match(code, i)
+            if m is None:
+                i += 1  # no rule matches a lone quote; skip it
+                continue
+            j = m.end()
+            value = m.group(0)
+            _append(Token('CHAR_LIT' if c == "'" else 'STRING_LIT', value, line_no, i - line_start + 1))
         else:
-            col = m.start() - line_start + 1
-            tok = Token(kind, value, line_no, col)
-            tokens.append(tok)
-        # update line number
-        line_no += value.count('\n')
-        if '\n' in value:
-            line_start = m.end()
+            kind = _OPS2.get(code[i:i + 2])
+            if kind is not None:
+                j = i + 2
+            else:
+                kind = _OPS1.get(c)
+                if kind is None:
+                    i += 1  # no rule matches this character; skip it
+                    continue
+                j = i + 1
+            _append(Token(kind, code[i:j], line_no, i - line_start + 1))
+        if value is not None and '\n' in value:
+            line_no += value.count('\n')
+            line_start = j
+        i = j
+    _append(Token('EOF', '', line_no, 1))
+    return tokens
+
+def tokenize_regex(code: str) -> List[Token]:
+    # the TokenSpec master regex; reference for the hand-written scanner above
+    tokens: List[Token] = []
+    _append = tokens.append
+    kinds = _KIND_BY_INDEX
+    match = master_pat.match
+    n = len(code)
+    pos = 0
+    line_no = 1
+    line_start = 0
+    while pos < n:
+        c = code[pos]
+        # whitespace and comments are skipped here, so the master regex only
+        # runs where a token can start
+        if c in _SPACE:
+            end = _space_pat.match(code, pos).end()
+        elif c == '/' and code.startswith('/', pos + 1):
+            end = n  # '//.*' runs to the end of the input under re.S
+        elif c == '/' and code.startswith('*', pos + 1) and code.find('*/', pos + 2) >= 0:
+            end = code.find('*/', pos + 2) + 2
+        else:
+            m = match(code, pos)
+            if m is None:
+                pos += 1  # no rule matches this character; skip it
+                continue
+            end = m.end()
+            value = m.group(0)
+            # one index by the matched group's number
+            _append(Token(kinds[m.lastindex], value, line_no, pos - line_start + 1))
+            if '\n' in value:
+                line_no += value.count('\n')
+                line_start = end
+            pos = end
+            continue
+        newlines = code.count('\n', pos, end)
+        if newlines:
+            line_no += newlines
+            line_start = end
+        pos = end
     tokens.append(Token('EOF', '', line_no, 1))
     return tokens
 
 # --------------------------- AST Nodes ---------------------------
 
 class ASTNode:
-    pass
+    __slots__ = ()
 
-@dataclass
+@dataclass(slots=True)
 class Program(ASTNode):
     functions: List[Any]
 
-@dataclass
+@dataclass(slots=True)
 class Function(ASTNode):
     ret_type: str
     name: str
     params: List[Tuple[str, str]]
     body: Any
+    code: Any = field(default=None, repr=False, compare=False)  # compiled body, set by the Interpreter
+    native: Any = field(default=None, repr=False, compare=False)  # numba-compiled version (--jit)
 
-@dataclass
+@dataclass(slots=True)
 class Block(ASTNode):
     statements: List[Any]
 
-@dataclass
+@dataclass(slots=True)
 class VarDecl(ASTNode):
     var_type: str
     name: str
     init: Optional[Any]
 
-@dataclass
+@dataclass(slots=True)
 class Assignment(ASTNode):
     target: str
     value: Any
 
-@dataclass
+@dataclass(slots=True)
 class IfStmt(ASTNode):
     cond: Any
     then_branch: Any
     else_branch: Optional[Any]
 
-@dataclass
+@dataclass(slots=True)
 class WhileStmt(ASTNode):
     cond: Any
     body: Any
 
-@dataclass
+@dataclass(slots=True)
 class ForStmt(ASTNode):
     init: Optional[Any]
     cond: Optional[Any]
     update: Optional[Any]
     body: Any
 
-@dataclass
+@dataclass(slots=True)
 class ReturnStmt(ASTNode):
     expr: Optional[Any]
 
-@dataclass
+@dataclass(slots=True)
 class Expr(ASTNode):
     op: Optional[str]
     left: Any
     right: Any
 
-@dataclass
+@dataclass(slots=True)
 class UnaryExpr(ASTNode):
     op: str
     expr: Any
 
-@dataclass
+@dataclass(slots=True)
 class Literal(ASTNode):
     value: Any
     typ: str
 
-@dataclass
+@dataclass(slots=True)
 class VarRef(ASTNode):
     name: str
 
-@dataclass
+@dataclass(slots=True)
 class FuncCall(ASTNode):
     name: str
     args: List[Any]
 
 # --------------------------- Parser ---------------------------
 
+# binary operator precedence, by token text (only operator tokens have these texts)
+_BINARY_PREC = {
+    '*': 5, '/': 5, '%': 5, '+': 4, '-': 4,
+    '<': 3, '>': 3, '<=': 3, '>=': 3, '==': 3, '!=': 3,
+    '||': 2, '&&': 1,
+}
+
 class ParserError(Exception):
     pass
 
@@ -195,6 +332,10 @@ class Parser:
     def __init__(self, tokens: List[Token]):
         self.tokens = tokens
         self.pos = 0
+        # one shared Literal node per literal text; nothing modifies a Literal
+        # once it is parsed. The text alone is the key since it also fixes
+        # the kind: '1', '1.0', "'1'", '"1"' and 'true' are different texts.
+        self._literals: Dict[str, Literal] = {}
 
     def peek(self) -> Token:
         return self.tokens[self.pos]
@@ -205,12 +346,13 @@ class Parser:
         return tok
 
     def expect(self, typ: str, val: Optional[str]=None) -> Token:
-        tok = self.peek()
+        tok = self.tokens[self.pos]
         if tok.type != typ:
             raise ParserError(f"Expected {typ} at {tok.lineno}:{tok.col}, found {tok.type} ('{tok.value}')")
         if val is not None and tok.value != val:
             raise ParserError(f"Expected {val} at {tok.lineno}:{tok.col}, found '{tok.value}'")
-        return self.next()
+        self.pos += 1
+        return tok
 
     def parse(self) -> Program:
         funcs = []
@@ -251,13 +393,18 @@ class Parser:
     def parse_block(self) -> Block:
         self.expect('SYM','{')
         stmts = []
-        while not (self.peek().type=='SYM' and self.peek().value=='}'):
-            stmts.append(self.parse_statement())
-        self.expect('SYM','}')
+        tokens = self.tokens
+        parse_statement = self.parse_statement
+        while True:
+            tok = tokens[self.pos]
+            if tok.type=='SYM' and tok.value=='}':
+                break
+            stmts.append(parse_statement())
+        self.pos += 1
         return Block(stmts)
 
     def parse_statement(self):
-        tok = self.peek()
+        tok = self.tokens[self.pos]
         if tok.type in ('INT_KW','FLOAT_KW','CHAR_KW','BOOL_KW'):
             return self.parse_vardecl()
         if tok.type == 'ID':
@@ -374,85 +521,76 @@ class Parser:
 
     # Expression parsing (precedence climbing)
     def parse_expression(self, min_prec=0):
-        tok = self.peek()
+        tokens = self.tokens
+        tok = tokens[self.pos]
         # handle unary
-        if tok.type == 'ARITH' and tok.value in ('+','-'):
-            op = self.next().value
-            left = UnaryExpr(op, self.parse_expression(6))
-        elif tok.type == 'LOGIC' and tok.value == '!':
-            op = self.next().value
-            left = UnaryExpr(op, self.parse_expression(6))
+        if (tok.type == 'ARITH' and tok.value in ('+','-')) or (tok.type == 'LOGIC' and tok.value == '!'):
+            self.pos += 1
+            left = UnaryExpr(tok.value, self.parse_expression(6))
         else:
             left = self.parse_primary()
 
         while True:
-            tok = self.peek()
-            if tok.type == 'ARITH':
-                prec = 5 if tok.value in ('*','/','%') else 4
-                assoc = 'L'
-                op = tok.value
-            elif tok.type == 'RELOP':
-                prec = 3
-                assoc = 'L'
-                op = tok.value
-            elif tok.type == 'LOGIC':
-                if tok.value in ('&&','||'):
-                    prec = 2 if tok.value=='||' else 1
-                    assoc = 'L'
-                    op = tok.value
-                else:
+            tok = tokens[self.pos]
+            prec = _BINARY_PREC.get(tok.value)
+            if prec is not None:
+                if prec < min_prec:
                     break
+                self.pos += 1
+                # left-associative: the right operand only takes tighter operators
+                left = Expr(tok.value, left, self.parse_expression(prec+1))
             elif tok.type == 'ASSIGN' and isinstance(left, VarRef):
                 # assignment is right-assoc and lowest precedence
-                prec = 0
-                assoc = 'R'
-                op = tok.value
+                if min_prec > 0:
+                    break
+                self.pos += 1
+                left = Assignment(left.name, self.parse_expression(0))
             else:
                 break
-            if prec < min_prec:
-                break
-            self.next()
-            if assoc == 'L':
-                rhs = self.parse_expression(prec+1)
-            else:
-                rhs = self.parse_expression(prec)
-            if op == '=':
-                left = Assignment(left.name, rhs)
-            else:
-                left = Expr(op, left, rhs)
         return left
 
     def parse_primary(self):
-        tok = self.peek()
+        tokens = self.tokens
+        tok = tokens[self.pos]
+        lit = self._literals.get(tok.value)
+        if lit is not None:
+            self.pos += 1
+            return lit
         if tok.type == 'INT_LIT':
-            self.next(); return Literal(int(tok.value), 'int')
-        if tok.type == 'FLOAT_LIT':
-            self.next(); return Literal(float(tok.value), 'float')
-        if tok.type == 'CHAR_LIT':
-            self.next(); val = tok.value[1:-1]
-            return Literal(val, 'char')
-        if tok.type == 'STRING_LIT':
-            self.next(); return Literal(tok.value[1:-1], 'string')
-        if tok.type == 'BOOL_LIT':
-            self.next(); return Literal(True if tok.value=='true' else False, 'bool')
+            lit = Literal(int(tok.value), 'int')
+        elif tok.type == 'FLOAT_LIT':
+            lit = Literal(float(tok.value), 'float')
+        elif tok.type == 'CHAR_LIT':
+            lit = Literal(tok.value[1:-1], 'char')
+        elif tok.type == 'STRING_LIT':
+            lit = Literal(tok.value[1:-1], 'string')
+        elif tok.type == 'BOOL_LIT':
+            lit = Literal(True if tok.value=='true' else False, 'bool')
+        if lit is not None:
+            self.pos += 1
+            self._literals[tok.value] = lit
+            return lit
         if tok.type == 'ID':
-            id_tok = self.next()
+            self.pos += 1
+            nxt = tokens[self.pos]
             # function call?
-            if self.peek().type=='SYM' and self.peek().value=='(':
-                self.next()
+            if nxt.type=='SYM' and nxt.value=='(':
+                self.pos += 1
                 args = []
-                if not (self.peek().type=='SYM' and self.peek().value==')'):
+                nxt = tokens[self.pos]
+                if not (nxt.type=='SYM' and nxt.value==')'):
                     while True:
                         args.append(self.parse_expression())
-                        if self.peek().type=='SYM' and self.peek().value==',':
-                            self.next(); continue
+                        nxt = tokens[self.pos]
+                        if nxt.type=='SYM' and nxt.value==',':
+                            self.pos += 1; continue
                         break
                 self.expect('SYM',')')
-                return FuncCall(id_tok.value, args)
+                return FuncCall(tok.value, args)
             else:
-                return VarRef(id_tok.value)
+                return VarRef(tok.value)
         if tok.type=='SYM' and tok.value=='(':
-            self.next()
+            self.pos += 1
             expr = self.parse_expression()
             self.expect('SYM',')')
             return expr
@@ -464,6 +602,8 @@ class SemanticError(Exception):
     pass
 
 class Symbol:
+    __slots__ = ('name', 'typ', 'kind')
+
     def __init__(self, name, typ, kind='var'):
         self.name = name
         self.typ = typ
@@ -474,6 +614,18 @@ class SemanticAnalyzer:
         self.program = program
         self.globals: Dict[str, Symbol] = {}
         self.functions: Dict[str, Function] = {}
+        # checks for each kind of statement and expression node, keyed by node type
+        self._stmt_handlers = {
+            VarDecl: self._walk_vardecl, Assignment: self._walk_assignment, IfStmt: self._walk_if,
+            WhileStmt: self._walk_while, ForStmt: self._walk_for, ReturnStmt: self._walk_return,
+            FuncCall: self._walk_call, Block: self._walk_block,
+            Expr: self._walk_expression, UnaryExpr: self._walk_expression,
+            Literal: self._walk_expression, VarRef: self._walk_expression,
+        }
+        self._expr_handlers = {
+            Literal: self._type_literal, VarRef: self._type_varref, Assignment: self._type_assignment,
+            UnaryExpr: self._type_unary, Expr: self._type_binary, FuncCall: self._type_call,
+        }
 
     def analyze(self):
         # collect functions
@@ -502,125 +654,135 @@ class SemanticAnalyzer:
             self.walk_stmt(stmt, symtab, ret_type)
 
     def walk_stmt(self, stmt, symtab, ret_type):
-        if isinstance(stmt, VarDecl):
-            if stmt.name in symtab:
-                raise SemanticError(f"Variable {stmt.name} already declared")
-            if stmt.init is not None:
-                init_type = self.eval_expr_type(stmt.init, symtab)
-                # simple compatibility check
-                if not self.type_compatible(stmt.var_type, init_type):
-                    raise SemanticError(f"Type mismatch initializing {stmt.name}: {stmt.var_type} <- {init_type}")
-            symtab[stmt.name] = Symbol(stmt.name, stmt.var_type)
-
-        elif isinstance(stmt, Assignment):
-            if stmt.target not in symtab:
-                raise SemanticError(f"Assignment to undeclared variable {stmt.target}")
-            ttype = symtab[stmt.target].typ
-            vtype = self.eval_expr_type(stmt.value, symtab)
-            if not self.type_compatible(ttype, vtype):
-                raise SemanticError(f"Type mismatch in assignment to {stmt.target}: {ttype} <- {vtype}")
-
-        elif isinstance(stmt, IfStmt):
-            condt = self.eval_expr_type(stmt.cond, symtab)
-            if condt != 'bool':
-                raise SemanticError(f"Condition in if must be bool, got {condt}")
-            self.walk_stmt(stmt.then_branch, dict(symtab), ret_type) if isinstance(stmt.then_branch, Block) else self.walk_stmt(stmt.then_branch, symtab, ret_type)
-            if stmt.else_branch:
-                self.walk_stmt(stmt.else_branch, dict(symtab), ret_type) if isinstance(stmt.else_branch, Block) else self.walk_stmt(stmt.else_branch, symtab, ret_type)
-
-        elif isinstance(stmt, WhileStmt):
+        handler = self._stmt_handlers.get(type(stmt))
+        if handler is None:
+            raise SemanticError(f"Unhandled statement in semantic analyzer: {stmt}")
+        handler(stmt, symtab, ret_type)
+
+    def _walk_vardecl(self, stmt: VarDecl, symtab, ret_type):
+        if stmt.name in symtab:
+            raise SemanticError(f"Variable {stmt.name} already declared")
+        if stmt.init is not None:
+            init_type = self.eval_expr_type(stmt.init, symtab)
+            # simple compatibility check
+            if not self.type_compatible(stmt.var_type, init_type):
+                raise SemanticError(f"Type mismatch initializing {stmt.name}: {stmt.var_type} <- {init_type}")
+        symtab[stmt.name] = Symbol(stmt.name, stmt.var_type)
+
+    def _walk_assignment(self, stmt: Assignment, symtab, ret_type):
+        if stmt.target not in symtab:
+            raise SemanticError(f"Assignment to undeclared variable {stmt.target}")
+        ttype = symtab[stmt.target].typ
+        vtype = self.eval_expr_type(stmt.value, symtab)
+        if not self.type_compatible(ttype, vtype):
+            raise SemanticError(f"Type mismatch in assignment to {stmt.target}: {ttype} <- {vtype}")
+
+    def _walk_if(self, stmt: IfStmt, symtab, ret_type):
+        condt = self.eval_expr_type(stmt.cond, symtab)
+        if condt != 'bool':
+            raise SemanticError(f"Condition in if must be bool, got {condt}")
+        self.walk_stmt(stmt.then_branch, dict(symtab), ret_type) if isinstance(stmt.then_branch, Block) else self.walk_stmt(stmt.then_branch, symtab, ret_type)
+        if stmt.else_branch:
+            self.walk_stmt(stmt.else_branch, dict(symtab), ret_type) if isinstance(stmt.else_branch, Block) else self.walk_stmt(stmt.else_branch, symtab, ret_type)
+
+    def _walk_while(self, stmt: WhileStmt, symtab, ret_type):
+        condt = self.eval_expr_type(stmt.cond, symtab)
+        if condt != 'bool':
+            raise SemanticError(f"Condition in while must be bool, got {condt}")
+        self.walk_stmt(stmt.body, symtab, ret_type)
+
+    def _walk_for(self, stmt: ForStmt, symtab, ret_type):
+        if stmt.init:
+            self.walk_stmt(stmt.init, symtab, ret_type)
+        if stmt.cond:
             condt = self.eval_expr_type(stmt.cond, symtab)
             if condt != 'bool':
-                raise SemanticError(f"Condition in while must be bool, got {condt}")
-            self.walk_stmt(stmt.body, symtab, ret_type)
-
-
-        elif isinstance(stmt, ForStmt):
-            if stmt.init:
-                self.walk_stmt(stmt.init, symtab, ret_type) if not isinstance(stmt.init, VarDecl) else self.walk_stmt(stmt.init, symtab, ret_type)
-            if stmt.cond:
-                condt = self.eval_expr_type(stmt.cond, symtab)
-                if condt != 'bool':
-                    raise SemanticError(f"Condition in for must be bool, got {condt}")
-            if stmt.body:
-                self.walk_stmt(stmt.body, dict(symtab), ret_type) if isinstance(stmt.body, Block) else self.walk_stmt(stmt.body, symtab, ret_type)
-
-        elif isinstance(stmt, ReturnStmt):
-            if stmt.expr is None:
-                if ret_type != 'void':
-                    raise SemanticError(f"Missing return value for non-void function")
-            else:
-                et = self.eval_expr_type(stmt.expr, symtab)
-                if not self.type_compatible(ret_type, et):
-                    raise SemanticError(f"Return type mismatch: expected {ret_type}, got {et}")
-
-        elif isinstance(stmt, FuncCall):
-            # builtin print/read handled in interpreter; others must exist
-            if stmt.name not in ('print','read') and stmt.name not in self.functions:
-                raise SemanticError(f"Call to undefined function {stmt.name}")
-            # TODO: check arity & types (basic)
+                raise SemanticError(f"Condition in for must be bool, got {condt}")
+        if stmt.body:
+            self.walk_stmt(stmt.body, dict(symtab), ret_type) if isinstance(stmt.body, Block) else self.walk_stmt(stmt.body, symtab, ret_type)
+
+    def _walk_return(self, stmt: ReturnStmt, symtab, ret_type):
+        if stmt.expr is None:
+            if ret_type != 'void':
+                raise SemanticError(f"Missing return value for non-void function")
+        else:
+            et = self.eval_expr_type(stmt.expr, symtab)
+            if not self.type_compatible(ret_type, et):
+                raise SemanticError(f"Return type mismatch: expected {ret_type}, got {et}")
 
-        elif isinstance(stmt, Block):
-            self.walk_block(stmt, dict(symtab), ret_type)
+    def _walk_call(self, stmt: FuncCall, symtab, ret_type):
+        # builtin print/read handled in interpreter; others must exist
+        if stmt.name not in ('print','read') and stmt.name not in self.functions:
+            raise SemanticError(f"Call to undefined function {stmt.name}")
+        # TODO: check arity & types (basic)
 
-        elif isinstance(stmt, Expr) or isinstance(stmt, UnaryExpr) or isinstance(stmt, Literal) or isinstance(stmt, VarRef) or isinstance(stmt, FuncCall):
-            # expression statement
-            self.eval_expr_type(stmt, symtab)
+    def _walk_block(self, stmt: Block, symtab, ret_type):
+        self.walk_block(stmt, dict(symtab), ret_type)
 
-        else:
-            raise SemanticError(f"Unhandled statement in semantic analyzer: {stmt}")
+    def _walk_expression(self, stmt, symtab, ret_type):
+        # expression statement
+        self.eval_expr_type(stmt, symtab)
 
     def eval_expr_type(self, expr, symtab) -> str:
-        if isinstance(expr, Literal):
-            return expr.typ
-        if isinstance(expr, VarRef):
-            if expr.name not in symtab:
-                raise SemanticError(f"Use of undeclared variable {expr.name}")
-            return symtab[expr.name].typ
-        if isinstance(expr, Assignment):
-            if expr.target not in symtab:
-                raise SemanticError(f"Assignment to undeclared variable {expr.target}")
-            rtype = self.eval_expr_type(expr.value, symtab)
-            if not self.type_compatible(symtab[expr.target].typ, rtype):
-                raise SemanticError(f"Type mismatch in assignment to {expr.target}: {symtab[expr.target].typ} <- {rtype}")
-            return symtab[expr.target].typ
-        if isinstance(expr, UnaryExpr):
-            et = self.eval_expr_type(expr.expr, symtab)
-            if expr.op == '!':
-                if et != 'bool':
-                    raise SemanticError(f"'!' operator needs bool, got {et}")
-                return 'bool'
-            return et
-        if isinstance(expr, Expr):
-            lt = self.eval_expr_type(expr.left, symtab)
-            rt = self.eval_expr_type(expr.right, symtab)
-            # arithmetic
-            if expr.op in ('+','-','*','/','%'):
-                if lt == 'float' or rt == 'float':
-                    return 'float'
-                return 'int'
-            if expr.op in ('<','>','<=','>=','==','!='):
-                return 'bool'
-            if expr.op in ('&&','||'):
-                return 'bool'
+        handler = self._expr_handlers.get(type(expr))
+        if handler is None:
+            raise SemanticError(f"Unable to determine expression type for {expr}")
+        return handler(expr, symtab)
+
+    def _type_literal(self, expr: Literal, symtab) -> str:
+        return expr.typ
+
+    def _type_varref(self, expr: VarRef, symtab) -> str:
+        if expr.name not in symtab:
+            raise SemanticError(f"Use of undeclared variable {expr.name}")
+        return symtab[expr.name].typ
+
+    def _type_assignment(self, expr: Assignment, symtab) -> str:
+        if expr.target not in symtab:
+            raise SemanticError(f"Assignment to undeclared variable {expr.target}")
+        rtype = self.eval_expr_type(expr.value, symtab)
+        if not self.type_compatible(symtab[expr.target].typ, rtype):
+            raise SemanticError(f"Type mismatch in assignment to {expr.target}: {symtab[expr.target].typ} <- {rtype}")
+        return symtab[expr.target].typ
+
+    def _type_unary(self, expr: UnaryExpr, symtab) -> str:
+        et = self.eval_expr_type(expr.expr, symtab)
+        if expr.op == '!':
+            if et != 'bool':
+                raise SemanticError(f"'!' operator needs bool, got {et}")
+            return 'bool'
+        return et
+
+    def _type_binary(self, expr: Expr, symtab) -> str:
+        lt = self.eval_expr_type(expr.left, symtab)
+        rt = self.eval_expr_type(expr.right, symtab)
+        # arithmetic
+        if expr.op in ('+','-','*','/','%'):
+            if lt == 'float' or rt == 'float':
+                return 'float'
             return 'int'
-        if isinstance(expr, FuncCall):
-            # builtin
-            if expr.name == 'print':
-                return 'void'
-            if expr.name == 'read':
-                # argument should be VarRef
-                if not expr.args or not isinstance(expr.args[0], VarRef):
-                    raise SemanticError('read expects a variable')
-                if expr.args[0].name not in symtab:
-                    raise SemanticError(f"read on undeclared variable {expr.args[0].name}")
-                return 'void'
-            # user function
-            if expr.name not in self.functions:
-                raise SemanticError(f"Call to undefined function {expr.name}")
-            # return type of function
-            return self.functions[expr.name].ret_type
-        raise SemanticError(f"Unable to determine expression type for {expr}")
+        if expr.op in ('<','>','<=','>=','==','!='):
+            return 'bool'
+        if expr.op in ('&&','||'):
+            return 'bool'
+        return 'int'
+
+    def _type_call(self, expr: FuncCall, symtab) -> str:
+        # builtin
+        if expr.name == 'print':
+            return 'void'
+        if expr.name == 'read':
+            # argument should be VarRef
+            if not expr.args or not isinstance(expr.args[0], VarRef):
+                raise SemanticError('read expects a variable')
+            if expr.args[0].name not in symtab:
+                raise SemanticError(f"read on undeclared variable {expr.args[0].name}")
+            return 'void'
+        # user function
+        if expr.name not in self.functions:
+            raise SemanticError(f"Call to undefined function {expr.name}")
+        # return type of function
+        return self.functions[expr.name].ret_type
 
     def type_compatible(self, dest: str, src: str) -> bool:
         if dest == src:
@@ -635,16 +797,260 @@ class SemanticAnalyzer:
             return True
         return False
 
+# --------------------------- Numba JIT (optional) ---------------------------
+# With --jit, leaf functions that only compute on int/float/bool locals (no
+# calls, print or read) are translated to Python source and compiled with
+# numba. Every expression must have the Python type the interpreter would give
+# it, and int +, - and * raise OverflowError where 64 bits would wrap, so the
+# interpreter reruns the call and compiled and interpreted results agree.
+
+_NUMBA_TYPES = {'int': 'int64', 'float': 'float64', 'bool': 'boolean'}
+_PY_TYPES = {'int': int, 'float': float, 'bool': bool}
+_NOT_NATIVE = object()  # returned when the compiled code cannot take a call
+
+# int arithmetic for the emitted source. numba's int64 ops wrap, and LLVM may
+# fold away a check made on the wrapped result, so the operands are checked
+# first (for * through the float product, which is far closer than the margin
+# below 2**63 and so only rejects products that might overflow)
+_INT_OPS = {'+': 'int_add', '-': 'int_sub', '*': 'int_mul'}
+_INT_OPS_SOURCE = """
+def int_add(a, b):
+    if (b > 0 and a > 9223372036854775807 - b) or (b < 0 and a < -9223372036854775808 - b):
+        raise OverflowError('int64 overflow')
+    return a + b
+
+def int_sub(a, b):
+    if (b < 0 and a > 9223372036854775807 + b) or (b > 0 and a < -9223372036854775808 + b):
+        raise OverflowError('int64 overflow')
+    return a - b
+
+def int_mul(a, b):
+    if abs(float(a) * float(b)) >= 9.2e18:
+        raise OverflowError('int64 overflow')
+    return a * b
+"""
+_int_ops: Dict[str, Any] = {}  # compiled on first use
+
+class JitUnsupported(Exception):
+    pass
+
+class PySourceEmitter:
+    def __init__(self, func: Function):
+        self.func = func
+        self.types: Dict[str, str] = {}
+        self.lines: List[str] = []
+
+    def emit(self) -> str:
+        for typ, name in self.func.params:
+            self.declare(name, typ)
+        params = ', '.join('v_' + name for typ, name in self.func.params)
+        self.lines.append(f'def minic_{self.func.name}({params}):')
+        self.emit_body(self.func.body, 1)
+        return '\n'.join(self.lines) + '\n'
+
+    def declare(self, name: str, typ: str):
+        if typ not in _NUMBA_TYPES:
+            raise JitUnsupported(f'variable {name} of type {typ}')
+        if self.types.setdefault(name, typ) != typ:
+            raise JitUnsupported(f'variable {name} declared with two types')
+
+    def emit_body(self, stmt, depth: int):
+        count = len(self.lines)
+        self.emit_stmt(stmt, depth)
+        if len(self.lines) == count:
+            self.lines.append('    ' * depth + 'pass')
+
+    def emit_store(self, name: str, value, depth: int):
+        src, typ = self.emit_expr(value)
+        if typ != self.types[name]:
+            raise JitUnsupported(f'{typ} value stored in {self.types[name]} variable {name}')
+        self.lines.append(f"{'    ' * depth}v_{name} = {src}")
+
+    def emit_stmt(self, stmt, depth: int):
+        indent = '    ' * depth
+        if isinstance(stmt, Block):
+            for s in stmt.statements:
+                self.emit_stmt(s, depth)
+        elif isinstance(stmt, VarDecl):
+            self.declare(stmt.name, stmt.var_type)
+            if stmt.init is None:
+                raise JitUnsupported(f'uninitialized variable {stmt.name}')
+            self.emit_store(stmt.name, stmt.init, depth)
+        elif isinstance(stmt, Assignment):
+            self.emit_store(stmt.target, stmt.value, depth)
+        elif isinstance(stmt, IfStmt):
+            self.lines.append(f'{indent}if {self.emit_cond(stmt.cond)}:')
+            self.emit_body(stmt.then_branch, depth + 1)
+            if stmt.else_branch:
+                self.lines.append(f'{indent}else:')
+                self.emit_body(stmt.else_branch, depth + 1)
+        elif isinstance(stmt, WhileStmt):
+            self.lines.append(f'{indent}while {self.emit_cond(stmt.cond)}:')
+            self.emit_body(stmt.body, depth + 1)
+        elif isinstance(stmt, ForStmt):
+            if stmt.init:
+                self.emit_stmt(stmt.init, depth)
+            cond = self.emit_cond(stmt.cond) if stmt.cond else 'True'
+            self.lines.append(f'{indent}while {cond}:')
+            self.emit_body(stmt.body, depth + 1)
+            if stmt.update:
+                self.emit_stmt(stmt.update, depth + 1)
+        elif isinstance(stmt, ReturnStmt):
+            if not stmt.expr:
+                self.lines.append(f'{indent}return')
+                return
+            src, typ = self.emit_expr(stmt.expr)
+            if typ != self.func.ret_type:
+                raise JitUnsupported(f'{typ} returned from {self.func.ret_type} function')
+            self.lines.append(f'{indent}return {src}')
+        elif isinstance(stmt, (Expr, UnaryExpr, Literal, VarRef)):
+            self.lines.append(indent + self.emit_expr(stmt)[0])
+        else:
+            raise JitUnsupported(f'statement {stmt}')
+
+    def emit_cond(self, expr) -> str:
+        src, typ = self.emit_expr(expr)
+        if typ != 'bool':
+            raise JitUnsupported(f'{typ} condition')
+        return src
+
+    def emit_expr(self, expr) -> Tuple[str, str]:
+        # Python source for expr and the type of the value the interpreter computes
+        if isinstance(expr, Literal):
+            if expr.typ not in _NUMBA_TYPES:
+                raise JitUnsupported(f'{expr.typ} literal')
+            return repr(expr.value), expr.typ
+        if isinstance(expr, VarRef):
+            return 'v_' + expr.name, self.types[expr.name]
+        if isinstance(expr, UnaryExpr):
+            src, typ = self.emit_expr(expr.expr)
+            if expr.op == '!' and typ == 'bool':
+                return f'(not {src})', 'bool'
+            if expr.op == '-' and typ == 'int':
+                return f'int_sub(0, {src})', 'int'
+            if expr.op in ('-', '+') and typ != 'bool':
+                return f'({expr.op}{src})', typ
+            raise JitUnsupported(f'{expr.op} on {typ}')
+        if isinstance(expr, Expr):
+            lsrc, lt = self.emit_expr(expr.left)
+            rsrc, rt = self.emit_expr(expr.right)
+            op = expr.op
+            if op in ('&&', '||'):
+                if lt != 'bool' or rt != 'bool':
+                    raise JitUnsupported(f'{op} on {lt}, {rt}')
+                return f"({lsrc} {'and' if op == '&&' else 'or'} {rsrc})", 'bool'
+            if op in ('<', '>', '<=', '>=', '==', '!='):
+                return f'({lsrc} {op} {rsrc})', 'bool'
+            if op in ('+', '-', '*', '/', '%') and 'bool' not in (lt, rt):
+                # '/' is true division, a float even for two ints
+                typ = 'float' if op == '/' or 'float' in (lt, rt) else 'int'
+                if typ == 'int' and op in _INT_OPS:
+                    return f'{_INT_OPS[op]}({lsrc}, {rsrc})', typ
+                return f'({lsrc} {op} {rsrc})', typ
+            raise JitUnsupported(f'{op} on {lt}, {rt}')
+        raise JitUnsupported(f'expression {expr}')
+
+def jit_function(func: Function):
+    # a callable taking the argument list and returning the result, or
+    # _NOT_NATIVE to have the interpreter run the call; None if func cannot be compiled
+    try:
+        source = PySourceEmitter(func).emit()
+    except JitUnsupported:
+        return None
+    try:
+        import numba
+        from numba.core.errors import NumbaError
+    except ImportError:
+        return None
+    if not _int_ops:
+        ops: Dict[str, Any] = {}
+        exec(compile(_INT_OPS_SOURCE, '<minic int ops>', 'exec'), ops)
+        # inlined by numba itself, which compiles faster than separate functions
+        _int_ops.update((name, numba.njit(inline='always')(ops[name])) for name in _INT_OPS.values())
+    namespace: Dict[str, Any] = dict(_int_ops)
+    exec(compile(source, f'<minic {func.name}>', 'exec'), namespace)
+    signature = tuple(getattr(numba, _NUMBA_TYPES[typ]) for typ, name in func.params)
+    try:
+        compiled = numba.njit(signature)(namespace[f'minic_{func.name}'])
+    except NumbaError:
+        return None
+    arg_types = tuple(_PY_TYPES[typ] for typ, name in func.params)
+    def call(args):
+        # an int passed for a float parameter stays an int in the interpreter
+        for val, typ in zip(args, arg_types):
+            if type(val) is not typ:
+                return _NOT_NATIVE
+        try:
+            return compiled(*args)
+        except Exception:
+            # leaf functions have no side effects, so the interpreter can rerun
+            # the call and raise its own error (division by zero, int too big)
+            # or compute the int the 64-bit arithmetic overflowed
+            return _NOT_NATIVE
+    return call
+
 # --------------------------- Interpreter ---------------------------
 
-class ReturnException(Exception):
-    def __init__(self, value):
-        self.value = value
+# deepest MiniC call chain before a RecursionError. Python's own limit stops
+# the pure-Python interpreter long before this; the compiled module (see
+# Mini_c.pxd) makes calls in C, which Python's limit does not see.
+MAX_CALL_DEPTH = 1000
+
+# binary operators of the interpreter. Each entry builds the closure for one
+# operator from its compiled operands, so the operator is looked up once per
+# node when a function is compiled and applied inline every time it runs
+# (calling through operator.add and friends instead is ~15% slower).
+_BINOPS = {
+    '+': lambda left, right: lambda env: left(env) + right(env),
+    '-': lambda left, right: lambda env: left(env) - right(env),
+    '*': lambda left, right: lambda env: left(env) * right(env),
+    '/': lambda left, right: lambda env: left(env) / right(env),
+    '%': lambda left, right: lambda env: left(env) % right(env),
+    '<': lambda left, right: lambda env: left(env) < right(env),
+    '>': lambda left, right: lambda env: left(env) > right(env),
+    '<=': lambda left, right: lambda env: left(env) <= right(env),
+    '>=': lambda left, right: lambda env: left(env) >= right(env),
+    '==': lambda left, right: lambda env: left(env) == right(env),
+    '!=': lambda left, right: lambda env: left(env) != right(env),
+    # the right operand only runs when the left one does not decide the result
+    '&&': lambda left, right: lambda env: left(env) and right(env),
+    '||': lambda left, right: lambda env: left(env) or right(env),
+}
+
+# what read() accepts as a number: exactly the strings int() and float()
+# parse (surrounding whitespace, digit groups split by '_', and for floats a
+# '.' with an optional exponent), so reads pick a type without raising
+_INT_RE = re.compile(r'\s*[+-]?\d+(?:_\d+)*\s*')
+_FLOAT_RE = re.compile(r'\s*[+-]?(?:\d+(?:_\d+)*\.(?:\d+(?:_\d+)*)?|\.\d+(?:_\d+)*)(?:[eE][+-]?\d+(?:_\d+)*)?\s*')
+
+def _read_value(v):
+    if v.isdecimal():
+        return int(v)
+    if '.' in v:
+        return float(v) if _FLOAT_RE.fullmatch(v) else v
+    return int(v) if _INT_RE.fullmatch(v) else v
 
 class Interpreter:
-    def __init__(self, program: Program):
+    def __init__(self, program: Program, jit: bool = False):
         self.program = program
         self.functions: Dict[str, Function] = {f.name: f for f in program.functions}
+        if jit:
+            for f in self.functions.values():
+                f.native = jit_function(f)
+        self.depth = 0  # MiniC calls in progress
+        # each function body is compiled once into nested closures, so running
+        # it calls straight into the code for each node without looking at the AST.
+        # A statement's closure returns None, or (value,) once a return statement
+        # has run, which every enclosing statement passes straight up.
+        self._stmt_compilers = {
+            VarDecl: self._compile_vardecl, Assignment: self._compile_assign_stmt, IfStmt: self._compile_if,
+            WhileStmt: self._compile_while, ForStmt: self._compile_for, ReturnStmt: self._compile_return,
+            FuncCall: self._compile_call_stmt, Block: self._compile_nested_block,
+        }
+        self._expr_compilers = {
+            Literal: self._compile_literal, VarRef: self._compile_varref, Assignment: self._compile_assignment,
+            UnaryExpr: self._compile_unary, Expr: self._compile_binary, FuncCall: self._compile_call_expr,
+        }
 
     def run(self, argv=None):
         if 'main' not in self.functions:
@@ -654,160 +1060,231 @@ class Interpreter:
         return self.exec_function(mainf, [])
 
     def exec_function(self, func: Function, args: List[Any]):
+        if self.depth >= MAX_CALL_DEPTH:
+            raise RecursionError('maximum recursion depth exceeded')
+        if func.native is not None:
+            result = func.native(args)
+            if result is not _NOT_NATIVE:
+                return result
+        body = func.code
+        if body is None:
+            body = func.code = self._compile_block(func.body)
         env = {}
         for (typ,name), val in zip(func.params, args):
             env[name] = val
+        self.depth += 1
         try:
-            self.exec_block(func.body, env)
-        except ReturnException as r:
-            return r.value
-        return None
-
-    def exec_block(self, block: Block, env: Dict[str, Any]):
-        for stmt in block.statements:
-            self.exec_stmt(stmt, env)
-
-    def exec_stmt(self, stmt, env):
-        if isinstance(stmt, VarDecl):
-            val = None
-            if stmt.init is not None:
-                val = self.eval_expr(stmt.init, env)
-            env[stmt.name] = val
-
-        elif isinstance(stmt, Assignment):
-            val = self.eval_expr(stmt.value, env)
-            if stmt.target not in env:
-                raise Exception(f"Assignment to undeclared variable {stmt.target}")
-            env[stmt.target] = val
-
-        elif isinstance(stmt, IfStmt):
-            cond = self.eval_expr(stmt.cond, env)
-            if cond:
-                self.exec_stmt(stmt.then_branch, env) if not isinstance(stmt.then_branch, Block) else self.exec_block(stmt.then_branch, dict(env))
-            elif stmt.else_branch:
-                self.exec_stmt(stmt.else_branch, env) if not isinstance(stmt.else_branch, Block) else self.exec_block(stmt.else_branch, dict(env))
-
-        elif isinstance(stmt, WhileStmt):
-            while self.eval_expr(stmt.cond, env):
-                self.exec_stmt(stmt.body, env) if not isinstance(stmt.body, Block) else self.exec_block(stmt.body, env)
-
-        elif isinstance(stmt, ForStmt):
-            if stmt.init:
-                if isinstance(stmt.init, VarDecl):
-                    self.exec_stmt(stmt.init, env)
-                else:
-                    self.exec_stmt(stmt.init, env)
-            while True:
-                if stmt.cond and not self.eval_expr(stmt.cond, env):
-                    break
-                self.exec_stmt(stmt.body, env) if not isinstance(stmt.body, Block) else self.exec_block(stmt.body, dict(env))
-                if stmt.update:
-                    self.eval_expr(stmt.update, env)
-
-        elif isinstance(stmt, ReturnStmt):
-            val = None
-            if stmt.expr:
-                val = self.eval_expr(stmt.expr, env)
-            raise ReturnException(val)
-
-        elif isinstance(stmt, FuncCall):
-            if stmt.name == 'print':
-                vals = [self.eval_expr(a, env) for a in stmt.args]
-                print(*vals)
-            elif stmt.name == 'read':
-                if not stmt.args or not isinstance(stmt.args[0], VarRef):
-                    raise Exception('read expects a variable')
-                name = stmt.args[0].name
+            returned = body(env)
+        finally:
+            self.depth -= 1
+        return returned[0] if returned is not None else None
+
+    def _compile_block(self, block: Block):
+        stmts = [self._compile_stmt(stmt) for stmt in block.statements]
+        def run(env):
+            for stmt in stmts:
+                returned = stmt(env)
+                if returned is not None:
+                    return returned
+        return run
+
+    def _compile_stmt(self, stmt):
+        compiler = self._stmt_compilers.get(type(stmt))
+        if compiler is None:
+            # expression statement; its value is dropped
+            expr = self._compile_expr(stmt)
+            def run(env):
+                expr(env)
+            return run
+        return compiler(stmt)
+
+    def _compile_vardecl(self, stmt: VarDecl):
+        name = stmt.name
+        if stmt.init is None:
+            def run(env):
+                env[name] = None
+            return run
+        init = self._compile_expr(stmt.init)
+        def run(env):
+            env[name] = init(env)
+        return run
+
+    def _compile_if(self, stmt: IfStmt):
+        cond = self._compile_expr(stmt.cond)
+        then_branch = self._compile_stmt(stmt.then_branch)
+        if not stmt.else_branch:
+            def run(env):
+                if cond(env):
+                    return then_branch(env)
+            return run
+        else_branch = self._compile_stmt(stmt.else_branch)
+        def run(env):
+            if cond(env):
+                return then_branch(env)
+            return else_branch(env)
+        return run
+
+    def _compile_while(self, stmt: WhileStmt):
+        cond = self._compile_expr(stmt.cond)
+        body = self._compile_stmt(stmt.body)
+        def run(env):
+            while cond(env):
+                returned = body(env)
+                if returned is not None:
+                    return returned
+        return run
+
+    def _compile_for(self, stmt: ForStmt):
+        init = self._compile_stmt(stmt.init) if stmt.init else None
+        cond = self._compile_expr(stmt.cond) if stmt.cond else None
+        update = self._compile_expr(stmt.update) if stmt.update else None
+        body = self._compile_stmt(stmt.body)
+        def run(env):
+            if init is not None:
+                init(env)
+            while cond is None or cond(env):
+                returned = body(env)
+                if returned is not None:
+                    return returned
+                if update is not None:
+                    update(env)
+        return run
+
+    def _compile_return(self, stmt: ReturnStmt):
+        if not stmt.expr:
+            return lambda env: (None,)
+        value = self._compile_expr(stmt.expr)
+        return lambda env: (value(env),)
+
+    def _compile_call_stmt(self, stmt: FuncCall):
+        if stmt.name == 'read':
+            if not stmt.args or not isinstance(stmt.args[0], VarRef):
+                return self._compile_error('read expects a variable')
+            name = stmt.args[0].name
+            def run(env):
                 if name not in env:
                     raise Exception(f'read on undeclared variable {name}')
-                v = input()
-                # try convert to int or float
-                try:
-                    if '.' in v:
-                        env[name] = float(v)
-                    else:
-                        env[name] = int(v)
-                except:
-                    env[name] = v
-            else:
-                # user function
-                f = self.functions.get(stmt.name)
-                if not f:
-                    raise Exception(f'Call to undefined function {stmt.name}')
-                argvals = [self.eval_expr(a, env) for a in stmt.args]
-                return self.exec_function(f, argvals)
-
-        elif isinstance(stmt, Block):
-            self.exec_block(stmt, dict(env))
-
-        else:
-            # expression statement
-            self.eval_expr(stmt, env)
-
-    def eval_expr(self, expr, env):
-        if isinstance(expr, Literal):
-            return expr.value
-        if isinstance(expr, VarRef):
-            if expr.name not in env:
-                raise Exception(f'Use of undeclared variable {expr.name}')
-            return env[expr.name]
-        if isinstance(expr, Assignment):
-            val = self.eval_expr(expr.value, env)
-            if expr.target not in env:
-                raise Exception(f'Assignment to undeclared variable {expr.target}')
-            env[expr.target] = val
+                # convert to int or float when it looks like one
+                env[name] = _read_value(input())
+            return run
+        call = self._compile_call_expr(stmt)
+        def run(env):
+            call(env)
+        return run
+
+    def _compile_assign_stmt(self, stmt: Assignment):
+        target = stmt.target
+        value = self._compile_expr(stmt.value)
+        def run(env):
+            val = value(env)
+            if target not in env:
+                raise Exception(f"Assignment to undeclared variable {target}")
+            env[target] = val
+        return run
+
+    def _compile_nested_block(self, stmt: Block):
+        # a nested block shares env with the code around it and removes its own
+        # declarations when it ends. Nothing needs restoring: the semantic
+        # analyzer rejects a declaration that would shadow a visible variable.
+        block = self._compile_block(stmt)
+        declared = self._declared_names(stmt.statements)
+        if not declared:
+            return block
+        def run(env):
+            returned = block(env)
+            for name in declared:
+                env.pop(name, None)
+            return returned
+        return run
+
+    def _declared_names(self, stmts) -> List[str]:
+        # names declared in the scope of these statements, including by an
+        # unbraced if/while/for body or a for initializer but not nested blocks
+        names = []
+        for stmt in stmts:
+            if isinstance(stmt, VarDecl):
+                names.append(stmt.name)
+            elif isinstance(stmt, IfStmt):
+                names += self._declared_names([stmt.then_branch, stmt.else_branch])
+            elif isinstance(stmt, WhileStmt):
+                names += self._declared_names([stmt.body])
+            elif isinstance(stmt, ForStmt):
+                names += self._declared_names([stmt.init, stmt.body])
+        return names
+
+    def _compile_error(self, message: str):
+        # errors in the AST are raised when the code runs, not when it is compiled
+        def run(env):
+            raise Exception(message)
+        return run
+
+    def _compile_expr(self, expr):
+        compiler = self._expr_compilers.get(type(expr))
+        if compiler is None:
+            return self._compile_error(f'Unhandled expression in interpreter: {expr}')
+        return compiler(expr)
+
+    def _compile_literal(self, expr: Literal):
+        value = expr.value
+        return lambda env: value
+
+    def _compile_varref(self, expr: VarRef):
+        name = expr.name
+        def run(env):
+            try:
+                return env[name]
+            except KeyError:
+                raise Exception(f'Use of undeclared variable {name}') from None
+        return run
+
+    def _compile_assignment(self, expr: Assignment):
+        target = expr.target
+        value = self._compile_expr(expr.value)
+        def run(env):
+            val = value(env)
+            if target not in env:
+                raise Exception(f'Assignment to undeclared variable {target}')
+            env[target] = val
             return val
-        if isinstance(expr, UnaryExpr):
-            v = self.eval_expr(expr.expr, env)
-            if expr.op == '-':
-                return -v
-            if expr.op == '+':
-                return +v
-            if expr.op == '!':
-                return not v
-            return v
-        if isinstance(expr, Expr):
-            l = self.eval_expr(expr.left, env)
-            r = self.eval_expr(expr.right, env)
-            op = expr.op
-            if op == '+': return l + r
-            if op == '-': return l - r
-            if op == '*': return l * r
-            if op == '/': return l / r
-            if op == '%': return l % r
-            if op == '<': return l < r
-            if op == '>': return l > r
-            if op == '<=': return l <= r
-            if op == '>=': return l >= r
-            if op == '==': return l == r
-            if op == '!=': return l != r
-            if op == '&&': return l and r
-            if op == '||': return l or r
-            return None
-        if isinstance(expr, FuncCall):
-            if expr.name == 'print':
-                vals = [self.eval_expr(a, env) for a in expr.args]
-                print(*vals)
-                return None
-            if expr.name == 'read':
-                if not expr.args or not isinstance(expr.args[0], VarRef):
-                    raise Exception('read expects a variable')
-                name = expr.args[0].name
-                v = input()
-                try:
-                    if '.' in v:
-                        return float(v)
-                    else:
-                        return int(v)
-                except:
-                    return v
-            # user function
-            f = self.functions.get(expr.name)
-            if not f:
-                raise Exception(f'Call to undefined function {expr.name}')
-            argvals = [self.eval_expr(a, env) for a in expr.args]
-            return self.exec_function(f, argvals)
-        raise Exception(f'Unhandled expression in interpreter: {expr}')
+        return run
+
+    def _compile_unary(self, expr: UnaryExpr):
+        operand = self._compile_expr(expr.expr)
+        if expr.op == '-':
+            return lambda env: -operand(env)
+        if expr.op == '+':
+            return lambda env: +operand(env)
+        if expr.op == '!':
+            return lambda env: not operand(env)
+        return operand
+
+    def _compile_binary(self, expr: Expr):
+        left = self._compile_expr(expr.left)
+        right = self._compile_expr(expr.right)
+        build = _BINOPS.get(expr.op)
+        if build is None:
+            def run(env):
+                left(env)
+                right(env)
+            return run
+        return build(left, right)
+
+    def _compile_call_expr(self, expr: FuncCall):
+        args = [self._compile_expr(a) for a in expr.args]
+        if expr.name == 'print':
+            def run(env):
+                print(*[a(env) for a in args])
+            return run
+        if expr.name == 'read':
+            if not expr.args or not isinstance(expr.args[0], VarRef):
+                return self._compile_error('read expects a variable')
+            return lambda env: _read_value(input())
+        # user function
+        f = self.functions.get(expr.name)
+        if not f:
+            return self._compile_error(f'Call to undefined function {expr.name}')
+        exec_function = self.exec_function
+        return lambda env: exec_function(f, [a(env) for a in args])
 
 # --------------------------- Utilities & Main ---------------------------
 
@@ -850,14 +1327,14 @@ int main() {
 }
 '''
 
-def compile_and_run(code: str, run=True):
+def compile_and_run(code: str, run=True, jit=False):
     toks = tokenize(code)
     p = Parser(toks)
     prog = p.parse()
     sa = SemanticAnalyzer(prog)
     sa.analyze()
     if run:
-        interp = Interpreter(prog)
+        interp = Interpreter(prog, jit=jit)
         return interp.run()
     return prog
 
@@ -866,6 +1343,7 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='MiniC compiler (demo)')
     parser.add_argument('file', nargs='?', help='MiniC source file')
     parser.add_argument('--run-samples', action='store_true')
+    parser.add_argument('--jit', action='store_true', help='JIT-compile numeric leaf functions with numba')
     args = parser.parse_args()
 
     if args.run_samples:
@@ -881,7 +1359,7 @@ if __name__ == '__main__':
         with open(args.file, 'r') as f:
             code = f.read()
         try:
-            compile_and_run(code)
+            compile_and_run(code, jit=args.jit)
         except Exception as e:
             print('Compilation/Runtime error:', e)
             raise
@@ -1,99 +1,226 @@
 # main.py
+import contextlib
+import hashlib
+import io
+import os
+import pickle
 import sys
+from pathlib import Path
 from MiniC.lexer import tokenize
 from MiniC.parser import Parser
 from MiniC.semantic import SemanticAnalyzer
 from MiniC.interpreter import Interpreter
-from MiniC.ir_generator import IRGenerator
-from MiniC.tac_printer import TACPrinter
-from MiniC.optimizer import TACOptimizer
-from MiniC.codegen import CodeGenerator
+# The TAC, code generation and LLVM modules are imported where they are
+# used, so a plain run does not pay for them (llvmlite alone takes ~25ms)
 
-def compile_and_run(code: str, flags=None, run=True, filename=None):
-    """Compile and optionally run MiniC code through all compiler phases."""
-    if flags is None:
-        flags = {}
-    toks = tokenize(code)
-    if flags.get('tokens'):
-        print("Tokens:")
-        for tok in toks:
-            print(f"  {tok}")
-        print()
+CACHE_DIR = Path.home() / '.minic_cache'
 
-    p = Parser(toks)
-    prog = p.parse()
-    if flags.get('ast'):
-        print("AST:")
-        print(prog)
-        print()
+def compiler_stamp() -> str:
+    """Return a digest of the Python version and the size and modification
+    time of every compiler module; editing or rebuilding the compiler changes it."""
+    key = hashlib.sha1(sys.version.encode())
+    for module in sorted(Path(__file__).resolve().parent.joinpath('MiniC').iterdir()):
+        if module.suffix not in ('.py', '.so', '.pyd'):
+            continue
+        stat = module.stat()
+        key.update(f"{module.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return key.hexdigest()
 
-    sa = SemanticAnalyzer(prog)
-    sa.analyze()
-    if flags.get('symbol_table'):
-        print("Functions:")
-        for name, func in sa.functions.items():
-            print(f"  {name}: {func.ret_type}({', '.join(f'{t} {n}' for t, n in func.params)})")
-        print()
+def cache_path(code: str) -> Path:
+    """Return the cache file for the front-end results of code.
+
+    The name starts with the compiler stamp, so entries written by another
+    build of the compiler are never read and can be told apart."""
+    return CACHE_DIR / f"{compiler_stamp()}-{hashlib.sha1(code.encode()).hexdigest()}.pkl"
+
+def store_cache(path: Path, entry):
+    """Pickle entry to path, and delete the entries of other compiler builds.
+
+    The entry is written under a temporary name and renamed, so readers and
+    parallel writers never see a partial file."""
+    CACHE_DIR.mkdir(exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp.open('wb') as f:
+            pickle.dump(entry, f, protocol=5)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    stamp = path.name.split('-', 1)[0]
+    for old in CACHE_DIR.iterdir():
+        if not old.name.startswith(stamp):
+            old.unlink(missing_ok=True)
+
+def print_section(title: str, items):
+    """Print a heading, then each item indented, then a blank line, in a single write."""
+    sys.stdout.write(f"{title}:\n" + ''.join([f"  {item}\n" for item in items]) + "\n")
 
-    ir_gen = IRGenerator()
-    tac = ir_gen.generate(prog)
+def compile_tac(prog, flags, filename=None, llvm=False):
+    """Build the TAC of a checked program and run the phases that use it.
+
+    Prints the sections the flags ask for and, with llvm, compiles what it
+    can to machine code. Returns those compiled functions, or None; the TAC
+    itself is only referenced from here, so it is freed when this returns."""
+    from MiniC.ir_generator import IRGenerator
+    tac = IRGenerator().generate(prog)
     if flags.get('tac'):
-        print("TAC:")
-        for instr in tac:
-            print(f"  {instr}")
-        print()
+        print_section("TAC", tac)
 
-    optimizer = TACOptimizer(tac)
-    optimized_tac = optimizer.optimize()
+    # Lower to machine code before the optimizer rewrites the TAC in place
+    natives = None
+    if llvm:
+        from MiniC.llvm_backend import LLVMBackend
+        natives = LLVMBackend(prog).compile(tac)
+
+    # The LLVM backend lowers the unoptimized TAC, so only the output flags need the optimizer
+    if flags.get('optimized') or flags.get('codegen'):
+        from MiniC.optimizer import TACOptimizer
+        optimizer = TACOptimizer(tac)
+        optimized_tac = optimizer.optimize()
     if flags.get('optimized'):
-        print("Optimized TAC:")
-        for instr in optimized_tac:
-            print(f"  {instr}")
-        print()
+        print_section("Optimized TAC", optimized_tac)
 
     if flags.get('codegen'):
+        from MiniC.codegen import CodeGenerator
         codegen = CodeGenerator()
-        assembly = codegen.generate(optimized_tac)
         print("Generated Assembly:")
-        print(assembly)
-        # Write to .out file
-        out_file = filename.replace('.mc', '.out') if filename else 'output.out'
-        with open(out_file, 'w') as f:
-            f.write(assembly)
+        # Stream each line to stdout and the .out file; the file is written
+        # under a temporary name and renamed, so a failure keeps the old one
+        out_file = str(Path(filename).with_suffix('.out')) if filename else 'output.out'
+        tmp_file = out_file + '.tmp'
+        write = sys.stdout.write
+        with open(tmp_file, 'w', buffering=1 << 20) as f:
+            sep = ''
+            for line in codegen.generate_iter(optimized_tac):
+                f.write(sep)
+                f.write(line)
+                write(f"{line}\n")
+                sep = '\n'
+        os.replace(tmp_file, out_file)
         print(f"Assembly written to {out_file}")
+    return natives
+
+def compile_and_run(code: str, flags=None, run=True, filename=None, jit=False, llvm=False, cache=False):
+    """Compile and optionally run MiniC code through all compiler phases.
+
+    With cache, the tokens and checked AST are stored in CACHE_DIR and reused
+    when the same code is compiled again, skipping the front end."""
+    if flags is None:
+        flags = {}
+    cached = None
+    if cache:
+        path = cache_path(code)
+        try:
+            with path.open('rb') as f:
+                cached = pickle.load(f)
+        except Exception:
+            pass  # Missing or unreadable entry; compile as usual
+    toks = tokenize(code) if cached is None else cached[0]
+    if flags.get('tokens'):
+        print_section("Tokens", toks)
+
+    prog = Parser(toks).parse() if cached is None else cached[1]
+    if flags.get('ast'):
+        print("AST:")
+        print(prog)
+        print()
+
+    # A cached AST already passed the checks, so it is not analyzed again
+    if cached is None:
+        SemanticAnalyzer(prog).analyze()
+    if cache and cached is None:
+        try:
+            store_cache(path, (toks, prog))
+        except Exception:
+            pass  # The cache is best effort, e.g. a read-only home or an AST too deep to pickle
+    if flags.get('symbol_table'):
+        # The analyzer's function table is prog.functions by name, which it
+        # checked to be unique, so print straight from the AST
+        print_section("Functions", (f"{func.name}: {func.ret_type}({', '.join(f'{t} {n}' for t, n in func.params)})"
+                                    for func in prog.functions))
+
+    # The interpreter runs bytecode compiled from the AST, so the TAC is
+    # only built for the flags that print it and for the LLVM backend
+    natives = None
+    if flags.get('tac') or flags.get('optimized') or flags.get('codegen') or (llvm and run):
+        natives = compile_tac(prog, flags, filename=filename, llvm=llvm and run)
 
     if run:
-        interp = Interpreter(prog)
+        # Only the AST is needed from here on; the TAC went with compile_tac's
+        # frame, so drop the tokens too before the program runs
+        toks = None
+        interp = Interpreter(prog, jit=jit, natives=natives)
         return interp.run()
     return prog
 
+def compile_file(path: str, flags, cache=False):
+    """Compile one file without running it, as a worker process does.
+
+    Returns what the phases printed and the error message, or None if it compiled."""
+    with open(path, 'r') as f:
+        code = f.read()
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            compile_and_run(code, flags=flags, run=False, filename=path, cache=cache)
+    except Exception as e:
+        return out.getvalue(), str(e)
+    return out.getvalue(), None
+
+def compile_files(paths, flags, cache=False):
+    """Compile several files in parallel worker processes; results are in the order of paths."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    # A forkserver starts each worker from a clean, already-initialized process
+    context = (multiprocessing.get_context('forkserver')
+               if 'forkserver' in multiprocessing.get_all_start_methods() else None)
+    workers = min(len(paths), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return list(pool.map(compile_file, paths, [flags] * len(paths), [cache] * len(paths)))
+
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser(description='MiniC compiler (modular)')
-    parser.add_argument('file', nargs='?', help='MiniC source file')
+    parser.add_argument('file', nargs='*', help='MiniC source file(s)')
     parser.add_argument('--tokens', action='store_true', help='Print tokens')
     parser.add_argument('--ast', action='store_true', help='Print AST')
     parser.add_argument('--symbol-table', action='store_true', help='Print symbol table')
     parser.add_argument('--tac', action='store_true', help='Print TAC')
     parser.add_argument('--optimized', action='store_true', help='Print optimized TAC')
     parser.add_argument('--codegen', action='store_true', help='Generate and print assembly code')
+    parser.add_argument('--jit', action='store_true', help='JIT-compile numeric leaf functions with numba')
+    parser.add_argument('--llvm', action='store_true', help='Compile integer functions to machine code with llvmlite')
+    parser.add_argument('--no-cache', action='store_true', help='Do not reuse or store front-end results in ~/.minic_cache')
     args = parser.parse_args()
 
-    if args.file:
-        with open(args.file, 'r') as f:
+    flags = {
+        'tokens': args.tokens,
+        'ast': args.ast,
+        'symbol_table': args.symbol_table,
+        'tac': args.tac,
+        'optimized': args.optimized,
+        'codegen': args.codegen
+    }
+    if len(args.file) > 1 and any(flags.values()):
+        # Nothing runs, so the files are independent; compile them in parallel
+        failed = False
+        for path, (output, error) in zip(args.file, compile_files(args.file, flags, cache=not args.no_cache)):
+            print(f"==> {path} <==")
+            sys.stdout.write(output)
+            if error is not None:
+                print('Compilation/Runtime error:', error)
+                failed = True
+        sys.exit(1 if failed else 0)
+    for path in args.file:
+        if len(args.file) > 1:
+            print(f"==> {path} <==")
+        with open(path, 'r') as f:
             code = f.read()
-        flags = {
-            'tokens': args.tokens,
-            'ast': args.ast,
-            'symbol_table': args.symbol_table,
-            'tac': args.tac,
-            'optimized': args.optimized,
-            'codegen': args.codegen
-        }
         try:
-            compile_and_run(code, flags=flags, run=not any(flags.values()), filename=args.file)
+            compile_and_run(code, flags=flags, run=not any(flags.values()), filename=path, jit=args.jit, llvm=args.llvm,
+                            cache=not args.no_cache)
         except Exception as e:
             print('Compilation/Runtime error:', e)
             raise
-    else:
+    if not args.file:
         print('No input file specified.')